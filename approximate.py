@@ -0,0 +1,263 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from data_loader import get_derived
+from figure_cache import figure_key
+from instrumentation import section
+from olap_cube import CUBE_MEASURES
+from snapshot import concat_frames
+
+# Set DASHBOARD_APPROXIMATE=1 to show KPIs estimated from a stratified sample
+# first; they are refined to exact values as those finish in the background
+APPROXIMATE = os.environ.get('DASHBOARD_APPROXIMATE') == '1'
+
+# Expected rows of the sample, and the fewest expected from any stratum so
+# that small hospitals still get a usable variance estimate
+SAMPLE_ROWS = int(os.environ.get('DASHBOARD_SAMPLE_ROWS', 100000))
+MIN_STRATUM_ROWS = 30
+
+STRATA = ['Hospital Names', 'Admission Type']
+SAMPLE_COLUMNS = ['Hospital Names', 'Admission Type', 'Insurance Provider', 'Medical Condition', 'Gender',
+                  'Date of Admission', 'Age', 'Billing Amount', 'Length of Stay']
+
+# Normal quantile of the two-sided 95% confidence intervals
+CONFIDENCE_Z = 1.959963984540054
+
+# Exact results computed in the background, kept per name and filter state,
+# by threads shared by every session
+REFINED_ENTRIES = 256
+REFINE_WORKERS = int(os.environ.get('DASHBOARD_REFINE_WORKERS', os.cpu_count() or 1))
+
+_refine_pool = ThreadPoolExecutor(REFINE_WORKERS)
+_refined = OrderedDict()
+_refined_lock = threading.Lock()
+
+# Script runs waiting on each refinement. One that no run waits on any more,
+# because the filters changed before it finished, is cancelled unless it has
+# already started.
+_waiting = Counter()
+
+# The estimates on the current script run's page waiting for exact values
+_pending = threading.local()
+
+
+# Rows drawn independently with their stratum's rate, stratified by hospital
+# and admission type. Estimates weight every sampled row by the rows of the
+# dataset it stands for, so totals and counts are unbiased for any filter.
+class StratifiedSample:
+    def __init__(self, rows, stratum, population, sampled, strata, draws, n_rows):
+        self.rows = rows
+        self.stratum = stratum
+        self.population = population
+        self.sampled = sampled
+        self.strata = strata
+        self.draws = draws
+        self.n_rows = n_rows
+
+    @classmethod
+    def build(cls, data, previous=None, random_state=0):
+        # Every row has a fixed uniform draw and is sampled while it is below
+        # its stratum's rate. Rates only fall as rows are appended, so with
+        # previous (data then holds the appended rows) its rows still below
+        # the new rates are kept and only data is drawn, which gives the
+        # sample a build over all the rows would.
+        start = 0 if previous is None else previous.n_rows
+        # Strata are numbered in order of first appearance, the known ones first
+        known = 0 if previous is None else len(previous.strata)
+        keys = data[STRATA] if previous is None else pd.concat([previous.strata, data[STRATA]], ignore_index=True)
+        all_codes = keys.groupby(STRATA, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        codes = all_codes[known:]
+        strata = keys.iloc[np.sort(np.unique(all_codes, return_index=True)[1])].reset_index(drop=True)
+
+        population = np.bincount(codes, minlength=len(strata))
+        if previous is not None:
+            population[:len(previous.population)] += previous.population
+        n_rows = start + len(data)
+        rate = np.minimum(np.maximum(SAMPLE_ROWS / max(n_rows, 1), MIN_STRATUM_ROWS / np.maximum(population, 1)), 1.0)
+
+        draws = _row_draws(start, len(data), random_state)
+        picked = np.flatnonzero(draws < rate[codes])
+        rows = data.iloc[picked].reset_index(drop=True)
+        rows['Admission Month'] = rows['Date of Admission'].dt.month
+        stratum, draws = codes[picked], draws[picked]
+        if previous is not None:
+            kept = np.flatnonzero(previous.draws < rate[previous.stratum])
+            rows = concat_frames([previous.rows.iloc[kept], rows]).reset_index(drop=True)
+            stratum = np.concatenate([previous.stratum[kept], stratum])
+            draws = np.concatenate([previous.draws[kept], draws])
+        return cls(rows, stratum, population, np.bincount(stratum, minlength=len(population)), strata, draws,
+                   n_rows)
+
+    def mask(self, filters=None, age_range=None):
+        # Same selections as olap_cube.rollup and FilterEngine.mask
+        mask = np.ones(len(self.rows), dtype=bool)
+        for column, values in (filters or {}).items():
+            mask &= self.rows[column].isin(list(values)).to_numpy()
+        if age_range is not None:
+            mask &= self.rows['Age'].between(*age_range).to_numpy()
+        return mask
+
+    def _totals(self, values, groups=None, n_groups=1):
+        # Estimated dataset totals of values per group and their variances,
+        # summed over strata; values are zero for rows outside the selection
+        cells = self.stratum * n_groups + (0 if groups is None else groups)
+        size = len(self.population) * n_groups
+        sums = np.bincount(cells, weights=values, minlength=size).reshape(-1, n_groups)
+        squares = np.bincount(cells, weights=values * values, minlength=size).reshape(-1, n_groups)
+        n = self.sampled[:, None].astype(float)
+        population = self.population[:, None].astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(n > 0, sums / n, 0.0)
+            spread = np.where(n > 1, (squares - n * mean ** 2) / (n - 1), 0.0)
+            variance = np.where(n > 0, population ** 2 * (1 - n / population) * spread / n, 0.0)
+        return (population * mean).sum(axis=0), variance.sum(axis=0)
+
+    def estimate(self, filters=None, age_range=None):
+        # The rollup() values the KPIs use, each with the half-width of its 95%
+        # confidence interval under "<name> Margin"
+        mask = self.mask(filters, age_range)
+        selected = mask.astype(float)
+        count, count_variance = self._totals(selected)
+        result = {'Count': count[0], 'Count Margin': CONFIDENCE_Z * np.sqrt(count_variance[0]),
+                  'Sample Rows': int(mask.sum())}
+        for measure in CUBE_MEASURES:
+            values = np.nan_to_num(self.rows[measure].to_numpy(dtype=float)) * selected
+            total, total_variance = self._totals(values)
+            mean = total[0] / count[0] if count[0] else np.nan
+            # Ratio estimator; its variance is linearized through the residuals
+            residual_variance = self._totals(values - np.nan_to_num(mean) * selected)[1][0]
+            result[f'{measure} Total'] = total[0]
+            result[f'{measure} Total Margin'] = CONFIDENCE_Z * np.sqrt(total_variance[0])
+            result[f'{measure} Mean'] = mean
+            result[f'{measure} Mean Margin'] = (CONFIDENCE_Z * np.sqrt(residual_variance) / count[0]
+                                                if count[0] else np.nan)
+
+        # Weighted Pearson correlation; the interval uses the matching sample
+        # rows and ignores the design effect of the stratification
+        weights = (self.population / np.maximum(self.sampled, 1))[self.stratum][mask]
+        billing = self.rows['Billing Amount'].to_numpy(dtype=float)[mask]
+        stay = self.rows['Length of Stay'].to_numpy(dtype=float)[mask]
+        correlation = np.nan
+        if mask.sum() > 3:
+            covariance = np.cov(billing, stay, aweights=weights)
+            correlation = covariance[0, 1] / np.sqrt(covariance[0, 0] * covariance[1, 1])
+        result['Billing Stay Correlation'] = correlation
+        result['Billing Stay Correlation Margin'] = (CONFIDENCE_Z * (1 - correlation ** 2)
+                                                     / np.sqrt(max(mask.sum() - 3, 1)))
+        return result
+
+    def estimate_counts(self, by, filters=None, age_range=None):
+        # Estimated rows per value of a column, with the margins of their 95%
+        # intervals, for all values at once
+        mask = self.mask(filters, age_range)
+        codes, values = self.rows[by].factorize()
+        selected = (mask & (codes >= 0)).astype(float)
+        counts, variances = self._totals(selected, groups=np.maximum(codes, 0), n_groups=max(len(values), 1))
+        sample_rows = np.bincount(codes[selected > 0], minlength=len(values))
+        observed = sample_rows > 0
+        return pd.DataFrame({
+            'Count': counts[:len(values)][observed],
+            'Count Margin': CONFIDENCE_Z * np.sqrt(variances[:len(values)][observed]),
+            'Sample Rows': sample_rows[observed]
+        }, index=pd.Index(values[observed], name=by))
+
+
+def _row_draws(start, n, random_state):
+    # Uniform draws for the rows at positions start..start + n, each a hash
+    # of its position (splitmix64), so a row's draw does not depend on how
+    # the rows were read
+    state = np.arange(start, start + n, dtype=np.uint64) + np.uint64(random_state << 32)
+    state *= np.uint64(0x9E3779B97F4A7C15)
+    state = (state ^ (state >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    state = (state ^ (state >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    state ^= state >> np.uint64(31)
+    return (state >> np.uint64(11)) * 2.0 ** -53
+
+
+def load_sample():
+    # The sample pages estimate from in approximate mode, or None. Pages load
+    # it first, so estimates left over from an interrupted run are dropped.
+    _release(getattr(_pending, 'slots', []))
+    _pending.slots = []
+    if not APPROXIMATE:
+        return None
+    return get_derived('sample', StratifiedSample.build, SAMPLE_COLUMNS)
+
+
+def _refinement(name, state, exact):
+    key = figure_key(name, state)
+    with _refined_lock:
+        future = _refined.get(key)
+        if future is None or future.cancelled() or (future.done() and future.exception() is not None):
+            future = _refined[key] = _refine_pool.submit(exact)
+            while len(_refined) > REFINED_ENTRIES:
+                _refined.popitem(last=False)
+        _refined.move_to_end(key)
+    return future
+
+
+def _release(slots):
+    with _refined_lock:
+        for future in {future for future, _ in slots}:
+            _waiting[future] -= 1
+            if _waiting[future] <= 0:
+                del _waiting[future]
+                future.cancel()
+
+
+def progressive(name, state, exact, estimate, show):
+    # show(result, approximate) fills st.empty() placeholders with the exact
+    # result, or with the estimate and its margins. The estimate is shown
+    # first and replaced by the exact values in refine_estimates(), once the
+    # rest of the page has been drawn; exact results are cached per name and
+    # filter state. Only elements are replaced, never containers: Streamlit
+    # merges a placeholder's repeated deltas and would drop a refilled one.
+    if estimate is None:
+        show(exact(), False)
+        return
+    future = _refinement(name, state, exact)
+    if future.done():
+        show(future.result(), False)
+        return
+    with section(f'estimate {name}'):
+        show(estimate(), True)
+    with _refined_lock:
+        if all(future is not waited for waited, _ in _pending.slots):
+            _waiting[future] += 1
+    _pending.slots.append((future, show))
+
+
+def refine_estimates():
+    # Waits for the exact values of the estimates on the page, placing each
+    # as soon as it is computed
+    slots, _pending.slots = getattr(_pending, 'slots', []), []
+    shows = {}
+    for future, show in slots:
+        shows.setdefault(future, []).append(show)
+    # A rerun for new filters stops the script at its next element, and the
+    # refinements it leaves unfinished are released with the others
+    try:
+        with section('refine estimates'):
+            for future in as_completed(shows):
+                for show in shows[future]:
+                    show(future.result(), False)
+    finally:
+        _release(slots)
+
+
+def approximately(text, approximate):
+    return f'≈ {text}' if approximate else text
+
+
+def show_margin(target, result, column, template, approximate):
+    # The margin under an estimate, cleared once the exact value is shown
+    if not approximate:
+        target.empty()
+        return
+    target.caption(f"± {template.format(result[column + ' Margin'])} (95% confidence, "
+                   f"{result['Sample Rows']:,} sampled rows)")
@@ -0,0 +1,121 @@
+import json
+import subprocess
+import sys
+
+from bench_pages import ROOT, dataset
+
+# The pages' column lists, imported here so the measured interpreters do not
+# load the pages and Streamlit
+sys.path.insert(0, ROOT)
+from financial_dashboard import FINANCIAL_COLUMNS, SCATTER_ROW_LIMIT
+from hospital_statistics_dashboard import STATISTICS_COLUMNS
+
+SIZES = [100000, 1000000]
+BACKENDS = ['pandas', 'sqlite']
+
+# Times the query mixes are repeated after the first, cold pass
+REPEATS = 5
+
+# Hospitals selected by each query mix: the pages' default of every hospital,
+# and a drill-down into one, where push-down returns far fewer rows
+MIXES = {'all hospitals': None, 'one hospital': 1}
+
+# Each backend runs in a fresh interpreter so its open time and peak RSS are
+# its own. A query mix is what the Hospital Statistics and Financial pages
+# ask for with the mix's hospitals selected; the first pass includes building
+# or loading whatever the backend keeps between reruns. The backends draw the
+# scatter's sample differently, so it is timed but not compared.
+MEASURE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+from query_backend import get_backend
+
+STATISTICS_COLUMNS = {statistics_columns!r}
+FINANCIAL_COLUMNS = {financial_columns!r}
+SCATTER_ROW_LIMIT = {scatter_row_limit!r}
+
+def queries(backend, n_hospitals):
+    hospitals = backend.options('Hospital Names')[:n_hospitals]
+    insurance = backend.linked_options('Hospital Names', hospitals, 'Insurance Provider')
+    statistics = {{'Gender': backend.options('Gender'), 'Hospital Names': hospitals}}
+    financial = {{'Hospital Names': hospitals, 'Insurance Provider': insurance}}
+    ages = {{'Age': (20, 60)}}
+    backend.sample(FINANCIAL_COLUMNS, SCATTER_ROW_LIMIT, 'Medical Condition', financial,
+                   outlier_columns=['Billing Amount', 'Length of Stay'])
+    return {{
+        'admission counts': backend.rollup(by='Admission Type', filters=statistics, age_range=(20, 60))['Count'].sum(),
+        'statistics preview': len(backend.head(STATISTICS_COLUMNS, statistics, ages)),
+        'age counts': backend.value_counts('Age', statistics, ages).sum(),
+        'stay counts': backend.value_counts('Length of Stay', statistics, ages).sum(),
+        'financial total': backend.rollup(filters=financial)['Billing Amount Total'],
+        'insurance metrics': len(backend.rollup(by='Insurance Provider', filters=financial)),
+        'billing medians': sum(box['median'] for box in backend.box_summaries('Billing Amount', 'Admission Type',
+                                                                               financial))
+    }}
+
+start = time.perf_counter()
+backend = get_backend({backend!r}, {path!r})
+opened = time.perf_counter() - start
+results = {{}}
+for mix, n_hospitals in {mixes!r}.items():
+    start = time.perf_counter()
+    answers = queries(backend, n_hospitals)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range({repeats}):
+        queries(backend, n_hospitals)
+    warm = (time.perf_counter() - start) / {repeats}
+    results[mix] = {{
+        'first_seconds': first,
+        'warm_seconds': warm,
+        'answers': {{name: float(value) for name, value in answers.items()}}
+    }}
+
+print(json.dumps({{
+    'open_seconds': opened,
+    'mixes': results,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+"""
+
+
+def measure(path, backend):
+    script = MEASURE.format(root=ROOT, path=path, backend=backend, repeats=REPEATS, mixes=MIXES,
+                           statistics_columns=STATISTICS_COLUMNS, financial_columns=FINANCIAL_COLUMNS,
+                           scatter_row_limit=SCATTER_ROW_LIMIT)
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    args = sys.argv[1:]
+    sizes = [int(arg) for arg in args if arg.isdigit()] or SIZES
+    backends = [arg for arg in args if arg in BACKENDS] or BACKENDS
+
+    failed = False
+    for n_rows in sizes:
+        path = dataset(n_rows)
+        # The database is built once beforehand, as the warm-up does at startup
+        subprocess.run([sys.executable, 'query_backend.py', path], cwd=ROOT, check=True, capture_output=True)
+        print(f'\n{n_rows:,} rows')
+        print(f"{'Backend':<10}{'Query mix':<16}{'Open (s)':>10}{'First (s)':>11}{'Warm (s)':>10}"
+              f"{'Peak RSS (MB)':>16}  Answers")
+        expected = {}
+        for backend in backends:
+            result = measure(path, backend)
+            for mix, timings in result['mixes'].items():
+                # Every backend has to give the same answers as the first one
+                answers = timings['answers']
+                reference = expected.setdefault(mix, answers)
+                agree = all(abs(answers[name] - value) <= 1e-6 * max(abs(value), 1)
+                            for name, value in reference.items())
+                failed = failed or not agree
+                print(f"{backend:<10}{mix:<16}{result['open_seconds']:>10.2f}{timings['first_seconds']:>11.2f}"
+                      f"{timings['warm_seconds']:>10.3f}{result['rss_mb']:>16.1f}  {'ok' if agree else 'MISMATCH'}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
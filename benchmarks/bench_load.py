@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from financial_dashboard import FINANCIAL_COLUMNS
+from patient_dashboard import PATIENT_COLUMNS
+from snapshot import ensure_snapshot
+
+# Each measurement runs in a fresh interpreter so the load is cold and the
+# peak RSS belongs to that load path alone
+LOADERS = {
+    'read_csv': "data = read_csv_dataset(path)",
+    'snapshot': "data = read_snapshot(snapshot_path(path))",
+    'snapshot (patient columns)': f"data = read_snapshot(snapshot_path(path), {PATIENT_COLUMNS!r})",
+    'snapshot (financial columns)': f"data = read_snapshot(snapshot_path(path), {FINANCIAL_COLUMNS!r})",
+}
+
+MEASURE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+from snapshot import read_csv_dataset, read_snapshot, snapshot_path
+path = {path!r}
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+{loader}
+elapsed = time.perf_counter() - start
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': elapsed, 'rss_mb': (rss_after - rss_before) / 1024, 'rows': len(data)}}))
+"""
+
+
+def measure(path, loader):
+    script = MEASURE.format(root=ROOT, path=os.path.abspath(path), loader=loader)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, 'healthcare_dataset 2.csv')
+    ensure_snapshot(path)
+
+    print(f"{'Loader':<30}{'Rows':>10}{'Cold load (s)':>16}{'Peak RSS (MB)':>16}")
+    for name, loader in LOADERS.items():
+        result = measure(path, loader)
+        print(f"{name:<30}{result['rows']:>10}{result['seconds']:>16.3f}{result['rss_mb']:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
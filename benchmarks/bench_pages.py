@@ -0,0 +1,225 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+# Building the 10M-row snapshot alone takes more than the 6 GB of the machine
+# the baseline was recorded on, so that size has no baseline yet and its
+# pages are only reported
+SIZES = [10000, 100000, 1000000, 10000000]
+DATA_DIR = os.path.join(BENCHMARKS, 'data')
+BASELINE_PATH = os.path.join(BENCHMARKS, 'baseline.json')
+
+# A page is reported as a regression when a measurement exceeds its baseline
+# by this factor and by more than the absolute slack, which absorbs the
+# run-to-run noise of small pages
+REGRESSION_RATIO = 1.25
+REGRESSION_SLACK = {'seconds': 1.0, 'rss_mb': 50, 'payload_bytes': 16384}
+
+# The baseline is recorded on one machine, which it names under MACHINE_KEY
+# together with how long CALIBRATION took there (best of CALIBRATION_RUNS).
+# Baseline seconds are scaled by the ratio of this machine's calibration
+# time to that one before comparing; RSS and payload do not depend on it.
+MACHINE_KEY = 'machine'
+CALIBRATION_RUNS = 5
+CALIBRATION = """
+import time
+import numpy as np
+import pandas as pd
+rng = np.random.default_rng(0)
+best = float('inf')
+for _ in range({runs}):
+    start = time.perf_counter()
+    frame = pd.DataFrame({{'group': rng.integers(0, 1000, 1000000), 'value': rng.random(1000000)}})
+    frame.groupby('group')['value'].agg(['mean', 'median'])
+    frame.sort_values('value')
+    best = min(best, time.perf_counter() - start)
+print(best)
+"""
+
+# Page name -> module and function rendering it
+PAGES = {
+    'Hospital Statistics': 'hospital_statistics_dashboard',
+    'Main Dashboard': 'main_dashboard',
+    'Financial Dashboard': 'financial_dashboard',
+    'Patient Dashboard': 'patient_dashboard',
+    'BioStats Research Dashboard': 'biostats_research_dashboard'
+}
+
+# The patient page renders nothing heavy until an ID is entered
+PATIENT_ID = '1'
+
+# Each page runs in a fresh interpreter so its time and peak RSS are its own.
+# Payload is the serialized size of every element sent to the browser plus
+# the media files (rendered images) they reference, grouped by the title or
+# header that opens each section.
+MEASURE = """
+import json, re, resource, sys, time
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+sys.path.insert(0, {root!r})
+
+media_sizes = {{}}
+load_and_get_id = MemoryMediaFileStorage.load_and_get_id
+def recording_load_and_get_id(self, path_or_data, mimetype, kind, filename=None):
+    file_id = load_and_get_id(self, path_or_data, mimetype, kind, filename)
+    if isinstance(path_or_data, bytes):
+        media_sizes[file_id] = len(path_or_data)
+    return file_id
+MemoryMediaFileStorage.load_and_get_id = recording_load_and_get_id
+
+def payload(node):
+    data = node.proto.SerializeToString() if getattr(node, 'proto', None) is not None else b''
+    size = len(data) + sum(media_sizes.get(file_id.decode(), 0)
+                           for file_id in set(re.findall(rb'/media/([0-9a-f]+)\\.', data)))
+    return size + sum(payload(child) for child in getattr(node, 'children', {{}}).values())
+
+app = AppTest.from_string('from {module} import {module}\\n{module}()', default_timeout=3600)
+start = time.perf_counter()
+app.run()
+if {patient_id!r} is not None and not app.exception and app.text_input:
+    app.text_input[0].input({patient_id!r}).run()
+elapsed = time.perf_counter() - start
+
+sections = {{}}
+section = '(page start)'
+for node in app.main.children.values():
+    if getattr(node, 'type', None) in ('title', 'header', 'subheader'):
+        section = node.value
+    elif getattr(node, 'type', None) == 'markdown' and node.value.startswith('#'):
+        section = node.value.lstrip('# ')
+    sections[section] = sections.get(section, 0) + payload(node)
+
+print(json.dumps({{
+    'seconds': elapsed,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'payload_bytes': sum(sections.values()),
+    'sections': sections,
+    'exceptions': [str(exception.value) for exception in app.exception]
+}}))
+"""
+
+
+def dataset(n_rows):
+    # Generated once per size and kept for later runs, together with its
+    # snapshot. Both run in child processes: peak RSS is inherited across
+    # fork, so this process has to stay small for the page measurements.
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'admissions_{n_rows}.csv')
+    if not os.path.exists(path):
+        subprocess.run([sys.executable, os.path.join(BENCHMARKS, 'generate_data.py'), str(n_rows), path],
+                       check=True)
+    subprocess.run([sys.executable, '-c', f'from snapshot import ensure_snapshot; ensure_snapshot({path!r})'],
+                   cwd=ROOT, check=True)
+    return path
+
+
+def measure(path, module):
+    patient_id = PATIENT_ID if module == 'patient_dashboard' else None
+    script = MEASURE.format(root=ROOT, module=module, patient_id=patient_id)
+    env = dict(os.environ, HOSPITAL_DATA_PATH=path)
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def machine():
+    # Run in a child process for the same reason as the datasets
+    output = subprocess.run([sys.executable, '-c', CALIBRATION.format(runs=CALIBRATION_RUNS)],
+                            capture_output=True, text=True, check=True)
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'calibration_seconds': float(output.stdout.strip().splitlines()[-1])
+    }
+
+
+def _regressed(value, expected, metric):
+    return value > REGRESSION_RATIO * expected and value - expected > REGRESSION_SLACK[metric]
+
+
+def compare(result, baseline, speed=1.0):
+    # The totals and every section payload are checked against the baseline,
+    # its seconds scaled by speed (this machine's calibration time over the
+    # baseline machine's)
+    regressions = []
+    for metric in ('seconds', 'rss_mb', 'payload_bytes'):
+        expected = baseline.get(metric)
+        if expected is not None and metric == 'seconds':
+            expected *= speed
+        if expected is not None and _regressed(result[metric], expected, metric):
+            regressions.append(f'{metric} {result[metric]:.1f} vs {expected:.1f}')
+    for section, size in result['sections'].items():
+        expected = baseline.get('sections', {}).get(section)
+        if expected is not None and _regressed(size, expected, 'payload_bytes'):
+            regressions.append(f'payload of "{section}" {size:,} vs {expected:,} bytes')
+    return regressions
+
+
+def main():
+    args = sys.argv[1:]
+    update_baseline = '--update-baseline' in args
+    sizes = [int(arg) for arg in args if arg.isdigit()] or SIZES
+    pages = [arg for arg in args if arg in PAGES] or list(PAGES)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as source:
+            baseline = json.load(source)
+
+    current = machine()
+    recorded = baseline.get(MACHINE_KEY)
+    speed = 1.0
+    if recorded:
+        speed = current['calibration_seconds'] / recorded['calibration_seconds']
+        print(f"Baseline machine: {recorded['platform']}, {recorded['cpus']} CPUs, Python {recorded['python']}; "
+              f"baseline seconds scaled by {speed:.2f} for this machine")
+
+    failed = False
+    updated = set()
+    for n_rows in sizes:
+        path = dataset(n_rows)
+        print(f'\n{n_rows:,} rows')
+        print(f"{'Page':<30}{'Wall (s)':>10}{'Peak RSS (MB)':>16}{'Payload (KB)':>15}  Baseline")
+        for page in pages:
+            result = measure(path, PAGES[page])
+            expected = baseline.get(str(n_rows), {}).get(page)
+            if result['exceptions']:
+                status = 'ERROR: ' + result['exceptions'][0].splitlines()[0]
+            elif expected is None:
+                status = 'no baseline'
+            else:
+                regressions = compare(result, expected, speed)
+                status = 'REGRESSION: ' + '; '.join(regressions) if regressions else 'ok'
+            failed = failed or status.startswith(('ERROR', 'REGRESSION'))
+            print(f"{page:<30}{result['seconds']:>10.2f}{result['rss_mb']:>16.1f}"
+                  f"{result['payload_bytes'] / 1024:>15.1f}  {status}")
+            for section, size in result['sections'].items():
+                print(f"    {section:<64}{size / 1024:>12.1f} KB")
+            if update_baseline and not result['exceptions']:
+                baseline.setdefault(str(n_rows), {})[page] = result
+                updated.add((str(n_rows), page))
+
+    if update_baseline:
+        # The baseline now belongs to this machine: entries that were not
+        # measured again are scaled to it
+        for size, results in baseline.items():
+            for page, result in results.items():
+                if size != MACHINE_KEY and (size, page) not in updated:
+                    result['seconds'] *= speed
+        baseline[MACHINE_KEY] = current
+        with open(BASELINE_PATH, 'w') as target:
+            json.dump(baseline, target, indent=2, sort_keys=True)
+        print(f'\nBaseline written to {BASELINE_PATH}')
+    elif failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import stats
+
+from bench_pages import ROOT
+
+sys.path.insert(0, ROOT)
+
+from significance import anova, chi_square, pairwise_welch
+
+# Groups compared pairwise in one batch: n groups make n(n-1)/2 tests, so the
+# largest size is about 500,000 comparisons
+SIZES = [100, 300, 1000]
+
+# Seconds a batch may take, comparisons and correction included, to count as
+# interactive
+BUDGET_SECONDS = float(os.environ.get('SIGNIFICANCE_BUDGET_SECONDS', 2.0))
+
+# Pairs and families checked against scipy's per-test functions
+CHECKED = 200
+
+
+def groups(n_groups, rng):
+    # Sufficient statistics of groups of normally distributed rows, with
+    # means and sizes varying by group
+    count = rng.integers(20, 2000, n_groups).astype(float)
+    mean = rng.normal(25000, 500, n_groups)
+    spread = rng.uniform(5000, 15000, n_groups)
+    total = count * mean
+    sumsq = (count - 1) * spread ** 2 + count * mean ** 2
+    return count, total, sumsq, mean, spread
+
+
+def check(count, mean, spread, tests, rng):
+    # The batched results have to match scipy test by test
+    picked = rng.choice(len(tests), min(CHECKED, len(tests)), replace=False)
+    left, right = tests['Left'].to_numpy()[picked], tests['Right'].to_numpy()[picked]
+    reference = stats.ttest_ind_from_stats(mean[left], spread[left], count[left],
+                                           mean[right], spread[right], count[right], equal_var=False)
+    return (np.allclose(tests['t'].to_numpy()[picked], reference.statistic, rtol=1e-6)
+            and np.allclose(tests['p'].to_numpy()[picked], reference.pvalue, rtol=1e-5, atol=1e-12))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or SIZES
+    rng = np.random.default_rng(0)
+    failed = False
+
+    print(f"{'Groups':>8}{'Comparisons':>14}{'Pairwise (s)':>14}{'ANOVA (s)':>12}{'Chi-square (s)':>16}  Check")
+    for n_groups in sizes:
+        count, total, sumsq, mean, spread = groups(n_groups, rng)
+        families = rng.integers(0, max(n_groups // 10, 1), n_groups)
+        tables = rng.integers(0, 500, (n_groups, 6, 3))
+
+        start = time.perf_counter()
+        tests = pairwise_welch(count, total, sumsq)
+        pairwise_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        f = anova(count, total, sumsq, families)[0]
+        anova_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        statistic = chi_square(tables)[0]
+        chi_square_seconds = time.perf_counter() - start
+
+        agree = check(count, mean, spread, tests, rng)
+        family = families[0]
+        members = families == family
+        samples = [rng.normal(m, s, int(c)) for m, s, c in zip(mean[members], spread[members], count[members])]
+        sample_f = anova([len(x) for x in samples], [x.sum() for x in samples], [(x ** 2).sum() for x in samples])[0]
+        agree = agree and np.isclose(sample_f[0], stats.f_oneway(*samples).statistic, rtol=1e-6)
+        agree = agree and np.isclose(statistic[0], stats.chi2_contingency(tables[0], correction=False).statistic)
+        agree = agree and np.isfinite(f).any()
+
+        slow = pairwise_seconds + anova_seconds + chi_square_seconds > BUDGET_SECONDS
+        failed = failed or slow or not agree
+        print(f'{n_groups:>8,}{len(tests):>14,}{pairwise_seconds:>14.3f}{anova_seconds:>12.4f}'
+              f"{chi_square_seconds:>16.4f}  {'ok' if agree else 'MISMATCH'}{' OVER BUDGET' if slow else ''}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Category values and ranges of healthcare_dataset 2.csv
+HOSPITALS = ['Lakeview', 'Valley Medical', 'Mercy General', 'City Hospital', 'St. Luke', 'Northside']
+INSURERS = ['UnitedHealthcare', 'Aetna', 'Medicare', 'Cigna', 'Blue Cross']
+CONDITIONS = ['Cancer', 'Diabetes', 'Arthritis', 'Obesity', 'Asthma', 'Hypertension']
+ADMISSION_TYPES = ['Elective', 'Emergency', 'Urgent']
+MEDICATIONS = ['Lipitor', 'Ibuprofen', 'Penicillin', 'Paracetamol', 'Aspirin']
+TEST_RESULTS = ['Abnormal', 'Normal', 'Inconclusive']
+BLOOD_TYPES = ['O+', 'A+', 'B-', 'AB+']
+GENDERS = ['Female', 'Male']
+FIRST_ADMISSION = pd.Timestamp('2019-05-01')
+ADMISSION_DAYS = 1800
+MAX_STAY_DAYS = 30
+DOCTORS = 500
+
+# The source has about 2.3 admissions per patient ID
+VISITS_PER_PATIENT = 2.3
+
+# Rows generated and written at a time, so 10M-row files fit in memory
+CHUNK_ROWS = 1000000
+
+
+def generate_chunk(rng, n_rows, n_patients):
+    ids = rng.integers(1, n_patients + 1, n_rows)
+    admitted = FIRST_ADMISSION + pd.to_timedelta(rng.integers(0, ADMISSION_DAYS, n_rows), unit='D')
+    discharged = admitted + pd.to_timedelta(rng.integers(1, MAX_STAY_DAYS + 1, n_rows), unit='D')
+    return pd.DataFrame({
+        'Name': 'Pat ' + pd.Series(ids).astype(str),
+        'Age': rng.integers(13, 90, n_rows),
+        'Gender': rng.choice(GENDERS, n_rows),
+        'Blood Type': rng.choice(BLOOD_TYPES, n_rows),
+        'Medical Condition': rng.choice(CONDITIONS, n_rows),
+        'Date of Admission': admitted.strftime('%Y-%m-%d'),
+        'Doctor': 'Dr ' + pd.Series(rng.integers(0, DOCTORS, n_rows)).astype(str),
+        'Hospital Names': rng.choice(HOSPITALS, n_rows),
+        'Insurance Provider': rng.choice(INSURERS, n_rows),
+        'Billing Amount': rng.uniform(100, 50000, n_rows).round(2),
+        'Room Number': rng.integers(100, 500, n_rows),
+        'Admission Type': rng.choice(ADMISSION_TYPES, n_rows),
+        'Discharge Date': discharged.strftime('%Y-%m-%d'),
+        'Medication': rng.choice(MEDICATIONS, n_rows),
+        'Test Results': rng.choice(TEST_RESULTS, n_rows),
+        'ID': ids
+    })
+
+
+def generate(n_rows, path, seed=0):
+    rng = np.random.default_rng(seed)
+    n_patients = max(int(n_rows / VISITS_PER_PATIENT), 1)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    for start in range(0, n_rows, CHUNK_ROWS):
+        chunk = generate_chunk(rng, min(CHUNK_ROWS, n_rows - start), n_patients)
+        chunk.to_csv(tmp_path, mode='a' if start else 'w', header=start == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit('usage: generate_data.py ROWS OUTPUT.csv [SEED]')
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    print(f'Wrote {generate(int(sys.argv[1]), sys.argv[2], seed)}')
@@ -0,0 +1,131 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from bench_pages import PAGES, ROOT, dataset
+
+# Reruns per page and the RSS growth allowed after the warm-up, in MB. RSS
+# swings by tens of MB from one rerun to the next as the allocator reuses
+# memory, so growth is the slope of a least-squares line through every sample
+# after the warm-up times the number of samples; a leak grows with every rerun
+# and tilts the line however the samples swing.
+RERUNS = 2000
+WARMUP_RERUNS = 100
+RSS_GROWTH_BUDGET_MB = float(os.environ.get('RSS_GROWTH_BUDGET_MB', 64))
+
+# Fewer samples after the warm-up than this cannot tell a trend from the
+# swings, and the soak fails rather than pass on noise
+MIN_SAMPLES = 500
+
+# Rows of the generated dataset; the soak is about reruns, not data size
+SOAK_ROWS = 10000
+
+# A small figure cache, so the cache filling up to its budget does not count
+# as growth; every rerun uses a new filter state and renders its charts again
+FIGURE_CACHE_MB = 8
+
+# Each rerun changes the page's filters to a state not seen before: the age
+# range slider on the pages that have one, the hospitals and insurance
+# providers on the financial page, the admission dates on the BioStats page
+# and the patient ID on the patient page. Current RSS is read from /proc, so
+# the soak runs on Linux.
+MEASURE = """
+import datetime, json, os, sys
+from streamlit.testing.v1 import AppTest
+sys.path.insert(0, {root!r})
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+def vary(app, i):
+    if {module!r} == 'patient_dashboard':
+        app.text_input[0].input(str(i % 4000 + 1))
+    elif app.sidebar.slider:
+        # Walks through steps * steps distinct (low, high) ranges
+        slider = app.sidebar.slider[0]
+        steps = int(slider.max - slider.min) // 3
+        slider.set_value((slider.min + i % steps, slider.max - i // steps % steps))
+    elif app.sidebar.multiselect:
+        # Walks through the non-empty subsets of every multiselect's options
+        for multiselect in app.sidebar.multiselect:
+            subsets = 2 ** len(multiselect.options) - 1
+            subset, i = i % subsets + 1, i // subsets
+            multiselect.set_value([option for bit, option in enumerate(multiselect.options) if subset >> bit & 1])
+    elif app.slider:
+        # Date sliders keep their bounds in microseconds since the epoch
+        slider = app.slider[0]
+        first = datetime.date(1970, 1, 1) + datetime.timedelta(microseconds=slider.min)
+        last = datetime.date(1970, 1, 1) + datetime.timedelta(microseconds=slider.max)
+        steps = (last - first).days // 3
+        slider.set_value((first + datetime.timedelta(days=i % steps), last - datetime.timedelta(days=i // steps % steps)))
+
+app = AppTest.from_string('from {module} import {module}\\n{module}()', default_timeout=3600)
+app.run()
+samples = []
+for i in range({reruns}):
+    vary(app, i)
+    app.run()
+    if app.exception:
+        break
+    if i + 1 >= {warmup}:
+        samples.append(rss_mb())
+
+print(json.dumps({{
+    'reruns': i + 1,
+    'rss_mb': samples,
+    'exceptions': [str(exception.value) for exception in app.exception]
+}}))
+"""
+
+
+def soak(path, module, reruns):
+    script = MEASURE.format(root=ROOT, module=module, reruns=reruns, warmup=min(WARMUP_RERUNS, reruns))
+    env = dict(os.environ, HOSPITAL_DATA_PATH=path, DASHBOARD_FIGURE_CACHE_MB=str(FIGURE_CACHE_MB))
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def assess(result):
+    # The fitted RSS at the first and last sample after the warm-up, its
+    # slope per rerun, and the soak's status
+    samples = result['rss_mb']
+    slope = start = end = 0.0
+    if len(samples) > 1:
+        slope, start = statistics.linear_regression(range(len(samples)), samples)
+        end = start + slope * len(samples)
+    if result['exceptions']:
+        status = 'ERROR: ' + result['exceptions'][0].splitlines()[0]
+    elif len(samples) < MIN_SAMPLES:
+        status = f'ERROR: {len(samples)} samples after the warm-up, {MIN_SAMPLES} needed'
+    elif end - start > RSS_GROWTH_BUDGET_MB:
+        status = f'LEAK: over the {RSS_GROWTH_BUDGET_MB:.0f} MB budget'
+    else:
+        status = 'ok'
+    return start, end, slope, status
+
+
+def main():
+    args = sys.argv[1:]
+    reruns = next((int(arg) for arg in args if arg.isdigit()), RERUNS)
+    pages = [arg for arg in args if arg in PAGES] or list(PAGES)
+    path = dataset(SOAK_ROWS)
+
+    failed = False
+    print(f"{'Page':<30}{'Reruns':>8}{'RSS start (MB)':>16}{'RSS end (MB)':>14}{'Growth (MB)':>13}{'MB/1k reruns':>14}  Status")
+    for page in pages:
+        result = soak(path, PAGES[page], reruns)
+        start, end, slope, status = assess(result)
+        growth = end - start
+        failed = failed or status != 'ok'
+        print(f"{page:<30}{result['reruns']:>8}{start:>16.1f}{end:>14.1f}{growth:>13.1f}{slope * 1000:>14.2f}  {status}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold start budget for the first render of the default page, in seconds
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 8.0))
+
+# Slowest top-level imports listed in the breakdown
+TOP_IMPORTS = 15
+
+# Written to stderr once the harness is loaded; import timings start after it
+MARKER = 'startup-report: app start'
+
+# Libraries that only the pages using them should load
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'matplotlib', 'seaborn', 'plotly.express',
+                 'plotly.graph_objects', 'scipy', 'statsmodels']
+
+# The testing harness is imported before the clock starts so only the app is timed
+MEASURE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+sys.path.insert(0, {root!r})
+sys.stderr.write({marker!r} + '\\n')
+before = set(sys.modules)
+start = time.perf_counter()
+app = AppTest.from_file({script!r}, default_timeout=600)
+app.run()
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules and name not in before]
+print(json.dumps({{'seconds': elapsed, 'exceptions': len(app.exception), 'loaded': loaded}}))
+"""
+
+
+def import_breakdown(stderr):
+    # -X importtime lines are "self | cumulative | name"; names without
+    # indentation are the imports made directly by the app
+    timings = {}
+    for line in stderr.split(MARKER, 1)[-1].splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('  '):
+            continue
+        timings[name.strip()] = int(cumulative) / 1e6
+    return sorted(timings.items(), key=lambda item: item[1], reverse=True)
+
+
+def measure(data_dir):
+    script = MEASURE.format(root=ROOT, script=os.path.join(ROOT, 'main_app.py'), heavy=HEAVY_MODULES,
+                           marker=MARKER)
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=data_dir,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1]), import_breakdown(output.stderr)
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else ROOT
+    result, breakdown = measure(data_dir)
+
+    print(f"{'Import':<40}{'Cumulative (s)':>16}")
+    for name, seconds in breakdown[:TOP_IMPORTS]:
+        print(f"{name:<40}{seconds:>16.3f}")
+    print()
+    print(f"Heavy modules loaded by the default page: {', '.join(result['loaded']) or 'none'}")
+    print(f"Cold start: {result['seconds']:.2f}s (budget {STARTUP_BUDGET_SECONDS:.2f}s)")
+
+    if result['exceptions']:
+        print('The default page raised an exception')
+        sys.exit(1)
+    if result['seconds'] > STARTUP_BUDGET_SECONDS:
+        print('Cold start is over budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
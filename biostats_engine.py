@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from significance import adjust, anova, chi_square, pairwise_welch
+from snapshot import concat_frames
+
+BIOSTATS_COLUMNS = ['Hospital Names', 'Medical Condition', 'Admission Type', 'Billing Amount',
+                    'Length of Stay', 'Test Results']
+CELL_KEYS = ['Hospital Names', 'Medical Condition', 'Admission Type']
+CELL_MEASURES = ['Billing Amount', 'Length of Stay', 'Efficiency Ratio']
+TEST_RESULTS = ['Normal', 'Abnormal', 'Inconclusive']
+RESULT_COLUMNS = [f'{result} Results' for result in TEST_RESULTS]
+
+
+# Every per-hospital and per-hospital x condition metric of the biostats page,
+# and the significance tests comparing them, derived from one grouped pass
+# over hospital x condition x admission type
+class BiostatsAggregates:
+    def __init__(self, cells):
+        self.cells = cells
+
+    def _sums(self, keys):
+        return self.cells.groupby(keys, observed=True).sum(numeric_only=True)
+
+    def _roll(self, keys):
+        sums = self._sums(keys)
+        result = pd.DataFrame({'Patient Count': sums['Rows']}, index=sums.index)
+        for measure in CELL_MEASURES:
+            result[f'{measure} Mean'] = sums[f'{measure} Sum'] / sums[f'{measure} Count']
+        result['Success Rate'] = sums['Normal Results'] / sums['Rows'] * 100
+        return result
+
+    def hospital_metrics(self):
+        return self._roll('Hospital Names')
+
+    def billing_by_condition_and_admission(self):
+        return self._roll(['Medical Condition', 'Admission Type'])['Billing Amount Mean'].unstack()
+
+    def hospital_condition_counts(self):
+        counts = self._roll(['Hospital Names', 'Medical Condition'])['Patient Count']
+        return counts.unstack(fill_value=0)
+
+    def _families(self, sums, within):
+        # Family code of every group and the family labels; one family when
+        # within is None
+        if within is None:
+            return np.zeros(len(sums), dtype=int), pd.Index(['All'])
+        codes, labels = sums.index.get_level_values(within).factorize()
+        return codes, pd.Index(labels, name=within)
+
+    def anova(self, measure, across, within=None):
+        # Whether the mean of measure differs across the values of `across`,
+        # tested once per value of within; p-values are corrected together
+        sums = self._sums([across] if within is None else [within, across])
+        families, labels = self._families(sums, within)
+        f, df_between, df_within, p = anova(sums[f'{measure} Count'], sums[f'{measure} Sum'],
+                                            sums[f'{measure} Sumsq'], families)
+        adjusted, reject = adjust(p)
+        return pd.DataFrame({'F': f, 'df Between': df_between, 'df Within': df_within, 'p': p,
+                             'Adjusted p': adjusted, 'Significant': reject}, index=labels)
+
+    def test_results_by(self, across, within=None):
+        # Chi-square tests of independence between test results and the
+        # values of `across`, once per value of within
+        counts = self._sums([across] if within is None else [within, across])[RESULT_COLUMNS]
+        if within is None:
+            tables, labels = counts.to_numpy()[None], pd.Index(['All'])
+        else:
+            table = counts.unstack(across, fill_value=0)
+            tables = table.to_numpy().reshape(len(table), len(RESULT_COLUMNS), -1).transpose(0, 2, 1)
+            labels = table.index
+        statistic, dof, p = chi_square(tables)
+        adjusted, reject = adjust(p)
+        return pd.DataFrame({'Chi-square': statistic, 'df': dof, 'p': p, 'Adjusted p': adjusted,
+                             'Significant': reject}, index=labels)
+
+    def pairwise(self, measure, keys=('Hospital Names', 'Medical Condition'), within=None):
+        # Welch t-tests of measure between every pair of cells at keys, or
+        # only between cells sharing their value of within; all p-values are
+        # corrected together
+        sums = self._sums(list(keys))
+        families = None if within is None else self._families(sums, within)[0]
+        tests = pairwise_welch(sums[f'{measure} Count'], sums[f'{measure} Sum'], sums[f'{measure} Sumsq'],
+                               families)
+        # Labels are made once per cell and picked for both sides of each pair
+        labels = np.array([' / '.join(map(str, key)) if isinstance(key, tuple) else str(key)
+                           for key in sums.index], dtype=object)
+        tests['Left'], tests['Right'] = labels[tests['Left']], labels[tests['Right']]
+        return tests
+
+
+def build_biostats_aggregates(data, previous=None):
+    if previous is not None:
+        # data holds only the rows appended since previous was built
+        return merge_biostats_aggregates([previous, build_biostats_aggregates(data)])
+
+    frame = data[CELL_KEYS].assign(**{
+        'Billing Amount': data['Billing Amount'],
+        'Length of Stay': data['Length of Stay'],
+        'Efficiency Ratio': data['Length of Stay'] / (data['Billing Amount'] / 1000),
+        **{column: (data['Test Results'] == result).astype(int)
+           for result, column in zip(TEST_RESULTS, RESULT_COLUMNS)}
+    })
+    aggregations = {'Rows': ('Billing Amount', 'size')}
+    aggregations.update({column: (column, 'sum') for column in RESULT_COLUMNS})
+    for measure in CELL_MEASURES:
+        frame[f'{measure} Squared'] = frame[measure] ** 2
+        aggregations[f'{measure} Count'] = (measure, 'count')
+        aggregations[f'{measure} Sum'] = (measure, 'sum')
+        aggregations[f'{measure} Sumsq'] = (f'{measure} Squared', 'sum')
+
+    # Rows missing a key keep their cell, so the cells count every row folded in
+    cells = frame.groupby(CELL_KEYS, observed=True, dropna=False).agg(**aggregations).reset_index()
+    return BiostatsAggregates(cells)
+
+
+def merge_biostats_aggregates(parts):
+    # Aggregates of disjoint row sets add up cell by cell
+    cells = concat_frames([part.cells for part in parts])
+    cells = cells.groupby(CELL_KEYS, observed=True, dropna=False).sum().reset_index()
+    return BiostatsAggregates(cells)
+
+
+def concat_biostats_aggregates(parts):
+    # Aggregates of rows that differ in a cell key share no cell
+    return BiostatsAggregates(concat_frames([part.cells for part in parts]).reset_index(drop=True))
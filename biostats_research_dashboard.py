@@ -1,8 +1,15 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
+from biostats_engine import BIOSTATS_COLUMNS, CELL_MEASURES, build_biostats_aggregates
+from data_grid import paged_grid
+from data_loader import get_derived, load_stream_aggregates, streaming_mode
+from figure_cache import cached_pyplot, concurrent_charts
+from instrumentation import section
+from significance import ALPHA, CORRECTION
+from time_rollups import RESOLUTION_LABELS, TIMELINE_COLUMNS, build_timeline
 
 # Set page config at the very beginning
 #st.set_page_config(layout="wide")
@@ -10,139 +17,196 @@ import seaborn as sns
 def biostats_research_dashboard():
     #st.title("Advanced Hospital Analytics Dashboard")
     
-    data = pd.read_csv('healthcare_dataset 2.csv')
-    
-    # Data preprocessing
-    data['Billing Amount'] = pd.to_numeric(data['Billing Amount'], errors='coerce')
-    data['Date of Admission'] = pd.to_datetime(data['Date of Admission'])
-    data['Discharge Date'] = pd.to_datetime(data['Discharge Date'])
-    data['Length of Stay'] = (data['Discharge Date'] - data['Date of Admission']).dt.days
-    
-    # # 1. Hospital Performance Radar Chart
-    # st.header("Hospital Performance Multi-Metric Analysis")
-    
-    # metrics = {
-    #     'Success_Rate': data.groupby('Hospital Names')['Test Results'].apply(lambda x: (x == 'Normal').mean() * 100),
-    #     'Avg_Stay': data.groupby('Hospital Names')['Length of Stay'].mean(),
-    #     'Avg_Cost': data.groupby('Hospital Names')['Billing Amount'].mean(),
-    #     'Patient_Volume': data.groupby('Hospital Names').size()
-    # }
-    
-    # # Normalize metrics for radar chart
-    # hospital_metrics = pd.DataFrame(metrics)
-    # for column in hospital_metrics.columns:
-    #     hospital_metrics[column] = (hospital_metrics[column] - hospital_metrics[column].min()) / \
-    #                              (hospital_metrics[column].max() - hospital_metrics[column].min())
-    
-    # fig1, ax1 = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
-    # angles = np.linspace(0, 2*np.pi, len(metrics), endpoint=False)
-    # angles = np.concatenate((angles, [angles[0]]))  # complete the circle
-    
-    # for hospital in hospital_metrics.index:
-    #     values = hospital_metrics.loc[hospital].values
-    #     values = np.concatenate((values, [values[0]]))
-    #     ax1.plot(angles, values, 'o-', linewidth=2, label=hospital)
-    #     ax1.fill(angles, values, alpha=0.25)
-    
-    # ax1.set_xticks(angles[:-1])
-    # ax1.set_xticklabels(metrics.keys())
-    # ax1.set_title('Hospital Performance Metrics Comparison')
-    # ax1.legend(bbox_to_anchor=(1.3, 1.0))
-    # st.pyplot(fig1)
-    # plt.close(fig1)
+    with section("Load data"):
+        # Every metric on this page comes from one grouped pass over the data,
+        # cached per dataset version; in streaming mode it is folded chunk by chunk
+        if streaming_mode():
+            aggregates = load_stream_aggregates().biostats
+            timeline = load_stream_aggregates().timeline
+        else:
+            aggregates = get_derived('biostats', build_biostats_aggregates, BIOSTATS_COLUMNS)
+            timeline = get_derived('timeline', build_timeline, TIMELINE_COLUMNS)
+        hospital_metrics = aggregates.hospital_metrics()
+    
+    # The charts below are independent of one another, so the ones not cached
+    # yet are built concurrently and placed as they finish
+    with concurrent_charts():
+        with section("Hospital Performance Multi-Metric Analysis"):
+            # 1. Hospital Performance Radar Chart
+            st.header("Hospital Performance Multi-Metric Analysis")
+    
+            # The page has no filters, so each chart is rendered once per dataset version
+            def build_radar_chart():
+                metrics = {
+                    'Success_Rate': hospital_metrics['Success Rate'],
+                    'Avg_Stay': hospital_metrics['Length of Stay Mean'],
+                    'Avg_Cost': hospital_metrics['Billing Amount Mean'],
+                    'Patient_Volume': hospital_metrics['Patient Count']
+                }
+    
+                # Normalize metrics for radar chart
+                radar_metrics = pd.DataFrame(metrics)
+                for column in radar_metrics.columns:
+                    radar_metrics[column] = (radar_metrics[column] - radar_metrics[column].min()) / \
+                                            (radar_metrics[column].max() - radar_metrics[column].min())
+    
+                fig1 = Figure(figsize=(10, 10))
+                ax1 = fig1.subplots(subplot_kw=dict(projection='polar'))
+                angles = np.linspace(0, 2*np.pi, len(metrics), endpoint=False)
+                angles = np.concatenate((angles, [angles[0]]))  # complete the circle
+    
+                for hospital in radar_metrics.index:
+                    values = radar_metrics.loc[hospital].values
+                    values = np.concatenate((values, [values[0]]))
+                    ax1.plot(angles, values, 'o-', linewidth=2, label=hospital)
+                    ax1.fill(angles, values, alpha=0.25)
+    
+                ax1.set_xticks(angles[:-1])
+                ax1.set_xticklabels(metrics.keys())
+                ax1.set_title('Hospital Performance Metrics Comparison')
+                ax1.legend(bbox_to_anchor=(1.3, 1.0))
+                return fig1
+            cached_pyplot('hospital_radar', None, build_radar_chart)
 
-    # 2. Bubble Plot: Cost vs Stay Duration vs Patient Volume
-    st.header("Cost, Stay Duration, and Patient Volume Analysis")
-    
-    hospital_stats = pd.DataFrame({
-        'Avg_Cost': data.groupby('Hospital Names')['Billing Amount'].mean(),
-        'Avg_Stay': data.groupby('Hospital Names')['Length of Stay'].mean(),
-        'Patient_Count': data.groupby('Hospital Names').size()
-    })
-    
-    fig2, ax2 = plt.subplots(figsize=(12, 8))
-    scatter = ax2.scatter(hospital_stats['Avg_Cost'], 
-                         hospital_stats['Avg_Stay'],
-                         s=hospital_stats['Patient_Count']/10,  # Size based on patient count
-                         alpha=0.6,
-                         c=range(len(hospital_stats)),  # Color gradient
-                         cmap='viridis')
-    
-    # Add hospital labels
-    for idx, hospital in enumerate(hospital_stats.index):
-        ax2.annotate(hospital, 
-                    (hospital_stats['Avg_Cost'][idx], hospital_stats['Avg_Stay'][idx]),
-                    xytext=(5, 5), textcoords='offset points')
-    
-    ax2.set_xlabel('Average Cost ($)')
-    ax2.set_ylabel('Average Length of Stay (days)')
-    ax2.set_title('Hospital Performance Bubble Plot')
-    
-    # Add colorbar legend
-    plt.colorbar(scatter, label='Hospital Index')
-    st.pyplot(fig2)
-    plt.close(fig2)
+        with section("Cost, Stay Duration, and Patient Volume Analysis"):
+            # 2. Bubble Plot: Cost vs Stay Duration vs Patient Volume
+            st.header("Cost, Stay Duration, and Patient Volume Analysis")
+    
+            def build_bubble_plot():
+                hospital_stats = pd.DataFrame({
+                    'Avg_Cost': hospital_metrics['Billing Amount Mean'],
+                    'Avg_Stay': hospital_metrics['Length of Stay Mean'],
+                    'Patient_Count': hospital_metrics['Patient Count']
+                })
+    
+                fig2 = Figure(figsize=(12, 8))
+                ax2 = fig2.subplots()
+                scatter = ax2.scatter(hospital_stats['Avg_Cost'], 
+                                     hospital_stats['Avg_Stay'],
+                                     s=hospital_stats['Patient_Count']/10,  # Size based on patient count
+                                     alpha=0.6,
+                                     c=range(len(hospital_stats)),  # Color gradient
+                                     cmap='viridis')
+    
+                # Add hospital labels
+                for idx, hospital in enumerate(hospital_stats.index):
+                    ax2.annotate(hospital, 
+                                (hospital_stats['Avg_Cost'].iloc[idx], hospital_stats['Avg_Stay'].iloc[idx]),
+                                xytext=(5, 5), textcoords='offset points')
+    
+                ax2.set_xlabel('Average Cost ($)')
+                ax2.set_ylabel('Average Length of Stay (days)')
+                ax2.set_title('Hospital Performance Bubble Plot')
+    
+                # Add colorbar legend
+                fig2.colorbar(scatter, ax=ax2, label='Hospital Index')
+                return fig2
+            cached_pyplot('hospital_bubbles', None, build_bubble_plot)
 
-    # 3. Treatment Efficiency Analysis
-    st.header("Treatment Efficiency Analysis")
+        with section("Treatment Efficiency Analysis"):
+            # 3. Treatment Efficiency Analysis
+            st.header("Treatment Efficiency Analysis")
 
-    # Calculate efficiency ratio (Length of Stay / Billing Amount)
-    data['Efficiency Ratio'] = data['Length of Stay'] / (data['Billing Amount'] / 1000)
+            def build_efficiency_bars():
+                # Efficiency ratio (Length of Stay / Billing Amount in $1000s), averaged per hospital
+                fig3 = Figure(figsize=(10, 6))
+                ax3b = fig3.subplots(1, 1)
 
-    fig3, ax3b = plt.subplots(1, 1, figsize=(10, 6))
+                # Efficiency by Hospital, with the ANOVA of the differences
+                efficiency_by_hospital = hospital_metrics['Efficiency Ratio Mean'].sort_values()
+                efficiency_anova = aggregates.anova('Efficiency Ratio', 'Hospital Names').iloc[0]
+                sns.barplot(x=efficiency_by_hospital.values, y=efficiency_by_hospital.index, ax=ax3b, palette='coolwarm')
+                ax3b.set_title(f"Treatment Efficiency by Hospital (ANOVA p = {efficiency_anova['p']:.2g})")
+                ax3b.set_xlabel('Efficiency Ratio')
 
-    # Efficiency by Hospital
-    efficiency_by_hospital = data.groupby('Hospital Names')['Efficiency Ratio'].mean().sort_values()
-    sns.barplot(x=efficiency_by_hospital.values, y=efficiency_by_hospital.index, ax=ax3b, palette='coolwarm')
-    ax3b.set_title('Treatment Efficiency by Hospital')
-    ax3b.set_xlabel('Efficiency Ratio')
+                fig3.tight_layout()
+                return fig3
+            cached_pyplot('hospital_efficiency', None, build_efficiency_bars)
 
-    plt.tight_layout()
-    st.pyplot(fig3)
-    plt.close(fig3)
+        with section("Average Billing Amount by Medical Condition and Admission Type"):
+            # 2. Average Billing Amount by Medical Condition and Admission Type
+            st.header("Average Billing Amount by Medical Condition and Admission Type")
+            def build_billing_heatmap():
+                fig2 = Figure(figsize=(12, 6))
+                ax2 = fig2.subplots()
+                avg_billing = aggregates.billing_by_condition_and_admission()
+                # Conditions whose admission types differ in billing are starred
+                differs = aggregates.anova('Billing Amount', 'Admission Type', within='Medical Condition')['Significant']
+                avg_billing.index = [f'{condition} *' if differs.get(condition, False) else condition
+                                     for condition in avg_billing.index]
+                sns.heatmap(avg_billing, annot=True, fmt=',.0f', cmap='YlOrRd', ax=ax2)
+                ax2.set_title('Average Billing Amount ($) by Medical Condition and Admission Type\n'
+                              f'* admission types differ (ANOVA, adjusted p < {ALPHA})')
+                ax2.tick_params(axis='x', labelrotation=45)
+                return fig2
+            cached_pyplot('billing_heatmap', None, build_billing_heatmap)
 
-    # 2. Average Billing Amount by Medical Condition and Admission Type
-    st.header("Average Billing Amount by Medical Condition and Admission Type")
-    fig2, ax2 = plt.subplots(figsize=(12, 6))
-    avg_billing = data.groupby(['Medical Condition', 'Admission Type'])['Billing Amount'].mean().unstack()
-    sns.heatmap(avg_billing, annot=True, fmt=',.0f', cmap='YlOrRd')
-    ax2.set_title('Average Billing Amount ($) by Medical Condition and Admission Type')
-    plt.xticks(rotation=45)
-    st.pyplot(fig2)
-    plt.close(fig2)
+        with section("Hospital-Condition Treatment Network"):
+            # 4. Medical Condition Network
+            st.header("Hospital-Condition Treatment Network")
+    
+            def build_condition_network():
+                condition_matrix = aggregates.hospital_condition_counts()
+                condition_corr = condition_matrix.T.corr()
+    
+                fig4 = Figure(figsize=(12, 8))
+                ax4 = fig4.subplots()
+                mask = np.triu(np.ones_like(condition_corr))
+                sns.heatmap(condition_corr, mask=mask, annot=True, cmap='RdYlBu', center=0,
+                            square=True, fmt='.2f', cbar_kws={'label': 'Correlation'}, ax=ax4)
+                ax4.set_title('Hospital Treatment Pattern Correlations')
+                return fig4
+            cached_pyplot('condition_network', None, build_condition_network)
 
-    # # 4. Medical Condition Network
-    # st.header("Hospital-Condition Treatment Network")
-    
-    # condition_matrix = pd.crosstab(data['Hospital Names'], data['Medical Condition'])
-    # condition_corr = condition_matrix.T.corr()
-    
-    # fig4, ax4 = plt.subplots(figsize=(12, 8))
-    # mask = np.triu(np.ones_like(condition_corr))
-    # sns.heatmap(condition_corr, mask=mask, annot=True, cmap='RdYlBu', center=0,
-    #             square=True, fmt='.2f', cbar_kws={'label': 'Correlation'})
-    # ax4.set_title('Hospital Treatment Pattern Correlations')
-    # st.pyplot(fig4)
-    # plt.close(fig4)
+        with section("Hospital Admission Patterns Over Time"):
+            # 5. Time Series Analysis
+            st.header("Hospital Admission Patterns Over Time")
+            # Zooming picks the pyramid level that suits the dates shown
+            first_day, last_day = (day.date() for day in timeline.date_range())
+            date_range = st.slider('Admission dates', first_day, last_day, (first_day, last_day))
+    
+            def build_admission_series():
+                admissions, resolution = timeline.series(start=date_range[0], end=date_range[1],
+                                                         by='Hospital Names')
+    
+                fig5 = Figure(figsize=(15, 8))
+                ax5 = fig5.subplots()
+                for hospital in admissions.columns:
+                    ax5.plot(admissions.index, admissions[hospital], 
+                            label=hospital, alpha=0.7, marker='o', markersize=4)
+    
+                ax5.set_xlabel('Date')
+                ax5.set_ylabel('Number of Admissions')
+                ax5.set_title(f'{RESOLUTION_LABELS[resolution]} Admission Patterns by Hospital')
+                ax5.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+                ax5.tick_params(axis='x', labelrotation=45)
+                fig5.tight_layout()
+                return fig5
+            cached_pyplot('admission_series', date_range, build_admission_series)
 
-    # # 5. Time Series Analysis
-    # st.header("Hospital Admission Patterns Over Time")
-    
-    # daily_admissions = data.groupby(['Date of Admission', 'Hospital Names']).size().unstack()
-    
-    # fig5, ax5 = plt.subplots(figsize=(15, 8))
-    # for hospital in daily_admissions.columns:
-    #     ax5.plot(daily_admissions.index, daily_admissions[hospital], 
-    #             label=hospital, alpha=0.7, marker='o', markersize=4)
-    
-    # ax5.set_xlabel('Date')
-    # ax5.set_ylabel('Number of Admissions')
-    # ax5.set_title('Daily Admission Patterns by Hospital')
-    # ax5.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    # plt.xticks(rotation=45)
-    # plt.tight_layout()
-    # st.pyplot(fig5)
-    # plt.close(fig5)
+    with section("Statistical Significance"):
+        # 6. Which of the differences above are real; every test runs on the
+        # aggregates' sufficient statistics, in batches
+        st.header("Statistical Significance")
+        st.caption(f'Tests at α = {ALPHA}; p-values are adjusted for the other tests of their batch ({CORRECTION}).')
+
+        st.subheader("Do hospitals differ? (one-way ANOVA)")
+        hospital_anova = pd.concat({measure: aggregates.anova(measure, 'Hospital Names').iloc[0]
+                                    for measure in CELL_MEASURES}, axis=1).T
+        st.dataframe(hospital_anova, use_container_width=True)
+
+        st.subheader("Test results by hospital (chi-square)")
+        result_tests = pd.concat([aggregates.test_results_by('Hospital Names'),
+                                  aggregates.test_results_by('Hospital Names', within='Medical Condition')])
+        st.dataframe(result_tests, use_container_width=True)
+
+        st.subheader("Hospital × condition pairwise comparisons (Welch t-tests)")
+        measure = st.selectbox('Measure', CELL_MEASURES, key='pairwise measure')
+        with section('pairwise tests'):
+            comparisons = aggregates.pairwise(measure)
+        st.write(f"{int(comparisons['Significant'].sum()):,} of {len(comparisons):,} "
+                 f"hospital × condition pairs differ in {measure.lower()}")
+        paged_grid('pairwise comparisons', comparisons.sort_values('Adjusted p', kind='stable'), measure)
 
 if __name__ == '__main__':
     biostats_research_dashboard()
\ No newline at end of file
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Most extreme outliers kept per box; the rest are dropped from the payload
+MAX_OUTLIERS = 100
+WHISKER = 1.5
+
+
+def histogram_summary(values, bins, value_range=None, weights=None):
+    # weights are frequency counts, e.g. when values are pre-aggregated bins
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values)
+    values = values[keep]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[keep]
+    if value_range is None and len(values) == 0:
+        value_range = (0, 1)
+    counts, edges = np.histogram(values, bins=bins, range=value_range, weights=weights)
+    return counts, edges
+
+
+def _sorted_quantiles(values, quantiles, cumulative=None):
+    # Linear interpolation on already sorted values, same as np.quantile's default.
+    # With cumulative frequency counts each value stands for that many rows.
+    total = len(values) if cumulative is None else cumulative[-1]
+    positions = np.asarray(quantiles) * (total - 1)
+    lower = np.floor(positions)
+    upper = np.minimum(lower + 1, total - 1)
+    fraction = positions - lower
+    if cumulative is not None:
+        lower = np.searchsorted(cumulative, lower, side='right')
+        upper = np.searchsorted(cumulative, upper, side='right')
+    lower, upper = lower.astype(int), upper.astype(int)
+    return values[lower] + (values[upper] - values[lower]) * fraction
+
+
+def box_summaries(values, groups, max_outliers=MAX_OUTLIERS, whisker=WHISKER, weights=None):
+    # Quartiles, Tukey whiskers and capped outliers for every group from a
+    # single sort of (group, value). weights are frequency counts, so binned
+    # aggregates give the same summary as the rows they were built from.
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    keep = (codes >= 0) & ~np.isnan(values) & (weights > 0)
+    values, codes, weights = values[keep], codes[keep], weights[keep]
+    order = np.lexsort((values, codes))
+    values, codes, weights = values[order], codes[order], weights[order]
+    bounds = np.searchsorted(codes, np.arange(len(labels) + 1))
+
+    summaries = []
+    for code, label in enumerate(labels):
+        group = values[bounds[code]:bounds[code + 1]]
+        group_weights = weights[bounds[code]:bounds[code + 1]]
+        if len(group) == 0:
+            continue
+        q1, median, q3 = _sorted_quantiles(group, [0.25, 0.5, 0.75], np.cumsum(group_weights))
+        low = np.searchsorted(group, q1 - whisker * (q3 - q1), side='left')
+        high = np.searchsorted(group, q3 + whisker * (q3 - q1), side='right')
+        half = max_outliers // 2
+        outliers = np.concatenate([group[:low][:half], group[high:][max(len(group) - high - half, 0):]])
+        summaries.append({
+            'label': label,
+            'count': int(group_weights.sum()),
+            'mean': np.average(group, weights=group_weights),
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'whislo': group[low] if low < len(group) else q1,
+            'whishi': group[high - 1] if high > 0 else q3,
+            'outliers': outliers
+        })
+    return summaries
+
+
+def plotly_histogram(counts, edges, **bar_kwargs):
+    return go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        **bar_kwargs
+    )
+
+
+def plotly_box_traces(summary, name, color):
+    # A precomputed box plus its capped outliers drawn as a marker trace
+    box = go.Box(
+        x=[name],
+        q1=[summary['q1']],
+        median=[summary['median']],
+        q3=[summary['q3']],
+        lowerfence=[summary['whislo']],
+        upperfence=[summary['whishi']],
+        mean=[summary['mean']],
+        name=name,
+        marker_color=color,
+        boxpoints=False
+    )
+    outliers = go.Scatter(
+        x=[name] * len(summary['outliers']),
+        y=summary['outliers'],
+        mode='markers',
+        marker_color=color,
+        name=name,
+        showlegend=False
+    )
+    return [box, outliers]
+
+
+def matplotlib_box_stats(summaries):
+    # The dictionaries Axes.bxp expects
+    return [
+        {
+            'label': summary['label'],
+            'mean': summary['mean'],
+            'med': summary['median'],
+            'q1': summary['q1'],
+            'q3': summary['q3'],
+            'whislo': summary['whislo'],
+            'whishi': summary['whishi'],
+            'fliers': summary['outliers']
+        }
+        for summary in summaries
+    ]
@@ -0,0 +1,140 @@
+import glob
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from biostats_engine import build_biostats_aggregates, merge_biostats_aggregates
+from olap_cube import build_cube, merge_cubes, rollup
+from snapshot import open_prefix, prepare_frame
+from time_rollups import build_timeline, merge_timelines
+
+# Rows parsed per chunk; peak memory is bounded by this, not by the file size
+CHUNK_ROWS = int(os.environ.get('DASHBOARD_CHUNK_ROWS', 100000))
+
+# Widths of the billing bins behind the streamed box and scatter plots
+BILLING_BIN_WIDTH = 250
+SCATTER_BILLING_BIN_WIDTH = 1000
+
+# Chunk aggregates collected before they are folded into the running total;
+# merging in batches avoids regrouping the whole cube after every chunk
+MERGE_BATCH = 4
+
+# Raw CSV columns the streamed aggregates are built from
+STREAM_COLUMNS = ['Age', 'Gender', 'Medical Condition', 'Date of Admission', 'Hospital Names',
+                  'Insurance Provider', 'Billing Amount', 'Admission Type', 'Discharge Date',
+                  'Test Results']
+
+DEMOGRAPHIC_KEYS = ['Gender', 'Age', 'Test Results']
+BILLING_KEYS = ['Hospital Names', 'Insurance Provider', 'Admission Type', 'Billing Bin']
+SCATTER_KEYS = ['Hospital Names', 'Insurance Provider', 'Medical Condition', 'Length of Stay', 'Billing Bin']
+
+
+def source_files(source):
+    # A single CSV or a directory of partitioned CSVs, read in name order
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, '*.csv')))
+    return [source]
+
+
+def iter_chunks(source, chunk_rows=CHUNK_ROWS, end=None):
+    # end stops a single file at that byte offset
+    for path in source_files(source):
+        with open_prefix(path, end) if end is not None else open(path, 'rb') as csv:
+            for chunk in pd.read_csv(csv, usecols=STREAM_COLUMNS, chunksize=chunk_rows):
+                yield prepare_frame(chunk)
+
+
+def _counts(frame, keys):
+    return frame.groupby(keys, observed=True, dropna=False).size().rename('Rows').reset_index()
+
+
+def _merge_counts(tables, keys):
+    combined = pd.concat(tables, ignore_index=True)
+    return combined.groupby(keys, observed=True, dropna=False)['Rows'].sum().reset_index()
+
+
+def _bin(values, width):
+    # Lower edge plus half a bin, so each bin is represented by its midpoint
+    return np.floor(values / width) * width + width / 2
+
+
+# Mergeable aggregates of the whole dataset: the OLAP cube, the biostats
+# cells, the admission time series pyramid and frequency tables for the
+# charts that need distributions. Each
+# is independent of the row count, so they can be folded chunk by chunk.
+class StreamAggregates:
+    def __init__(self, cube, biostats, timeline, demographics, billing_bins, scatter_bins):
+        self.cube = cube
+        self.biostats = biostats
+        self.timeline = timeline
+        self.demographics = demographics
+        self.billing_bins = billing_bins
+        self.scatter_bins = scatter_bins
+
+    @classmethod
+    def from_chunk(cls, data):
+        demographics = data[DEMOGRAPHIC_KEYS]
+        billing = data[BILLING_KEYS[:-1]].assign(**{
+            'Billing Bin': _bin(data['Billing Amount'], BILLING_BIN_WIDTH)
+        })
+        scatter = data[SCATTER_KEYS[:-1]].assign(**{
+            'Billing Bin': _bin(data['Billing Amount'], SCATTER_BILLING_BIN_WIDTH)
+        })
+        return cls(
+            build_cube(data),
+            build_biostats_aggregates(data),
+            build_timeline(data),
+            _counts(demographics, DEMOGRAPHIC_KEYS),
+            _counts(billing, BILLING_KEYS),
+            _counts(scatter, SCATTER_KEYS)
+        )
+
+    @classmethod
+    def merge(cls, parts):
+        # Aggregates of disjoint row sets combine into those of their union
+        return cls(
+            merge_cubes([part.cube for part in parts]),
+            merge_biostats_aggregates([part.biostats for part in parts]),
+            merge_timelines([part.timeline for part in parts]),
+            _merge_counts([part.demographics for part in parts], DEMOGRAPHIC_KEYS),
+            _merge_counts([part.billing_bins for part in parts], BILLING_KEYS),
+            _merge_counts([part.scatter_bins for part in parts], SCATTER_KEYS)
+        )
+
+    # The sidebar options and rollups come from the cube, mirroring the query
+    # backends of query_backend
+    def options(self, column):
+        return self.cube.cells[column].dropna().unique().tolist()
+
+    def value_range(self, column):
+        values = self.cube.ages()[column].dropna()
+        if values.empty:
+            return None
+        return values.min(), values.max()
+
+    def linked_options(self, source, selected, target):
+        cells = self.cube.cells
+        linked = cells.loc[cells[source].isin(list(selected)), target]
+        return linked.dropna().unique().tolist()
+
+    def rollup(self, by=None, filters=None, age_range=None):
+        return rollup(self.cube, by=by, filters=filters, age_range=age_range)
+
+
+def ingest(source, chunk_rows=CHUNK_ROWS, end=None):
+    parts = []
+    for chunk in iter_chunks(source, chunk_rows, end):
+        parts.append(StreamAggregates.from_chunk(chunk))
+        if len(parts) > MERGE_BATCH:
+            parts = [StreamAggregates.merge(parts)]
+    return StreamAggregates.merge(parts) if len(parts) > 1 else parts[0]
+
+
+if __name__ == '__main__':
+    from data_loader import DATA_PATH
+
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    aggregates = ingest(source)
+    print(f'{aggregates.cube.rows():,} admissions folded into {len(aggregates.cube.cells):,} cube cells')
@@ -0,0 +1,142 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from figure_cache import FigureCache, figure_key
+from instrumentation import section
+
+# Rows sent to the browser per page of a grid
+GRID_PAGE_ROWS = int(os.environ.get('DASHBOARD_GRID_PAGE_ROWS', 100))
+
+# Memory budget for the row orders of sorted and searched grids and the
+# matching positions of query grids, 8 bytes per row; least recently used go first
+GRID_ORDER_BYTES = int(os.environ.get('DASHBOARD_GRID_ORDER_MB', 64)) * 1024 * 1024
+
+UNSORTED = '(dataset order)'
+
+# Row orders are stored as raw int64 bytes and read back without copying
+row_orders = FigureCache(GRID_ORDER_BYTES)
+
+
+def _cached_order(key, build):
+    payload = row_orders.get(key)
+    if payload is None:
+        payload = build().astype(np.int64).tobytes()
+        row_orders.put(key, payload)
+    return np.frombuffer(payload, dtype=np.int64)
+
+
+def _sort_order(values, descending):
+    # Stable, so rows with equal values keep their dataset order
+    values = values.reset_index(drop=True)
+    return values.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+
+
+def _matches(values, text):
+    # Case-insensitive substring search; categories are matched once each
+    # rather than once per row
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        hits = values.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+        return np.isin(values.cat.codes.to_numpy(), np.flatnonzero(hits))
+    return values.astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+
+
+def row_order(name, n_rows, values, state, sort_column=None, descending=False, search_column=None,
+              search_text=''):
+    # Positions of the rows to show, in display order; values(column) gives a
+    # column's values for all n_rows rows. The sort of every filter state and
+    # column is cached, and so is its combination with a search, so turning a
+    # page only slices the cached order.
+    searching = search_column is not None and bool(search_text)
+    if sort_column is None and not searching:
+        return range(n_rows)
+    view = (state, sort_column, descending, search_column, search_text)
+
+    def build():
+        if sort_column is None:
+            order = np.arange(n_rows)
+        else:
+            order = _cached_order(figure_key(name, (state, sort_column, descending)),
+                                  lambda: _sort_order(values(sort_column), descending))
+        if not searching:
+            return order
+        return order[_matches(values(search_column), search_text)[order]]
+    return _cached_order(figure_key(name, view), build)
+
+
+def _controls(name, columns):
+    search_col, text_col, sort_col, order_col = st.columns([2, 3, 2, 1])
+    search_column = search_col.selectbox('Search in', columns, key=f'{name} search column')
+    search_text = text_col.text_input('Search', key=f'{name} search').strip()
+    sort_column = sort_col.selectbox('Sort by', [UNSORTED] + columns, key=f'{name} sort column')
+    descending = order_col.checkbox('Descending', key=f'{name} descending')
+    sort_column = None if sort_column == UNSORTED else sort_column
+    return sort_column, descending, search_column, search_text
+
+
+def _page(name, state, view, n_rows, page_rows):
+    # Asks for the page to show and returns the rows of view it covers;
+    # page_rows(start, stop) gets them
+    n_pages = max(math.ceil(n_rows / GRID_PAGE_ROWS), 1)
+    # The page number starts over whenever the rows being paged change
+    view_key = figure_key(name, (state,) + view)
+    page = st.number_input(f'Page (of {n_pages:,})', min_value=1, max_value=n_pages, value=1, step=1,
+                           key=f'{name} page {view_key}')
+    start = (page - 1) * GRID_PAGE_ROWS
+    with section('send to browser'):
+        rows = page_rows(start, min(start + GRID_PAGE_ROWS, n_rows))
+        st.dataframe(rows, use_container_width=True)
+        search_text = view[3]
+        st.caption(f'Rows {min(start + 1, n_rows):,}-{start + len(rows):,} of {n_rows:,}'
+                   + (f' matching "{search_text}"' if search_text else ''))
+
+
+def paged_grid(name, data, state):
+    # A table showing one page of data at a time. Sorting and searching run
+    # here on the server, and only the visible page is sent to the browser.
+    # state identifies data, e.g. the filter selections it was made with.
+    with section(f'{name} grid'):
+        view = _controls(name, list(data.columns))
+        with section('row order'):
+            order = row_order(name, len(data), lambda column: data[column], state, *view)
+        _page(name, state, view, len(order), lambda start, stop: data.iloc[order[start:stop]])
+
+
+def paged_query_grid(name, backend, columns, filters, ranges, state, labels=None):
+    # paged_grid over the rows a query backend matches, which are never
+    # gathered as a whole: the pandas backend's matching positions are cached
+    # per filter state and only the page's rows are taken, SQLite pages with
+    # LIMIT and OFFSET. labels renames columns for display.
+    labels = labels or {}
+    names = {labels.get(column, column): column for column in columns}
+    with section(f'{name} grid'):
+        sort_column, descending, search_column, search_text = view = _controls(name, list(names))
+        sort_column = names.get(sort_column)
+        search_column = names[search_column]
+
+        def show(rows):
+            return rows.rename(columns=labels)
+
+        if not hasattr(backend, 'positions'):
+            search = (search_column, search_text) if search_text else None
+            n_rows = backend.count(filters, ranges, search)
+            _page(name, state, view, n_rows, lambda start, stop: show(backend.page(
+                columns, filters, ranges, start, stop - start, sort_column, descending, search)))
+            return
+
+        with section('row order'):
+            positions = _cached_order(figure_key(name, ('positions', state)),
+                                      lambda: backend.positions(filters, ranges))
+            order = row_order(name, len(positions), lambda column: backend.take([column], positions)[column],
+                              state, sort_column, descending, search_column, search_text)
+
+        def page_rows(start, stop):
+            # Rows are gathered in dataset order and put back in display order
+            page = positions[order[start:stop]]
+            ascending = np.argsort(page, kind='stable')
+            rows = backend.take(columns, page[ascending])
+            return show(rows.iloc[np.argsort(ascending)])
+        _page(name, state, view, len(order), page_rows)
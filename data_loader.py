@@ -0,0 +1,206 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from chunked_ingest import StreamAggregates, ingest, source_files
+from instrumentation import section
+from snapshot import (concat_frames, ensure_snapshot, is_append, read_appended_rows, read_snapshot, snapshot_source,
+                      source_state)
+
+# A CSV file or a directory of partitioned CSVs (always streamed)
+DATA_PATH = os.environ.get('HOSPITAL_DATA_PATH', 'healthcare_dataset 2.csv')
+
+# Set when several server processes serve the same dataset: appended rows are
+# then added to the shared snapshot, which every process maps, instead of to
+# a private in-memory copy of the frame in each process
+SHARED_SNAPSHOT = os.environ.get('DASHBOARD_SHARED_SNAPSHOT') == '1'
+
+# Otherwise appended rows are kept in memory next to the mapped snapshot rows
+# until they make up this share of them; the snapshot is then brought up to
+# date and mapped again, which keeps the columns shared and the private part small
+APPEND_FOLD_RATIO = float(os.environ.get('DASHBOARD_APPEND_FOLD_RATIO', 0.05))
+
+# The loaded frame is shared by every session in the process. With
+# copy-on-write each caller's shallow copy behaves like a private frame, so a
+# dashboard that adds or overwrites a column never touches the cached data.
+pd.set_option('mode.copy_on_write', True)
+
+# Cache entries are (version, offset, marker, value): the byte offset read so
+# far and a marker of the bytes before it, used to detect appended rows.
+# Derived entries add the number of rows their value was built from.
+_cache = {}
+_derived = {}
+
+# Each cache key has its own lock, held while its entry is loaded or built,
+# so a slow build only holds up callers waiting for that same entry.
+# _locks_lock only guards the creation of the per-key locks.
+_key_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _key_lock(key):
+    with _locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def dataset_version(path=DATA_PATH):
+    # Any rewrite of the file changes its mtime or size, which invalidates the
+    # cache; a directory of partitions changes with any of its files
+    stats = [os.stat(source) for source in source_files(path)]
+    return (os.path.abspath(path), max((stat.st_mtime_ns for stat in stats), default=0),
+            sum(stat.st_size for stat in stats), len(stats))
+
+
+def streaming_mode(path=DATA_PATH):
+    # Datasets split into partitions, or flagged as larger than memory, are
+    # folded into aggregates chunk by chunk instead of loaded as a frame
+    return os.path.isdir(path) or os.environ.get('DASHBOARD_STREAMING') == '1'
+
+
+def _was_appended(entry, path):
+    return entry is not None and is_append(path, entry[1], entry[2])
+
+
+def _full_read_state(path):
+    # Offset and marker a full read stops at; directories are always reread
+    if os.path.isdir(path):
+        return None, None
+    return source_state(path)[:2]
+
+
+# The rows of a dataset version: the frame read from the snapshot followed by
+# the chunks of rows appended since, kept apart so an append costs time in
+# proportion to the new rows. Chunks are indexed by their row positions.
+class DatasetRows:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.starts = np.cumsum([0] + [len(chunk) for chunk in chunks])
+        self.n_rows = int(self.starts[-1])
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def append(self, tail):
+        # Categoricals keep their codes; values first seen in the tail become new categories
+        last = self.chunks[-1]
+        tail = tail[last.columns].set_axis(pd.RangeIndex(self.n_rows, self.n_rows + len(tail)))
+        for column in last.columns:
+            if isinstance(last[column].dtype, pd.CategoricalDtype):
+                known = last[column].cat.categories
+                new = pd.Index(tail[column].dropna().unique()).difference(known)
+                tail[column] = pd.Categorical(tail[column], categories=known.append(new))
+            elif isinstance(last[column].dtype, pd.StringDtype):
+                tail[column] = tail[column].astype(last[column].dtype)
+        return DatasetRows(self.chunks + [tail])
+
+    def appended_rows(self):
+        return self.n_rows - len(self.chunks[0])
+
+    def frame(self):
+        # Every row in one frame, joined once per version for callers that need it
+        with self._lock:
+            if self._frame is None:
+                self._frame = concat_frames(self.chunks)
+            return self._frame
+
+    def since(self, start):
+        # The rows from position start on
+        first = min(int(np.searchsorted(self.starts, start, side='right')) - 1, len(self.chunks) - 1)
+        return concat_frames([self.chunks[first].iloc[start - self.starts[first]:]] + self.chunks[first + 1:])
+
+    def take(self, positions):
+        # Rows at the given positions, which are in ascending order
+        positions = np.asarray(positions)
+        bounds = np.searchsorted(positions, self.starts)
+        pieces = [chunk.iloc[positions[low:high] - start]
+                  for chunk, start, low, high in zip(self.chunks, self.starts, bounds, bounds[1:]) if high > low]
+        return concat_frames(pieces) if pieces else self.chunks[0].iloc[:0]
+
+    def select(self, mask):
+        # Rows where a boolean mask over every row is set
+        return self.take(np.flatnonzero(mask))
+
+
+def _load_entry(columns, path):
+    version = dataset_version(path)
+    key = (version[0], tuple(columns) if columns else None)
+    with _key_lock(('data', key)):
+        entry = _cache.get(key)
+        if entry is None or entry[0] != version:
+            with section('read dataset'):
+                rows = None
+                if not SHARED_SNAPSHOT and _was_appended(entry, path):
+                    # Only the appended tail is parsed and kept as a new chunk
+                    tail, (offset, marker, _) = read_appended_rows(path, entry[1], columns)
+                    rows = entry[3].append(tail)
+                    if rows.appended_rows() > APPEND_FOLD_RATIO * len(rows.chunks[0]):
+                        rows = None
+                    entry = (version, offset, marker, rows)
+                if rows is None:
+                    # The CSV is converted to a columnar snapshot only when it changed
+                    snapshot = ensure_snapshot(path)
+                    offset, marker = snapshot_source(snapshot)
+                    entry = (version, offset, marker, DatasetRows([read_snapshot(snapshot, columns)]))
+            _cache[key] = entry
+    return entry
+
+
+def load_data(columns=None, path=DATA_PATH):
+    # Hand out a lazy copy so callers cannot mutate the shared frame
+    return _load_entry(columns, path)[3].frame().copy(deep=False)
+
+
+def load_rows(columns=None, path=DATA_PATH):
+    # The DatasetRows, for callers that only need some of the rows
+    return _load_entry(columns, path)[3]
+
+
+def get_derived_rows(name, build, columns=None, path=DATA_PATH):
+    # Indexes and aggregates built from the dataset are cached per dataset
+    # version, together with the DatasetRows of that version, so row positions
+    # an index holds point into the rows handed out with it. When rows were
+    # only appended, build(data, previous) receives the structure built for
+    # the previous version and only the rows appended since, so it can fold
+    # them in; after a rewrite previous is None and data holds every row.
+    version = dataset_version(path)
+    key = (version[0], name)
+    with _key_lock(('derived', key)):
+        entry = _derived.get(key)
+        if entry is None or entry[0] != version:
+            previous = entry[3] if _was_appended(entry, path) else None
+            _, offset, marker, rows = _load_entry(columns, path)
+            with section(f'build {name}'):
+                if previous is None:
+                    value = build(rows.frame().copy(deep=False))
+                elif rows.n_rows > entry[4].n_rows:
+                    value = build(rows.since(entry[4].n_rows), previous)
+                else:
+                    value = previous
+            entry = (version, offset, marker, value, rows)
+            _derived[key] = entry
+    return entry[3], entry[4]
+
+
+def get_derived(name, build, columns=None, path=DATA_PATH):
+    return get_derived_rows(name, build, columns, path)[0]
+
+
+def load_stream_aggregates(path=DATA_PATH, build=ingest):
+    # build(path, end) folds the dataset, a single file up to the byte offset
+    # end; appended rows are folded in here
+    version = dataset_version(path)
+    key = (version[0], 'stream_aggregates')
+    with _key_lock(('derived', key)):
+        entry = _derived.get(key)
+        if entry is None or entry[0] != version:
+            with section('stream ingest'):
+                if _was_appended(entry, path):
+                    tail, (offset, marker, _) = read_appended_rows(path, entry[1])
+                    aggregates = StreamAggregates.merge([entry[3], StreamAggregates.from_chunk(tail)])
+                    entry = (version, offset, marker, aggregates)
+                else:
+                    offset, marker = _full_read_state(path)
+                    entry = (version, offset, marker, build(path, end=offset))
+            _derived[key] = entry
+    return entry[3]
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# Share of the row budget that goes to the most extreme points of the outlier
+# columns, split evenly between the columns; the rest is the stratified sample
+OUTLIER_SHARE = 0.05
+
+
+def outlier_mask(data, columns, k):
+    # The k most extreme rows of each column, half at each end. Ties at the
+    # ends (whole-day stays) are broken arbitrarily, so the count stays at k.
+    mask = np.zeros(len(data), dtype=bool)
+    per_end = k // 2
+    for column in columns:
+        values = data[column].to_numpy(dtype=float)
+        present = np.flatnonzero(~np.isnan(values))
+        if per_end == 0 or len(present) == 0:
+            continue
+        if 2 * per_end >= len(present):
+            mask[present] = True
+            continue
+        order = np.argpartition(values[present], [per_end - 1, len(present) - per_end])
+        mask[present[order[:per_end]]] = True
+        mask[present[order[-per_end:]]] = True
+    return mask
+
+
+def stratified_sample(data, by, n, outlier_columns=(), random_state=0):
+    # Keeps the most extreme points of the given columns and fills the rest
+    # of the budget with a sample proportional to each stratum's share of the
+    # rows, so about n rows are returned however large data is
+    if len(data) <= n:
+        return data
+
+    k = int(n * OUTLIER_SHARE) // max(len(outlier_columns), 1)
+    outliers = outlier_mask(data, outlier_columns, k)
+    rest = data[~outliers]
+    budget = max(n - int(outliers.sum()), 0)
+    fraction = min(budget / len(rest), 1.0) if len(rest) else 0.0
+    sample = rest.groupby(by, observed=True, group_keys=False).sample(frac=fraction, random_state=random_state)
+    return pd.concat([data[outliers], sample])
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import plotly.io as pio
+import streamlit as st
+
+from data_loader import dataset_version
+from instrumentation import register_counters, section
+
+# Memory budget for serialized figures; least recently used entries go first
+FIGURE_CACHE_BYTES = int(os.environ.get('DASHBOARD_FIGURE_CACHE_MB', 128)) * 1024 * 1024
+
+# Same output options st.pyplot uses, so cached images look identical
+PNG_OPTIONS = {'format': 'png', 'bbox_inches': 'tight', 'dpi': 200}
+
+# Threads building the charts of concurrent_charts() blocks, shared by all
+# sessions. Every chart being drawn holds its full-resolution canvas, so peak
+# memory grows with the number of workers.
+FIGURE_WORKERS = int(os.environ.get('DASHBOARD_FIGURE_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+# Process-wide LRU of rendered figures (plotly JSON or matplotlib PNG bytes)
+class FigureCache:
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+figure_cache = FigureCache()
+register_counters('Figure cache', figure_cache.stats)
+_figure_pool = ThreadPoolExecutor(FIGURE_WORKERS)
+
+# The charts waiting for a slot in the current script run's concurrent_charts() block
+_batch = threading.local()
+
+# Set by headless exporters to sink(name, payload): charts are handed to it
+# instead of being sent to the page. Payloads are plotly JSON text or PNG bytes.
+chart_sink = None
+
+
+def figure_key(name, state):
+    # A chart is fully determined by the dataset version and its filter state
+    text = repr((name, dataset_version(), state))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _build(key, render):
+    payload = render()
+    figure_cache.put(key, payload)
+    return payload
+
+
+def _place(name, target, payload, show):
+    if chart_sink is not None:
+        chart_sink(name, payload)
+        return
+    show(target, payload)
+
+
+def _chart(name, state, render, show):
+    # Each chart is a section of its own, named after its cache key
+    with section(name):
+        key = figure_key(name, state)
+        payload = figure_cache.get(key)
+        charts = getattr(_batch, 'charts', None)
+        if payload is None and charts is not None:
+            # Keep the chart's place on the page and build it on the pool
+            charts.append((_figure_pool.submit(_build, key, render), name, st.empty(), show))
+            return
+        if payload is None:
+            payload = _build(key, render)
+        with section('send to browser'):
+            _place(name, st, payload, show)
+
+
+@contextmanager
+def concurrent_charts():
+    # Charts requested inside this block that are not cached yet are built
+    # concurrently and placed into their slots as they finish; the block ends
+    # once all of them are on the page
+    _batch.charts = charts = []
+    try:
+        yield
+    finally:
+        _batch.charts = None
+    slots = {future: (name, slot, show) for future, name, slot, show in charts}
+    with section('concurrent charts'):
+        for future in as_completed(slots):
+            name, slot, show = slots[future]
+            _place(name, slot, future.result(), show)
+
+
+def cached_plotly_chart(name, state, build, **kwargs):
+    def render():
+        with section('figure build'):
+            fig = build()
+        with section('serialize'):
+            return fig.to_json()
+
+    def show(target, payload):
+        target.plotly_chart(pio.from_json(payload), **kwargs)
+    _chart(name, state, render, show)
+
+
+def cached_pyplot(name, state, build):
+    # build() returns a matplotlib Figure created with Figure() rather than
+    # through pyplot, which keeps every figure it creates until it is closed;
+    # nothing else references it, so it is freed as soon as it is rendered
+    def render():
+        with section('figure build'):
+            fig = build()
+        with section('serialize'):
+            image = io.BytesIO()
+            fig.savefig(image, **PNG_OPTIONS)
+            return image.getvalue()
+
+    def show(target, payload):
+        target.image(payload, use_column_width=True)
+    _chart(name, state, render, show)
@@ -0,0 +1,203 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = ['Hospital Names', 'Insurance Provider', 'Gender', 'Admission Month']
+RANGE_COLUMNS = ['Age']
+FILTER_COLUMNS = ['Hospital Names', 'Insurance Provider', 'Gender', 'Date of Admission', 'Age']
+
+# Cascading sidebar options: selecting values of the first column limits the second
+LINKED_COLUMNS = [('Hospital Names', 'Insurance Provider')]
+
+# Number of per-filter bitmaps kept for reuse across reruns
+PARTIAL_CACHE_SIZE = 128
+
+# Appended rows go into a delta engine that is merged into the main one once
+# it holds more than this share of the rows
+DELTA_FOLD_RATIO = 0.05
+
+
+# Sidebar filters compiled into ANDs of packed per-value bitmaps. The bitmap
+# for each individual filter is cached, so changing one filter reuses the
+# partial results of all the others. Rows appended after the first n_rows
+# are held by the delta engine.
+class FilterEngine:
+    def __init__(self, n_rows, values, bitmaps, sorted_order, sorted_values, links, delta=None):
+        self.n_rows = n_rows
+        self.values = values
+        self.bitmaps = bitmaps
+        self.sorted_order = sorted_order
+        self.sorted_values = sorted_values
+        self.links = links
+        self.delta = delta
+
+        self._partials = OrderedDict()
+        self._lock = threading.Lock()
+        self._all_rows = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    @classmethod
+    def build(cls, data):
+        values = {}
+        bitmaps = {}
+        for column, series in _category_columns(data).items():
+            codes, uniques = pd.factorize(series)
+            values[column] = uniques.tolist()
+            bitmaps[column] = {
+                value: np.packbits(codes == code) for code, value in enumerate(values[column])
+            }
+
+        # Sorted index for range selections; NaN sorts to the end and is never selected
+        sorted_order = {}
+        sorted_values = {}
+        for column in RANGE_COLUMNS:
+            column_values = data[column].to_numpy(dtype=float)
+            order = np.argsort(column_values, kind='stable')
+            sorted_order[column] = order
+            sorted_values[column] = column_values[order]
+
+        links = {link: {} for link in LINKED_COLUMNS}
+        _add_links(links, data)
+        return cls(len(data), values, bitmaps, sorted_order, sorted_values, links)
+
+    def extend(self, data):
+        # Add data, the rows appended after these. They go into a delta
+        # engine, so an append costs time in proportion to the delta rather
+        # than to every row; the delta is merged in once it has grown.
+        tail = FilterEngine.build(data)
+        delta = tail if self.delta is None else self.delta._merge(tail)
+        if delta.n_rows > DELTA_FOLD_RATIO * self.n_rows:
+            return self._merge(delta)
+        return FilterEngine(self.n_rows, self.values, self.bitmaps, self.sorted_order, self.sorted_values,
+                            self.links, delta)
+
+    def _merge(self, other):
+        # The engine of these rows followed by other's rows; it matches
+        # building from all of them at once
+        values = {}
+        bitmaps = {}
+        for column, known in self.bitmaps.items():
+            values[column] = self.values[column] + [value for value in other.values[column] if value not in known]
+            bitmaps[column] = {
+                value: np.packbits(np.concatenate([_unpacked(known.get(value), self.n_rows),
+                                                   _unpacked(other.bitmaps[column].get(value), other.n_rows)]))
+                for value in values[column]
+            }
+
+        # Merge the other sorted index into this one; ties keep row order
+        sorted_order = {}
+        sorted_values = {}
+        for column in RANGE_COLUMNS:
+            positions = np.searchsorted(self.sorted_values[column], other.sorted_values[column], side='right')
+            sorted_order[column] = np.insert(self.sorted_order[column], positions,
+                                             other.sorted_order[column] + self.n_rows)
+            sorted_values[column] = np.insert(self.sorted_values[column], positions, other.sorted_values[column])
+
+        links = {}
+        for link, linked in self.links.items():
+            links[link] = {value: list(targets) for value, targets in linked.items()}
+            for value, targets in other.links[link].items():
+                merged = links[link].setdefault(value, [])
+                merged.extend(target for target in targets if target not in merged)
+        return FilterEngine(self.n_rows + other.n_rows, values, bitmaps, sorted_order, sorted_values, links)
+
+    def options(self, column):
+        # Distinct values in order of first appearance, like Series.unique()
+        if self.delta is None:
+            return list(self.values[column])
+        known = self.bitmaps[column]
+        return self.values[column] + [value for value in self.delta.options(column) if value not in known]
+
+    def value_range(self, column):
+        # Lowest and highest value, or None when the column has no values
+        values = self.sorted_values[column]
+        values = values[~np.isnan(values)]
+        bounds = [(values[0], values[-1])] if len(values) else []
+        delta_bounds = self.delta.value_range(column) if self.delta is not None else None
+        if delta_bounds is not None:
+            bounds.append(delta_bounds)
+        if not bounds:
+            return None
+        return min(low for low, _ in bounds), max(high for _, high in bounds)
+
+    def linked_options(self, source, selected, target):
+        # Target values that co-occur with any selected source value
+        seen = set()
+        for engine in [self] if self.delta is None else [self, self.delta]:
+            linked = engine.links[(source, target)]
+            for value in selected:
+                seen.update(linked.get(value, []))
+        return [value for value in self.options(target) if value in seen]
+
+    def _cached(self, key, build):
+        with self._lock:
+            bitmap = self._partials.get(key)
+            if bitmap is not None:
+                self._partials.move_to_end(key)
+                return bitmap
+        bitmap = build()
+        with self._lock:
+            self._partials[key] = bitmap
+            while len(self._partials) > PARTIAL_CACHE_SIZE:
+                self._partials.popitem(last=False)
+        return bitmap
+
+    def _category_bitmap(self, column, selected):
+        def build():
+            bitmap = np.zeros_like(self._all_rows)
+            for value in selected:
+                if value in self.bitmaps[column]:
+                    bitmap |= self.bitmaps[column][value]
+            return bitmap
+        return self._cached((column, frozenset(selected)), build)
+
+    def _range_bitmap(self, column, low, high):
+        def build():
+            values = self.sorted_values[column]
+            start = np.searchsorted(values, low, side='left')
+            stop = np.searchsorted(values, high, side='right')
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[self.sorted_order[column][start:stop]] = True
+            return np.packbits(mask)
+        return self._cached((column, low, high), build)
+
+    def mask(self, selections=None, ranges=None):
+        # selections maps a column to its accepted values, ranges maps a column
+        # to an inclusive (low, high) pair; returns a boolean row mask
+        bitmap = self._all_rows
+        for column, selected in (selections or {}).items():
+            bitmap = bitmap & self._category_bitmap(column, selected)
+        for column, (low, high) in (ranges or {}).items():
+            bitmap = bitmap & self._range_bitmap(column, low, high)
+        mask = np.unpackbits(bitmap, count=self.n_rows).view(bool)
+        if self.delta is not None:
+            mask = np.concatenate([mask, self.delta.mask(selections, ranges)])
+        return mask
+
+
+def _unpacked(bitmap, n_rows):
+    if bitmap is None:
+        return np.zeros(n_rows, dtype=bool)
+    return np.unpackbits(bitmap, count=n_rows).view(bool)
+
+
+def _category_columns(data):
+    columns = {column: data[column] for column in CATEGORY_COLUMNS if column != 'Admission Month'}
+    columns['Admission Month'] = data['Date of Admission'].dt.month
+    return columns
+
+
+def _add_links(links, data):
+    for (source, target), linked in links.items():
+        pairs = data[[source, target]].drop_duplicates()
+        for value, group in pairs.groupby(source, observed=True):
+            targets = linked.setdefault(value, [])
+            targets.extend(target_value for target_value in group[target] if target_value not in targets)
+
+
+def build_filter_engine(data, previous=None):
+    # Rows are only ever appended: with previous, data holds the new rows
+    if previous is not None:
+        return previous.extend(data)
+    return FilterEngine.build(data)
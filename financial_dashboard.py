@@ -1,209 +1,310 @@
 import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from approximate import approximately, load_sample, progressive, refine_estimates, show_margin
+from chart_summaries import box_summaries, plotly_box_traces
+from chunked_ingest import SCATTER_BILLING_BIN_WIDTH
+from data_loader import load_stream_aggregates, streaming_mode
+from figure_cache import cached_plotly_chart, concurrent_charts
+from instrumentation import section
+from query_backend import get_backend
+
+# The columns of the rows this page reads: the scatter plot's
+FINANCIAL_COLUMNS = ['Medical Condition', 'Billing Amount', 'Length of Stay']
+
+# Above this many filtered rows the scatter plot switches to WebGL and a stratified sample
+SCATTER_ROW_LIMIT = 20000
 
 def financial_dashboard():
     st.title("Hospital Financial Analytics Dashboard")
     
-    # Load and prepare data
-    data = pd.read_csv('healthcare_dataset 2.csv')
-    
-    # Sidebar filters
-    st.sidebar.header("Filters")
-    
-    # Hospital filter
-    selected_hospitals = st.sidebar.multiselect(
-        "Select Hospitals",
-        options=sorted(data['Hospital Names'].unique()),
-        default=data['Hospital Names'].unique()
-    )
-    
-    # Dynamic insurance provider filter based on selected hospitals
-    available_insurance = data[data['Hospital Names'].isin(selected_hospitals)]['Insurance Provider'].unique()
-    selected_insurance = st.sidebar.multiselect(
-        "Select Insurance Providers",
-        options=sorted(available_insurance),
-        default=available_insurance
-    )
-    
-    # Filter the dataset
-    filtered_data = data[
-        (data['Hospital Names'].isin(selected_hospitals)) &
-        (data['Insurance Provider'].isin(selected_insurance))
-    ]
-    
-    # Display key metrics
-    st.header("Key Financial Metrics")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        total_billing = filtered_data['Billing Amount'].sum()
-        st.metric("Total Billing Amount", f"${total_billing:,.2f}")
-    
-    with col2:
-        avg_billing = filtered_data['Billing Amount'].mean()
-        st.metric("Average Bill per Patient", f"${avg_billing:,.2f}")
-    
-    with col3:
-        total_patients = len(filtered_data)
-        st.metric("Total Patients", total_patients)
-    
-    # Insurance Provider Analysis
-    st.header("Insurance Provider Analysis")
-    
-        # Create insurance metrics using the filtered dataset
-    insurance_metrics = filtered_data.groupby('Insurance Provider').agg({
-        'Billing Amount': ['sum', 'mean'],
-        'Name': 'count'
-    }).round(2)
-    insurance_metrics.columns = ['Total Revenue', 'Average Bill', 'Patient Count']
-    insurance_metrics = insurance_metrics.reset_index()
-    
-    # Ensure Total Revenue is calculated correctly with filtered data
-    insurance_metrics['Total Revenue'] = insurance_metrics['Patient Count'] * insurance_metrics['Average Bill']
-    
-    # Create treemap with filtered data
-    fig_insurance = px.treemap(
-        insurance_metrics,
-        path=['Insurance Provider'],
-        values='Patient Count',
-        color='Average Bill',
-        color_continuous_scale=['#f7fbff', '#4292c6'],  # Subtle blue scale
-        color_continuous_midpoint=insurance_metrics['Average Bill'].median(),
-        title='Insurance Provider Distribution',
-        custom_data=['Total Revenue', 'Average Bill']
-    )
-    
-    fig_insurance.update_layout(
-        coloraxis_colorbar=dict(
-            title="Average Bill ($)",
-            tickformat="$,.0f"
-        ),
-        margin=dict(t=50, l=25, r=25, b=25)  # Adjust margins for better spacing
-    )
-    
-    fig_insurance.update_traces(
-        hovertemplate='<b>%{label}</b><br>' +
-        'Patient Count: %{value}<br>' +
-        'Total Revenue: $%{customdata[0]:,.2f}<br>' +
-        'Average Bill: $%{customdata[1]:,.2f}<extra></extra>'
-    )
-    
-    fig_insurance.update_layout(height=500)
-    st.plotly_chart(fig_insurance)
-    
-    # Medical Condition Analysis
-    st.header("Medical Condition Cost Analysis")
-    
-    condition_metrics = filtered_data.groupby('Medical Condition').agg({
-        'Billing Amount': ['sum', 'mean'],
-        'Name': 'count'
-    }).round(2)
-    condition_metrics.columns = ['Total Revenue', 'Average Bill', 'Patient Count']
-    condition_metrics = condition_metrics.reset_index()
-    condition_metrics = condition_metrics.sort_values('Total Revenue', ascending=True)
-    
-    # Create horizontal bar chart with subtle colors
-    fig_conditions = go.Figure()
-    fig_conditions.add_trace(go.Bar(
-        y=condition_metrics['Medical Condition'],
-        x=condition_metrics['Total Revenue'],
-        orientation='h',
-        marker_color=condition_metrics['Average Bill'],
-        marker_colorscale='Tealrose',  # More subtle color scale
-        text=[f'${x:,.0f}' for x in condition_metrics['Total Revenue']],
-        textposition='auto',
-        customdata=np.stack((
-            condition_metrics['Patient Count'],
-            condition_metrics['Average Bill']
-        ), axis=-1)
-    ))
-    
-    fig_conditions.update_layout(
-        title='Medical Condition Revenue Analysis',
-        xaxis_title='Total Revenue ($)',
-        yaxis_title='Medical Condition',
-        height=600,
-        showlegend=False,
-        yaxis={'categoryorder': 'total ascending'},
-        plot_bgcolor='rgba(0,0,0,0.9)',  # Lighter background
-        paper_bgcolor='rgba(0,0,0,0.9)'
-    )
-    
-    fig_conditions.update_traces(
-        hovertemplate='<b>%{y}</b><br>' +
-        'Total Revenue: $%{x:,.2f}<br>' +
-        'Patient Count: %{customdata[0]}<br>' +
-        'Average Bill: $%{customdata[1]:,.2f}<extra></extra>'
-    )
-    
-    st.plotly_chart(fig_conditions)
-    
-    # Admission Type Analysis
-    st.header("Admission Type Cost Analysis")
-    
-    admission_metrics = filtered_data.groupby('Admission Type').agg({
-        'Billing Amount': ['mean', 'std', 'sum'],
-        'Name': 'count'
-    }).round(2)
-    admission_metrics.columns = ['Average Bill', 'Std Dev', 'Total Revenue', 'Patient Count']
-    admission_metrics = admission_metrics.reset_index()
-    
-    fig_box = go.Figure()
-    
-    colors = ['#a6cee3', '#b2df8a', '#fb9a99']  # Subtle pastel colors
-    
-    for idx, admission_type in enumerate(admission_metrics['Admission Type']):
-        admission_data = filtered_data[filtered_data['Admission Type'] == admission_type]
-        fig_box.add_trace(go.Box(
-            y=admission_data['Billing Amount'],
-            name=f"{admission_type}<br>({len(admission_data)} patients)",
-            boxpoints='outliers',
-            marker_color=colors[idx % len(colors)]
-        ))
-    
-    fig_box.update_layout(
-        title='Cost Distribution by Admission Type (with Patient Counts)',
-        yaxis_title='Billing Amount ($)',
-        height=500,
-        plot_bgcolor='rgba(0,0,0,0.9)',
-        paper_bgcolor='rgba(0,0,0,0.9)'
-    )
-    st.plotly_chart(fig_box)
-    
-    # Length of Stay Analysis
-    st.header("Length of Stay Analysis")
-    
-    filtered_data['Date of Admission'] = pd.to_datetime(filtered_data['Date of Admission'])
-    filtered_data['Discharge Date'] = pd.to_datetime(filtered_data['Discharge Date'])
-    filtered_data['Length of Stay'] = (filtered_data['Discharge Date'] - filtered_data['Date of Admission']).dt.days
-    
-    # Create scatter plot with subtle colors
-    fig_los = px.scatter(
-        filtered_data,
-        x='Length of Stay',
-        y='Billing Amount',
-        color='Medical Condition',
-        size='Length of Stay',
-        color_discrete_sequence=px.colors.qualitative.Pastel,  # Subtle pastel colors
-        title='Billing Amount vs Length of Stay by Medical Condition',
-        labels={'Length of Stay': 'Length of Stay (Days)', 'Billing Amount': 'Billing Amount ($)'},
-        height=600
-    )
-    
-    fig_los.update_layout(
-        plot_bgcolor='rgba(0,0,0,0.9)',
-        paper_bgcolor='rgba(0,0,0,0.9)'
-    )
-    
-    st.plotly_chart(fig_los)
-    
-    correlation = filtered_data['Length of Stay'].corr(filtered_data['Billing Amount'])
-    st.write(f"Correlation coefficient between Length of Stay and Billing Amount: {correlation:.2f}")
+    with section("Load data"):
+        # Filters, metrics and rows come from the query backend; in streaming
+        # mode only the folded aggregates exist and answer the same calls
+        streaming = streaming_mode()
+        if streaming:
+            stream = load_stream_aggregates()
+            backend = stream
+        else:
+            backend = get_backend()
+        # In approximate mode the key metrics are first estimated from a sample
+        sample = None if streaming else load_sample()
+    
+    with section("Filters"):
+        # Sidebar filters
+        st.sidebar.header("Filters")
+    
+        # Hospital filter
+        selected_hospitals = st.sidebar.multiselect(
+            "Select Hospitals",
+            options=sorted(backend.options('Hospital Names')),
+            default=backend.options('Hospital Names')
+        )
+    
+        # Dynamic insurance provider filter based on selected hospitals
+        available_insurance = backend.linked_options('Hospital Names', selected_hospitals, 'Insurance Provider')
+        selected_insurance = st.sidebar.multiselect(
+            "Select Insurance Providers",
+            options=sorted(available_insurance),
+            default=available_insurance
+        )
+    
+        # Filter the dataset
+        cube_filters = {'Hospital Names': selected_hospitals, 'Insurance Provider': selected_insurance}
+        if streaming:
+            billing_bins = stream.billing_bins
+            billing_bins = billing_bins[billing_bins['Hospital Names'].isin(selected_hospitals)
+                                        & billing_bins['Insurance Provider'].isin(selected_insurance)]
+            scatter_bins = stream.scatter_bins
+            scatter_bins = scatter_bins[scatter_bins['Hospital Names'].isin(selected_hospitals)
+                                        & scatter_bins['Insurance Provider'].isin(selected_insurance)]
+    
+    # Charts are cached per filter state and reused when the same filters come back
+    filter_state = (selected_hospitals, selected_insurance)
+    
+    with section("Key Financial Metrics"):
+        # Metrics are rolled up by the backend (the pre-aggregated cube or SQL) instead of from the raw rows
+        def rollup_totals():
+            return backend.rollup(filters=cube_filters)
+    
+        def estimate_totals():
+            return sample.estimate(cube_filters)
+    
+        # Display key metrics; estimates show the margins of their 95% intervals
+        st.header("Key Financial Metrics")
+    
+        col1, col2, col3 = st.columns(3)
+        metric_slots = [col.empty() for col in (col1, col2, col3)]
+        margin_slots = [col.empty() for col in (col1, col2, col3)]
+    
+        def show_key_metrics(totals, approximate):
+            total_billing = totals['Billing Amount Total']
+            metric_slots[0].metric("Total Billing Amount", approximately(f"${total_billing:,.2f}", approximate))
+            show_margin(margin_slots[0], totals, 'Billing Amount Total', "${:,.2f}", approximate)
+    
+            avg_billing = totals['Billing Amount Mean']
+            metric_slots[1].metric("Average Bill per Patient", approximately(f"${avg_billing:,.2f}", approximate))
+            show_margin(margin_slots[1], totals, 'Billing Amount Mean', "${:,.2f}", approximate)
+    
+            total_patients = int(round(totals['Count']))
+            metric_slots[2].metric("Total Patients", approximately(total_patients, approximate))
+            show_margin(margin_slots[2], totals, 'Count', "{:,.0f}", approximate)
+        progressive('financial totals', filter_state, rollup_totals,
+                    estimate_totals if sample is not None else None, show_key_metrics)
+    
+    if not streaming:
+        with section("Filtered rows"):
+            # Only counted: the charts below ask the backend for their summaries
+            # and a sample rather than for every filtered row
+            n_filtered = int(rollup_totals()['Count'])
+    
+    # The charts below are independent of one another, so the ones not cached
+    # yet are built concurrently and placed as they finish
+    with concurrent_charts():
+        with section("Insurance Provider Analysis"):
+            # Insurance Provider Analysis
+            st.header("Insurance Provider Analysis")
+    
+            def build_insurance_treemap():
+                # Create insurance metrics using the filtered dataset
+                insurance_metrics = backend.rollup(by='Insurance Provider', filters=cube_filters)[
+                    ['Billing Amount Total', 'Billing Amount Mean', 'Count']
+                ].round(2)
+                insurance_metrics.columns = ['Total Revenue', 'Average Bill', 'Patient Count']
+                insurance_metrics = insurance_metrics.reset_index()
+    
+                # Ensure Total Revenue is calculated correctly with filtered data
+                insurance_metrics['Total Revenue'] = insurance_metrics['Patient Count'] * insurance_metrics['Average Bill']
+    
+                # Create treemap with filtered data
+                fig_insurance = px.treemap(
+                    insurance_metrics,
+                    path=['Insurance Provider'],
+                    values='Patient Count',
+                    color='Average Bill',
+                    color_continuous_scale=['#f7fbff', '#4292c6'],  # Subtle blue scale
+                    color_continuous_midpoint=insurance_metrics['Average Bill'].median(),
+                    title='Insurance Provider Distribution',
+                    custom_data=['Total Revenue', 'Average Bill']
+                )
+    
+                fig_insurance.update_layout(
+                    coloraxis_colorbar=dict(
+                        title="Average Bill ($)",
+                        tickformat="$,.0f"
+                    ),
+                    margin=dict(t=50, l=25, r=25, b=25)  # Adjust margins for better spacing
+                )
+    
+                fig_insurance.update_traces(
+                    hovertemplate='<b>%{label}</b><br>' +
+                    'Patient Count: %{value}<br>' +
+                    'Total Revenue: $%{customdata[0]:,.2f}<br>' +
+                    'Average Bill: $%{customdata[1]:,.2f}<extra></extra>'
+                )
+    
+                fig_insurance.update_layout(height=500)
+                return fig_insurance
+            cached_plotly_chart('insurance_treemap', filter_state, build_insurance_treemap)
+    
+        with section("Medical Condition Cost Analysis"):
+            # Medical Condition Analysis
+            st.header("Medical Condition Cost Analysis")
+    
+            def build_condition_bars():
+                condition_metrics = backend.rollup(by='Medical Condition', filters=cube_filters)[
+                    ['Billing Amount Total', 'Billing Amount Mean', 'Count']
+                ].round(2)
+                condition_metrics.columns = ['Total Revenue', 'Average Bill', 'Patient Count']
+                condition_metrics = condition_metrics.reset_index()
+                condition_metrics = condition_metrics.sort_values('Total Revenue', ascending=True)
+    
+                # Create horizontal bar chart with subtle colors
+                fig_conditions = go.Figure()
+                fig_conditions.add_trace(go.Bar(
+                    y=condition_metrics['Medical Condition'],
+                    x=condition_metrics['Total Revenue'],
+                    orientation='h',
+                    marker_color=condition_metrics['Average Bill'],
+                    marker_colorscale='Tealrose',  # More subtle color scale
+                    text=[f'${x:,.0f}' for x in condition_metrics['Total Revenue']],
+                    textposition='auto',
+                    customdata=np.stack((
+                        condition_metrics['Patient Count'],
+                        condition_metrics['Average Bill']
+                    ), axis=-1)
+                ))
+    
+                fig_conditions.update_layout(
+                    title='Medical Condition Revenue Analysis',
+                    xaxis_title='Total Revenue ($)',
+                    yaxis_title='Medical Condition',
+                    height=600,
+                    showlegend=False,
+                    yaxis={'categoryorder': 'total ascending'},
+                    plot_bgcolor='rgba(0,0,0,0.9)',  # Lighter background
+                    paper_bgcolor='rgba(0,0,0,0.9)'
+                )
+    
+                fig_conditions.update_traces(
+                    hovertemplate='<b>%{y}</b><br>' +
+                    'Total Revenue: $%{x:,.2f}<br>' +
+                    'Patient Count: %{customdata[0]}<br>' +
+                    'Average Bill: $%{customdata[1]:,.2f}<extra></extra>'
+                )
+    
+                return fig_conditions
+            cached_plotly_chart('condition_bars', filter_state, build_condition_bars)
+    
+        with section("Admission Type Cost Analysis"):
+            # Admission Type Analysis
+            st.header("Admission Type Cost Analysis")
+    
+            def build_admission_box():
+                # Quartiles, whiskers and capped outliers for every admission type in one pass
+                if streaming:
+                    # Billing bin midpoints weighted by their admission counts
+                    admission_summaries = box_summaries(billing_bins['Billing Bin'], billing_bins['Admission Type'],
+                                                        weights=billing_bins['Rows'])
+                else:
+                    admission_summaries = backend.box_summaries('Billing Amount', 'Admission Type', cube_filters)
+    
+                fig_box = go.Figure()
+    
+                colors = ['#a6cee3', '#b2df8a', '#fb9a99']  # Subtle pastel colors
+    
+                for idx, summary in enumerate(admission_summaries):
+                    name = f"{summary['label']}<br>({summary['count']} patients)"
+                    fig_box.add_traces(plotly_box_traces(summary, name, colors[idx % len(colors)]))
+    
+                fig_box.update_layout(
+                    title='Cost Distribution by Admission Type (with Patient Counts)',
+                    yaxis_title='Billing Amount ($)',
+                    height=500,
+                    plot_bgcolor='rgba(0,0,0,0.9)',
+                    paper_bgcolor='rgba(0,0,0,0.9)'
+                )
+                return fig_box
+            cached_plotly_chart('admission_box', filter_state, build_admission_box)
+    
+        with section("Length of Stay Analysis"):
+            # Length of Stay Analysis
+            st.header("Length of Stay Analysis")
+    
+            # Large selections are drawn with WebGL from a per-condition sample that keeps the outliers
+            large_data = not streaming and n_filtered > SCATTER_ROW_LIMIT
+    
+            def build_binned_scatter():
+                # One bubble per (condition, stay, billing bin), sized by its admissions
+                binned = scatter_bins.groupby(['Medical Condition', 'Length of Stay', 'Billing Bin'],
+                                              observed=True)['Rows'].sum().reset_index()
+                fig_los = px.scatter(
+                    binned,
+                    x='Length of Stay',
+                    y='Billing Bin',
+                    color='Medical Condition',
+                    size='Rows',
+                    color_discrete_sequence=px.colors.qualitative.Pastel,
+                    title='Billing Amount vs Length of Stay by Medical Condition',
+                    labels={'Length of Stay': 'Length of Stay (Days)', 'Billing Bin': 'Billing Amount ($)',
+                            'Rows': 'Admissions'},
+                    height=600,
+                    render_mode='webgl'
+                )
+                fig_los.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0.9)',
+                    paper_bgcolor='rgba(0,0,0,0.9)'
+                )
+                return fig_los
+    
+            def build_stay_scatter():
+                # Every filtered row while there are at most SCATTER_ROW_LIMIT
+                scatter_data = backend.sample(FINANCIAL_COLUMNS, SCATTER_ROW_LIMIT, 'Medical Condition', cube_filters,
+                                              outlier_columns=['Billing Amount', 'Length of Stay'])
+        
+                # Create scatter plot with subtle colors
+                fig_los = px.scatter(
+                    scatter_data,
+                    x='Length of Stay',
+                    y='Billing Amount',
+                    color='Medical Condition',
+                    size='Length of Stay',
+                    color_discrete_sequence=px.colors.qualitative.Pastel,  # Subtle pastel colors
+                    title='Billing Amount vs Length of Stay by Medical Condition',
+                    labels={'Length of Stay': 'Length of Stay (Days)', 'Billing Amount': 'Billing Amount ($)'},
+                    height=600,
+                    render_mode='webgl' if large_data else 'auto'
+                )
+    
+                fig_los.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0.9)',
+                    paper_bgcolor='rgba(0,0,0,0.9)'
+                )
+    
+                return fig_los
+            if streaming:
+                cached_plotly_chart('stay_scatter_binned', filter_state, build_binned_scatter)
+                st.caption(f"Admissions are grouped into ${SCATTER_BILLING_BIN_WIDTH:,} billing bins; bubble size is the number of admissions.")
+            else:
+                cached_plotly_chart('stay_scatter', filter_state, build_stay_scatter)
+            if large_data:
+                st.caption(f"Showing a stratified sample of about {SCATTER_ROW_LIMIT:,} of {n_filtered:,} admissions; the most extreme billing amounts and stays are always included.")
+    
+            # The correlation always uses every filtered row, not the plotted
+            # sample: the roll-up holds it from the sums of products of billing
+            # amounts and stays
+            correlation_slot, correlation_margin_slot = st.empty(), st.empty()
+    
+            def show_correlation(totals, approximate):
+                correlation = approximately(f"{totals['Billing Stay Correlation']:.2f}", approximate)
+                correlation_slot.write(f"Correlation coefficient between Length of Stay and Billing Amount: {correlation}")
+                show_margin(correlation_margin_slot, totals, 'Billing Stay Correlation', "{:.2f}", approximate)
+            progressive('stay correlation', filter_state, rollup_totals,
+                        estimate_totals if sample is not None else None, show_correlation)
+    
+    # Estimated metrics are replaced by the exact ones as they finish
+    refine_estimates()
 
 if __name__ == '__main__':
     st.set_page_config(layout="wide")
@@ -0,0 +1,231 @@
+import streamlit as st
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from matplotlib.figure import Figure
+from approximate import load_sample, progressive, refine_estimates
+from chart_summaries import histogram_summary, plotly_histogram
+from data_loader import streaming_mode
+from fast_kde import binned_kde
+from figure_cache import cached_plotly_chart, cached_pyplot, concurrent_charts
+from instrumentation import section
+from query_backend import DEFAULT_AGE_RANGE, get_backend
+
+# Columns of the filtered data preview on the Hospital Statistics page
+STATISTICS_COLUMNS = ['Age', 'Gender', 'Hospital Names', 'Date of Admission', 'Admission Type',
+                      'Medical Condition', 'Length of Stay']
+
+def hospital_statistics_dashboard():
+    st.subheader('Welcome to the Hospital Dashboard!')
+    st.write("Welcome to the Hospital Dashboard—a comprehensive platform designed to provide actionable insights into hospital operations, patient care, and resource management. This dashboard offers an intuitive interface to explore key metrics such as patient demographics, admission trends, and outcome analysis, empowering stakeholders to make data-driven decisions.")
+    
+    if streaming_mode():
+        st.warning("This page needs row-level data, which is not loaded when the dataset is processed in streaming mode.")
+        return
+
+    with section("Load data"):
+        # Filters, counts and rows come from the query backend (cached across reruns);
+        # in approximate mode the counts are first estimated from a sample
+        backend = get_backend()
+        sample = load_sample()
+
+    with section("Filters"):
+        # Sidebar filters
+        st.sidebar.title("Filters")
+        min_age, max_age = backend.value_range('Age') or DEFAULT_AGE_RANGE
+        age_range = st.sidebar.slider(
+            "Select Age Range", 
+            min_value=int(min_age), 
+            max_value=int(max_age), 
+            value=(20, 60)
+        )
+        selected_gender = st.sidebar.multiselect(
+            "Select Gender", 
+            options=backend.options('Gender'), 
+            default=backend.options('Gender')
+        )
+        selected_hospitals = st.sidebar.multiselect(
+            "Select Hospital(s)", 
+            options=backend.options('Hospital Names'), 
+            default=backend.options('Hospital Names')
+        )
+        selected_month = st.sidebar.selectbox(
+            "Select Month",
+            options=["Overall"] + list(range(1, 13)),  # Adding 'Overall' option
+            index=0
+        )
+
+        # Counts for the KPI boxes and count charts are rolled up by the backend
+        cube_filters = {'Gender': selected_gender, 'Hospital Names': selected_hospitals}
+        if selected_month != "Overall":
+            cube_filters['Admission Month'] = [selected_month]
+
+        def count_admissions():
+            return backend.rollup(by='Admission Type', filters=cube_filters, age_range=age_range)['Count']
+
+        # Charts are cached per filter state and reused when the same filters come back
+        filter_state = (age_range, selected_gender, selected_hospitals, selected_month)
+
+    with section("Filtered Data Preview"):
+        # Display filtered data preview for debugging
+        st.write("Filtered Data Preview")
+        # Filled in once the rows are fetched below
+        preview_slot = st.empty()
+
+    with section("Hospital Statistics"):
+        # Display statistics
+        st.title("Hospital Statistics")
+
+        # Define a function to create a decorated box
+        def create_box(title, value, col):
+            box_style = "border: 2px solid #4682B4; border-radius: 10px; padding: 10px; background-color: #E0EBF5; width: 150px; height:150px;"
+            col.markdown(
+                f"""
+                <div style="{box_style}">
+                    <h3 style="color: #4682B4;">{title}</h3>
+                    <p style="font-size: 20px; font-weight: bold; color: #1E90FF;">{value}</p>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+        # Admissions per type and in total; estimates also hold the margins of their 95% intervals
+        def admission_statistics():
+            admission_counts = count_admissions()
+            return {'Count': {**admission_counts.to_dict(), 'Total': admission_counts.sum()}}
+
+        def estimate_statistics():
+            admission_counts = sample.estimate_counts('Admission Type', cube_filters, age_range)
+            totals = sample.estimate(cube_filters, age_range)
+            return {'Count': {**admission_counts['Count'].to_dict(), 'Total': totals['Count']},
+                    'Count Margin': {**admission_counts['Count Margin'].to_dict(), 'Total': totals['Count Margin']}}
+
+        # Display statistics boxes
+        box_slots = [col.empty() for col in st.columns(4)]
+
+        def show_statistics(statistics, approximate):
+            for slot, title, name in zip(box_slots, ["Total Patients", "Emergency Count", "Urgent Count", "Elective Count"],
+                                         ['Total', 'Emergency', 'Urgent', 'Elective']):
+                value = int(round(statistics['Count'].get(name, 0)))
+                if approximate:
+                    value = f"≈ {value} ± {int(round(statistics['Count Margin'].get(name, 0)))}"
+                create_box(title, value, slot)
+        progressive('admission statistics', filter_state, admission_statistics,
+                    estimate_statistics if sample is not None else None, show_statistics)
+
+    with section("Filtered rows"):
+        # Apply filters (the same selections, pushed down to the backend). Only
+        # the preview's rows are fetched; the charts below ask the backend for
+        # counts per value instead of the filtered rows.
+        row_ranges = {'Age': age_range}
+        preview_slot.write(backend.head(STATISTICS_COLUMNS, cube_filters, row_ranges))
+
+    # The charts below are independent of one another, so the ones not cached
+    # yet are built concurrently and placed as they finish
+    with concurrent_charts():
+        with section("Medical Condition Statistics"):
+            # Medical Condition Tree Plot
+            st.title("Medical Condition Statistics")
+            def build_condition_tree():
+                condition_counts = backend.rollup(by='Medical Condition', filters=cube_filters, age_range=age_range)['Count']
+                medical_condition_counts = condition_counts.sort_values(ascending=False).head(7).reset_index()
+                medical_condition_counts.columns = ['Medical Condition', 'Count']
+                # Plain strings: the treemap groups by its path column and must
+                # not see conditions without rows
+                medical_condition_counts['Medical Condition'] = medical_condition_counts['Medical Condition'].astype(str)
+                fig_tree = px.treemap(
+                    medical_condition_counts,
+                    path=['Medical Condition'],
+                    values='Count',
+                    color='Count',
+                    color_continuous_scale='darkmint',
+                    labels={'Count': 'Frequency'}
+                )
+                return fig_tree
+            cached_plotly_chart('condition_tree', filter_state, build_condition_tree, use_container_width=True)
+
+        with section("Admission Type Distribution"):
+            # Admission Type Distribution
+            st.title("Admission Type Distribution")
+            def build_admission_bar():
+                admission_type_counts = count_admissions().sort_values(ascending=False).reset_index()
+                admission_type_counts.columns = ['Admission Type', 'Count']
+                fig_admission = px.bar(admission_type_counts, x='Admission Type', y='Count', text='Count', template="seaborn")
+                fig_admission.update_traces(textposition='outside')
+                fig_admission.update_layout(yaxis_title="Count", xaxis_title="Admission Type")
+                return fig_admission
+            cached_plotly_chart('admission_bar', filter_state, build_admission_bar, use_container_width=True)
+
+        with section("Age Distribution"):
+            # Age Distribution
+            st.title("Age Distribution")
+            def build_age_histogram():
+                # Bin counts are computed here so only 10 bars are sent to the browser
+                ages = backend.value_counts('Age', cube_filters, row_ranges)
+                counts, edges = histogram_summary(ages.index, bins=10, weights=ages.to_numpy())
+                fig_age = go.Figure(plotly_histogram(counts, edges, name='Patient Age'))
+                fig_age.update_layout(
+                    title="Filtered Age Distribution of Patients",
+                    template='seaborn',
+                    bargap=0
+                )
+                fig_age.update_layout(yaxis_title="Count", xaxis_title="Age")
+                return fig_age
+            cached_plotly_chart('age_histogram', filter_state, build_age_histogram, use_container_width=True)
+
+        # Gender Distribution
+        # st.title("Gender Distribution")
+        # gender_counts = filtered_data['Gender'].value_counts().reset_index()
+        # gender_counts.columns = ['Gender', 'Count']
+        # fig_gender = px.bar(
+        #     gender_counts,
+        #     x='Gender',
+        #     y='Count',
+        #     text='Count',
+        #     template='seaborn',
+        #     title="Filtered Gender Distribution of Patients"
+        # )
+        # fig_gender.update_traces(textposition='outside')
+        # fig_gender.update_layout(yaxis_title="Count", xaxis_title="Gender")
+        # st.plotly_chart(fig_gender, use_container_width=True)
+
+        # Medical Condition Tree Plot
+        # st.title("Medical Condition Statistics")
+        # medical_condition_counts = filtered_data['Medical Condition'].value_counts().head(7).reset_index()
+        # medical_condition_counts.columns = ['Medical Condition', 'Count']
+        # fig_tree = px.treemap(
+        #     medical_condition_counts,
+        #     path=['Medical Condition'],
+        #     values='Count',
+        #     color='Count',
+        #     color_continuous_scale='darkmint',
+        #     labels={'Count': 'Frequency'}
+        # )
+        # st.plotly_chart(fig_tree, use_container_width=True)
+
+        with section("KDE Plot for Duration of Stay"):
+            # KDE Plot for Duration of Stay
+            st.title('KDE Plot for Duration of Stay')
+            def build_stay_kde():
+                stays = backend.value_counts('Length of Stay', cube_filters, row_ranges)
+                fig = Figure(figsize=(10, 6))
+                ax = fig.subplots()
+                # Stays are whole days, so the binned FFT KDE of their counts
+                # matches sns.kdeplot's gaussian_kde on the rows to within 1e-12
+                # of the peak density
+                grid, density = binned_kde(stays.index, stays.to_numpy(), frequency=True)
+                ax.plot(grid, density, color='blue', label='Duration of Stay')
+                mean_duration_stay = np.average(stays.index, weights=stays.to_numpy()) if len(stays) else np.nan
+                ax.axvline(mean_duration_stay, color='blue', linestyle='dashed', linewidth=2, label=f'Mean: {mean_duration_stay:.2f} days')
+                ax.legend()
+                ax.set_title('Duration of Stay')
+                ax.set_xlabel('Duration (Days)')
+                ax.set_ylabel('Density')
+                return fig
+            cached_pyplot('stay_kde', filter_state, build_stay_kde)
+
+    # Estimated statistics are replaced by the exact ones as they finish
+    refine_estimates()
+
+if __name__ == '__main__':
+    hospital_statistics_dashboard()
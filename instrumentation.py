@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import streamlit as st
+
+# Set DASHBOARD_PROFILE=1 to time every dashboard section and measure what it allocates
+ENABLED = os.environ.get('DASHBOARD_PROFILE') == '1'
+LOG_PATH = os.environ.get('DASHBOARD_PROFILE_LOG', 'profile.jsonl')
+
+# Each script run has its own thread, so the open sections and the records
+# of the current run are kept per thread
+_run = threading.local()
+_log_lock = threading.Lock()
+
+# Name -> function returning a dict of counters, such as a cache's hits and
+# evictions, listed under the sections in the panel
+_counters = {}
+
+
+def _current_run():
+    # Threads that never started a run, such as the pools building charts and
+    # aggregates for a page, record nothing
+    return _run if hasattr(_run, 'records') else None
+
+
+def start_run(page):
+    _run.page = page
+    _run.started = time.time()
+    _run.clock = time.perf_counter()
+    _run.records = []
+    _run.stack = []
+
+
+@contextmanager
+def section(name):
+    # Wall time, net allocated bytes and peak allocation above the starting
+    # point of a named section. Nested sections are recorded under their
+    # parent's name, e.g. "Age Distribution / figure build".
+    run = _current_run()
+    if not ENABLED or run is None:
+        yield
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    current, peak = tracemalloc.get_traced_memory()
+    if run.stack:
+        # reset_peak() below is global, so the parent keeps the peak seen so far
+        run.stack[-1]['peak'] = max(run.stack[-1]['peak'], peak)
+    tracemalloc.reset_peak()
+    frame = {'name': name, 'start_bytes': current, 'peak': current}
+    run.stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(frame['peak'], peak)
+        run.stack.pop()
+        if run.stack:
+            run.stack[-1]['peak'] = max(run.stack[-1]['peak'], peak)
+        run.records.append({
+            'section': ' / '.join([parent['name'] for parent in run.stack] + [name]),
+            'depth': len(run.stack),
+            'offset_seconds': start - run.clock,
+            'seconds': seconds,
+            'allocated_bytes': current - frame['start_bytes'],
+            'peak_bytes': peak - frame['start_bytes']
+        })
+
+
+def register_counters(name, read):
+    _counters[name] = read
+
+
+def finish_run():
+    # Append the run's sections to the JSON lines log and return them
+    run = _current_run()
+    if run is None:
+        return []
+    records = [dict(record, page=run.page, run_started=run.started) for record in run.records]
+    if records:
+        with _log_lock, open(LOG_PATH, 'a') as log:
+            for record in records:
+                log.write(json.dumps(record) + '\n')
+    start_run(run.page)
+    return records
+
+
+def render_panel():
+    if not ENABLED:
+        return
+    # pandas is only needed to show the tables; the navigation page imports this
+    # module and stays light without it
+    import pandas as pd
+
+    records = finish_run()
+    with st.sidebar.expander('Performance profile'):
+        if records:
+            # Sections are recorded as they close; list them in the order they opened
+            frame = pd.DataFrame(records).sort_values('offset_seconds')
+            frame = pd.DataFrame({
+                'Section': ['  ' * depth + name.split(' / ')[-1] for depth, name in zip(frame['depth'], frame['section'])],
+                'Time (ms)': frame['seconds'] * 1000,
+                'Allocated (MB)': frame['allocated_bytes'] / 2 ** 20,
+                'Peak (MB)': frame['peak_bytes'] / 2 ** 20
+            })
+            st.dataframe(frame.round(2), hide_index=True)
+            st.caption(f'Appended to {LOG_PATH}')
+        else:
+            st.write('No sections were recorded.')
+        for name, read in _counters.items():
+            st.write(name)
+            st.dataframe(pd.DataFrame([read()]), hide_index=True)
@@ -1,88 +1,148 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
 import matplotlib.dates as mdates
+from matplotlib.artist import setp
+from chart_summaries import box_summaries, histogram_summary, matplotlib_box_stats
+from data_grid import paged_query_grid
+from data_loader import get_derived, load_stream_aggregates, streaming_mode
+from fast_kde import binned_kde
+from figure_cache import cached_pyplot
+from instrumentation import section
+from query_backend import DEFAULT_AGE_RANGE, get_backend
+from time_rollups import PERIOD_DAYS, RESOLUTION_LABELS, TIMELINE_COLUMNS, build_timeline
+
+# Columns of the filtered data table, in dataset order
+GRID_COLUMNS = ['Name', 'Age', 'Gender', 'Blood Type', 'Medical Condition', 'Date of Admission', 'Doctor',
+                'Hospital Names', 'Insurance Provider', 'Billing Amount', 'Room Number', 'Admission Type',
+                'Discharge Date', 'Medication', 'Test Results', 'ID', 'Length of Stay']
+
+# Renamed to match the dataset description
+GRID_LABELS = {'Medication': 'Medication Prescribed', 'Test Results': 'Outcome'}
 
 def main_dashboard():
     # Your main dashboard content goes here
-    data = pd.read_csv('healthcare_dataset 2.csv')
-    print(data.columns)
-
-    # Rename columns to match the dataset description
-    data.rename(columns={
-        'Medication': 'Medication Prescribed',
-        'Test Results': 'Outcome'
-    }, inplace=True)
-
-    st.sidebar.title('Dashboard Options')
-
-    # Sidebar filter options
-    selected_gender = st.sidebar.selectbox('Select Gender', data['Gender'].unique())
-    selected_age = st.sidebar.slider('Select Age', float(data['Age'].min()), float(data['Age'].max()), (float(data['Age'].min()), float(data['Age'].max())))
-
-    # Filter the data based on user selections
-    filtered_data = data[(data['Gender'] == selected_gender) & (data['Age'] >= selected_age[0]) & (data['Age'] <= selected_age[1])]
-
-    # Display the filtered data
-    st.write('### Filtered Data')
-    st.write(filtered_data)
-
-    # Create a 2x2 grid layout for plots using subplots
-    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(12, 10))
-
-    # Plot 1: Bar chart
-    axes[0, 0].set_title('Outcome Counts')
-    bar_data = filtered_data['Outcome'].value_counts()
-    bar_data.plot(kind='bar', ax=axes[0, 0], rot=0)
-    axes[0, 0].set_ylabel('Count')
-
-    # Plot 2: Histogram for Age
-    axes[0, 1].set_title('Age Distribution')
-    sns.histplot(data=filtered_data, x='Age', bins=20, kde=True, ax=axes[0, 1])
-    axes[0, 1].set_xlabel('Age')
-    axes[0, 1].set_ylabel('Count')
-
-    # Plot 3: Monthly admission count bar chart
-    axes[1, 0].clear()  # Clear the previous messy plot
-    axes[1, 0].set_title('Monthly Admission Count')
-
-    # Resample data to monthly frequency and create bar chart
-    line_data = filtered_data.groupby('Date of Admission').size().reset_index(name='Count')
-    line_data['Date of Admission'] = pd.to_datetime(line_data['Date of Admission'])
-    monthly_data = line_data.set_index('Date of Admission').resample('M')['Count'].sum().reset_index()
-
-    # Create bar plot
-    axes[1, 0].bar(monthly_data['Date of Admission'], 
-                monthly_data['Count'],
-                color='steelblue',
-                alpha=0.7,
-                width=20)  # Adjust width as needed
-
-    # Format x-axis to show dates nicely
-    axes[1, 0].xaxis.set_major_locator(mdates.MonthLocator(interval=6))  # Show every 6 months
-    axes[1, 0].xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
-    plt.setp(axes[1, 0].xaxis.get_majorticklabels(), rotation=45, ha='right')
-
-    # Add labels and grid
-    axes[1, 0].set_xlabel('Date of Admission')
-    axes[1, 0].set_ylabel('Number of Admissions')
-    axes[1, 0].grid(True, alpha=0.3, axis='y')
-
-    # Adjust layout to prevent label cutoff
-    plt.tight_layout()
-
-    # Plot 4: Box plot for Age by Outcome
-    axes[1, 1].set_title('Age Distribution by Outcome')
-    sns.boxplot(x='Outcome', y='Age', data=filtered_data, ax=axes[1, 1])
-    axes[1, 1].set_xlabel('Outcome')
-    axes[1, 1].set_ylabel('Age')
-
-    # Adjust layout
-    plt.tight_layout()
-
-    # Display the Matplotlib plot using Streamlit
-    st.pyplot(fig)
+    with section("Load data"):
+        streaming = streaming_mode()
+        if streaming:
+            # Too large to load: every chart is drawn from the streamed frequency tables
+            stream = load_stream_aggregates()
+            filters = stream
+            timeline = stream.timeline
+        else:
+            # Filters and rows come from the query backend
+            filters = get_backend()
+            timeline = get_derived('timeline', build_timeline, TIMELINE_COLUMNS)
+
+    with section("Filters"):
+        st.sidebar.title('Dashboard Options')
+
+        # Sidebar filter options
+        min_age, max_age = filters.value_range('Age') or DEFAULT_AGE_RANGE
+        selected_gender = st.sidebar.selectbox('Select Gender', filters.options('Gender'))
+        selected_age = st.sidebar.slider('Select Age', float(min_age), float(max_age), (float(min_age), float(max_age)))
+
+    with section("Filtered Data"):
+        st.write('### Filtered Data')
+        if streaming:
+            counts = stream.demographics
+            counts = counts[(counts['Gender'] == selected_gender) & counts['Age'].between(*selected_age)]
+            counts = counts.rename(columns={'Test Results': 'Outcome'})
+
+            st.info('The dataset is processed in streaming mode, so admissions are summarised by age and outcome.')
+            st.write(counts.pivot_table(index='Age', columns='Outcome', values='Rows', aggfunc='sum', fill_value=0))
+        else:
+            # Display the filtered data a page at a time; only the page's rows are gathered
+            row_filters, row_ranges = {'Gender': [selected_gender]}, {'Age': selected_age}
+            paged_query_grid('filtered data', filters, GRID_COLUMNS, row_filters, row_ranges,
+                             (selected_gender, selected_age), labels=GRID_LABELS)
+
+    def grid_inputs():
+        # Ages and outcomes of the filtered admissions, with row counts as
+        # weights in streaming mode; only needed when the grid is rendered
+        if streaming:
+            return counts['Age'], counts['Outcome'], counts['Rows'], counts.groupby('Outcome')['Rows'].sum()
+        rows = filters.rows(['Age', 'Test Results'], row_filters, row_ranges).rename(columns=GRID_LABELS)
+        return rows['Age'], rows['Outcome'], None, rows['Outcome'].value_counts()
+
+    # The grid is rendered once per filter state and served from the figure cache afterwards
+    def build_grid():
+        ages, outcomes, weights, outcome_counts = grid_inputs()
+
+        # Create a 2x2 grid layout for plots using subplots
+        fig = Figure(figsize=(12, 10))
+        axes = fig.subplots(nrows=2, ncols=2)
+
+        # Plot 1: Bar chart
+        axes[0, 0].set_title('Outcome Counts')
+        bar_data = outcome_counts.loc[lambda counts: counts > 0].sort_values(ascending=False)
+        bar_data.plot(kind='bar', ax=axes[0, 0], rot=0)
+        axes[0, 0].set_ylabel('Count')
+
+        # Plot 2: Histogram for Age
+        axes[0, 1].set_title('Age Distribution')
+        # Bars come from the 20 bin counts; the KDE is the binned FFT estimate scaled to counts
+        age_counts, edges = histogram_summary(ages, bins=20, weights=weights)
+        age_bins = pd.DataFrame({'Age': (edges[:-1] + edges[1:]) / 2, 'Count': age_counts})
+        sns.histplot(data=age_bins, x='Age', weights='Count', bins=edges.tolist(), ax=axes[0, 1])
+        grid, density = binned_kde(ages, weights, cut=0, frequency=True)
+        axes[0, 1].plot(grid, density * age_counts.sum() * (edges[1] - edges[0]))
+        axes[0, 1].set_xlabel('Age')
+        axes[0, 1].set_ylabel('Count')
+
+        # Plot 3: Admission count bar chart
+        axes[1, 0].clear()  # Clear the previous messy plot
+
+        # Counts over the selected dates from the time series pyramid, at the
+        # finest resolution that keeps the bars readable
+        admission_counts, resolution = timeline.series(filters={'Gender': [selected_gender]},
+                                                       age_range=selected_age, start=date_range[0],
+                                                       end=date_range[1])
+        axes[1, 0].set_title(f'{RESOLUTION_LABELS[resolution]} Admission Count')
+
+        # Create bar plot, each bar starting at its period's first day
+        axes[1, 0].bar(admission_counts.index, 
+                    admission_counts.to_numpy(),
+                    color='steelblue',
+                    alpha=0.7,
+                    width=PERIOD_DAYS[resolution] * 0.7,
+                    align='edge')
+
+        # Format x-axis to show dates nicely
+        locator = mdates.AutoDateLocator()
+        axes[1, 0].xaxis.set_major_locator(locator)
+        axes[1, 0].xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        setp(axes[1, 0].xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+        # Add labels and grid
+        axes[1, 0].set_xlabel('Date of Admission')
+        axes[1, 0].set_ylabel('Number of Admissions')
+        axes[1, 0].grid(True, alpha=0.3, axis='y')
+
+        # Adjust layout to prevent label cutoff
+        fig.tight_layout()
+
+        # Plot 4: Box plot for Age by Outcome
+        axes[1, 1].set_title('Age Distribution by Outcome')
+        outcome_summaries = box_summaries(ages, outcomes, weights=weights)
+        axes[1, 1].bxp(matplotlib_box_stats(outcome_summaries), patch_artist=True,
+                       boxprops={'facecolor': sns.color_palette()[0]}, medianprops={'color': 'black'})
+        axes[1, 1].set_xlabel('Outcome')
+        axes[1, 1].set_ylabel('Age')
+
+        # Adjust layout
+        fig.tight_layout()
+
+        return fig
+
+    with section("Dashboard grid"):
+        # Zooms the admission count chart; it is redrawn from the pyramid
+        first_day, last_day = (day.date() for day in timeline.date_range())
+        date_range = st.slider('Admission dates', first_day, last_day, (first_day, last_day))
+
+        # Display the Matplotlib plot using Streamlit
+        cached_pyplot('main_grid', (selected_gender, selected_age, date_range), build_grid)
 
 # Run the Streamlit app
 if __name__ == '__main__':
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+
+from snapshot import concat_frames
+
+# Ages are whole years. Roll-ups without an age range read cells without age,
+# and those with one the cells of age buckets of this many years inside the
+# range; the ages at either end of the range that cut through a bucket are
+# read from the cells by exact age, of which a range touches at most
+# 2 * (AGE_BUCKET_WIDTH - 1). No level grows with the rows beyond the number
+# of distinct combinations.
+AGE_BUCKET_WIDTH = 10
+
+CUBE_DIMENSIONS = ['Hospital Names', 'Insurance Provider', 'Medical Condition', 'Admission Type',
+                   'Gender', 'Admission Month']
+CUBE_MEASURES = ['Billing Amount', 'Length of Stay']
+CUBE_COLUMNS = ['Hospital Names', 'Insurance Provider', 'Medical Condition', 'Admission Type',
+                'Gender', 'Date of Admission', 'Age', 'Billing Amount', 'Length of Stay']
+
+# The cells of appended rows are kept in a delta cube next to the main one,
+# which is regrouped with them once the delta holds more than this share of
+# the rows; roll-ups add up cells that appear in both
+DELTA_FOLD_RATIO = 0.05
+
+
+def _measure_columns():
+    additive = ['Rows', 'Billing Stay Product Sum'] + [
+        f'{measure} {stat}' for measure in CUBE_MEASURES for stat in ('Count', 'Sum', 'Sumsq')
+    ]
+    minimums = [f'{measure} Min' for measure in CUBE_MEASURES]
+    maximums = [f'{measure} Max' for measure in CUBE_MEASURES]
+    return additive, minimums, maximums
+
+
+def _sorted_by_age(cells, age):
+    # Stable, so cells of the same age stay in key order; missing ages go last
+    return cells.reset_index().sort_values(age, kind='stable', ignore_index=True)
+
+
+def _group_rows(data):
+    # One row per observed combination of the dimensions and the exact age,
+    # holding count, sum, sum of squares, min and max of every measure
+    frame = data[[column for column in CUBE_COLUMNS if column != 'Date of Admission']]
+    frame = frame.assign(**{'Admission Month': data['Date of Admission'].dt.month})
+    aggregations = {'Rows': ('Billing Amount', 'size')}
+    for measure in CUBE_MEASURES:
+        frame[f'{measure} Squared'] = frame[measure] ** 2
+        aggregations[f'{measure} Count'] = (measure, 'count')
+        aggregations[f'{measure} Sum'] = (measure, 'sum')
+        aggregations[f'{measure} Sumsq'] = (f'{measure} Squared', 'sum')
+        aggregations[f'{measure} Min'] = (measure, 'min')
+        aggregations[f'{measure} Max'] = (measure, 'max')
+    # Cross products give the billing / stay correlation for any roll-up
+    frame['Billing Stay Product'] = frame['Billing Amount'] * frame['Length of Stay']
+    aggregations['Billing Stay Product Sum'] = ('Billing Stay Product', 'sum')
+    return frame.groupby(CUBE_DIMENSIONS + ['Age'], observed=True, dropna=False).agg(**aggregations)
+
+
+def _combine():
+    # How cells combine: additive measures add up, extremes are kept
+    additive, minimums, maximums = _measure_columns()
+    aggregations = {column: 'sum' for column in additive}
+    aggregations.update({column: 'min' for column in minimums})
+    aggregations.update({column: 'max' for column in maximums})
+    return aggregations
+
+
+def _regroup(cells, keys):
+    return cells.groupby(keys, observed=True, dropna=False).agg(_combine())
+
+
+def _age_positions(ages, offset, low, high, side='right'):
+    # Positions of the cells with age from low up to high (inclusive with side
+    # 'right') in a run of cells sorted by age that starts at offset
+    return np.arange(offset + np.searchsorted(ages, low, side='left'),
+                     offset + np.searchsorted(ages, high, side=side))
+
+
+# The cells of the rows by every dimension, and by_age: their cells by every
+# dimension and age bucket, followed by those by every dimension and exact
+# age, each run sorted by 'Age' (the first age of the bucket in the bucket
+# run) so an age range reads a few slices of it. Cells of rows appended after
+# these are kept in the delta cube.
+class AggregateCube:
+    def __init__(self, cells, by_age, n_buckets, delta=None):
+        self.cells = cells
+        self.by_age = by_age
+        self.n_buckets = n_buckets
+        self.delta = delta
+
+    @classmethod
+    def from_ages(cls, ages):
+        # Coarser levels are rolled up from the exact-age cells, never from rows
+        buckets = ages.assign(Age=ages['Age'] // AGE_BUCKET_WIDTH * AGE_BUCKET_WIDTH)
+        buckets = _sorted_by_age(_regroup(buckets, CUBE_DIMENSIONS + ['Age']), 'Age')
+        cells = _regroup(buckets, CUBE_DIMENSIONS).reset_index()
+        return cls(cells, pd.concat([buckets, ages], ignore_index=True), len(buckets))
+
+    def ages(self):
+        # The cells by exact age
+        return self.by_age.iloc[self.n_buckets:]
+
+    def rows(self):
+        return int(sum(part.cells['Rows'].sum() for part in self._parts()))
+
+    def _parts(self):
+        return [self] if self.delta is None else [self, self.delta]
+
+    def extend(self, data):
+        # Cells of data, the rows appended after these, go into the delta cube
+        tail = build_cube(data)
+        delta = tail if self.delta is None else merge_cubes([self.delta, tail])
+        main = AggregateCube(self.cells, self.by_age, self.n_buckets)
+        if delta.rows() > DELTA_FOLD_RATIO * main.rows():
+            return merge_cubes([main, delta])
+        return AggregateCube(self.cells, self.by_age, self.n_buckets, delta)
+
+    def select(self, filters=None, age_range=None):
+        # The cells holding the filtered rows: with an age range, the buckets
+        # inside it and the exact ages of the buckets it cuts through
+        runs = []
+        for part in self._parts():
+            if age_range is None:
+                runs.append(part.cells)
+                continue
+            low, high = age_range
+            first = -(-low // AGE_BUCKET_WIDTH) * AGE_BUCKET_WIDTH
+            stop = (high + 1) // AGE_BUCKET_WIDTH * AGE_BUCKET_WIDTH
+            ages = part.by_age['Age'].to_numpy()
+            buckets, exact = ages[:part.n_buckets], ages[part.n_buckets:]
+            if first >= stop:
+                positions = _age_positions(exact, part.n_buckets, low, high)
+            else:
+                positions = np.concatenate([_age_positions(buckets, 0, first, stop, side='left'),
+                                            _age_positions(exact, part.n_buckets, low, first, side='left'),
+                                            _age_positions(exact, part.n_buckets, stop, high)])
+            runs.append(part.by_age.iloc[positions])
+        return select_cells(concat_frames(runs) if len(runs) > 1 else runs[0], filters)
+
+
+def build_cube(data, previous=None):
+    # With the cube of the rows before them, data holds only the appended rows
+    if previous is not None:
+        return previous.extend(data)
+    return AggregateCube.from_ages(_sorted_by_age(_group_rows(data), 'Age'))
+
+
+def merge_cubes(cubes):
+    # Cubes built from disjoint sets of rows combine into the cube of their union
+    parts = [piece for cube in cubes for piece in cube._parts()]
+    ages = _regroup(concat_frames([part.ages() for part in parts]), CUBE_DIMENSIONS + ['Age'])
+    return AggregateCube.from_ages(_sorted_by_age(ages, 'Age'))
+
+
+def concat_cubes(cubes):
+    # Cubes of rows that differ in a dimension (the warm-up partitions them
+    # by hospital) share no cell, so their cells are only put together
+    buckets = concat_frames([cube.by_age.iloc[:cube.n_buckets] for cube in cubes])
+    buckets = buckets.sort_values('Age', kind='stable', ignore_index=True)
+    ages = concat_frames([cube.ages() for cube in cubes]).sort_values('Age', kind='stable', ignore_index=True)
+    cells = concat_frames([cube.cells for cube in cubes]).reset_index(drop=True)
+    return AggregateCube(cells, pd.concat([buckets, ages], ignore_index=True), len(buckets))
+
+
+def select_cells(cells, filters=None):
+    # Filters map a dimension to the accepted values; cost is linear in the
+    # number of cells. Age ranges are left to the callers, whose cells hold
+    # age buckets (AggregateCube.select) or exact ages (the timeline).
+    mask = np.ones(len(cells), dtype=bool)
+    for dimension, values in (filters or {}).items():
+        mask &= cells[dimension].isin(list(values)).to_numpy()
+    return cells[mask]
+
+
+def finish_rollup(sums):
+    # Turns summed cells (the cube's measure columns, grouped or not) into
+    # counts, totals, means, standard deviations and the correlation
+    result = pd.DataFrame({'Count': sums['Rows']}, index=sums.index)
+    for measure in CUBE_MEASURES:
+        count = sums[f'{measure} Count']
+        total = sums[f'{measure} Sum']
+        # Sample variance from sufficient statistics, matching pandas' ddof=1
+        variance = (sums[f'{measure} Sumsq'] - total ** 2 / count) / (count - 1)
+        # Floats whatever the measure's dtype, as SQLite's TOTAL returns them
+        result[f'{measure} Total'] = total.astype(float)
+        result[f'{measure} Mean'] = total / count
+        result[f'{measure} Std'] = np.sqrt(variance.clip(lower=0))
+        result[f'{measure} Min'] = sums[f'{measure} Min']
+        result[f'{measure} Max'] = sums[f'{measure} Max']
+
+    # Pearson correlation of billing and stay from the same sufficient statistics
+    n = sums['Rows']
+    billing, stay = sums['Billing Amount Sum'], sums['Length of Stay Sum']
+    covariance = n * sums['Billing Stay Product Sum'] - billing * stay
+    spread = (n * sums['Billing Amount Sumsq'] - billing ** 2) * (n * sums['Length of Stay Sumsq'] - stay ** 2)
+    result['Billing Stay Correlation'] = covariance / np.sqrt(spread)
+    return result
+
+
+def rollup(cube, by=None, filters=None, age_range=None):
+    # Totals, means and standard deviations for the filtered cells, grouped by
+    # the given dimensions or collapsed to a single row when by is None;
+    # cost is linear in the selected cells, not in the rows
+    cells = cube.select(filters, age_range)
+    additive, minimums, maximums = _measure_columns()
+
+    if by is None:
+        sums = pd.concat([cells[additive].sum(), cells[minimums].min(), cells[maximums].max()])
+        return finish_rollup(sums.to_frame().T).iloc[0]
+
+    sums = cells.groupby(by, observed=True, sort=False).agg(_combine())
+    # The groups are indexed by plain values in ascending order, as the SQLite
+    # backend's ORDER BY returns them; rows with a missing key are left out
+    keys = list(sums.index.names)
+    sums = sums.reset_index()
+    for key in keys:
+        if isinstance(sums[key].dtype, pd.CategoricalDtype):
+            sums[key] = sums[key].astype(sums[key].cat.categories.dtype)
+        elif pd.api.types.is_integer_dtype(sums[key].dtype):
+            sums[key] = sums[key].astype('int64')
+    return finish_rollup(sums.sort_values(keys, ignore_index=True).set_index(keys))
@@ -1,81 +1,111 @@
 import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from data_grid import paged_grid
+from data_loader import get_derived_rows, streaming_mode
+from figure_cache import cached_pyplot
+from instrumentation import section
+from patient_index import build_patient_index, normalize_id
+
+# Columns read from the snapshot for the patient page
+PATIENT_COLUMNS = ['ID', 'Name', 'Age', 'Gender', 'Blood Type', 'Medical Condition', 'Doctor',
+                   'Hospital Names', 'Insurance Provider', 'Room Number', 'Admission Type',
+                   'Date of Admission', 'Discharge Date', 'Medication', 'Test Results',
+                   'Billing Amount', 'Length of Stay']
 
 def patient_dashboard():
     #st.set_option('deprecation.showPyplotGlobalUse', False)
     st.title("Patient Dashboard")
-    data = pd.read_csv('healthcare_dataset 2.csv')
-    st.write("Kindly enter any ID from the main dashboard page.")
-
-    # Add a text input box for ID
-    patient_id = st.text_input("Enter Patient ID:")
+    if streaming_mode():
+        st.warning("Patient lookups need row-level data, which is not loaded when the dataset is processed in streaming mode.")
+        return
+    with section("Load data"):
+        # Look the patient up in the prebuilt index instead of scanning every
+        # row; the index comes with the rows it was built from, so an append
+        # in between cannot leave its positions pointing past them
+        patient_index, data = get_derived_rows('patient_index', build_patient_index, PATIENT_COLUMNS)
+        st.write("Kindly enter any ID from the main dashboard page.")
 
-    # Filter data based on ID
+        # Add a text input box for ID
+        patient_id = st.text_input("Enter Patient ID:")
     if patient_id:
-        filtered_data = data[data['ID'] == patient_id]
+        patient_rows = patient_index.lookup(patient_id)
+
+        if patient_rows is not None:
+            filtered_data = data.take(patient_rows)
+            summary = patient_index.summary(patient_id)
 
-        if not filtered_data.empty:
-            # Display patient basic information
-            st.subheader(f"Patient Information for ID: {patient_id}")
-            patient_info = filtered_data.iloc[0]
+            with section("Patient Information"):
+                # Display patient basic information
+                st.subheader(f"Patient Information for ID: {patient_id}")
+                patient_info = filtered_data.iloc[0]
             
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write(f"Name: {patient_info['Name']}")
-                st.write(f"Age: {patient_info['Age']}")
-                st.write(f"Gender: {patient_info['Gender']}")
-                st.write(f"Blood Type: {patient_info['Blood Type']}")
-                st.write(f"Medical Condition: {patient_info['Medical Condition']}")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write(f"Name: {patient_info['Name']}")
+                    st.write(f"Age: {patient_info['Age']}")
+                    st.write(f"Gender: {patient_info['Gender']}")
+                    st.write(f"Blood Type: {patient_info['Blood Type']}")
+                    st.write(f"Medical Condition: {patient_info['Medical Condition']}")
             
-            with col2:
-                st.write(f"Doctor: {patient_info['Doctor']}")
-                st.write(f"Hospital: {patient_info['Hospital Names']}")
-                st.write(f"Insurance: {patient_info['Insurance Provider']}")
-                st.write(f"Room Number: {patient_info['Room Number']}")
-                st.write(f"Admission Type: {patient_info['Admission Type']}")
+                with col2:
+                    st.write(f"Doctor: {patient_info['Doctor']}")
+                    st.write(f"Hospital: {patient_info['Hospital Names']}")
+                    st.write(f"Insurance: {patient_info['Insurance Provider']}")
+                    st.write(f"Room Number: {patient_info['Room Number']}")
+                    st.write(f"Admission Type: {patient_info['Admission Type']}")
 
-            # Visit History
-            st.subheader("Visit History")
-            visits_df = filtered_data[['Date of Admission', 'Discharge Date', 'Medical Condition', 
-                                     'Doctor', 'Room Number', 'Medication', 'Test Results']]
-            st.write(visits_df)
+            with section("Visit History"):
+                # Visit History
+                st.subheader("Visit History")
+                visits_df = filtered_data[['Date of Admission', 'Discharge Date', 'Medical Condition', 
+                                         'Doctor', 'Room Number', 'Medication', 'Test Results']]
+                paged_grid('visit history', visits_df, normalize_id(patient_id))
 
-            # Calculate statistics
-            num_visits = len(filtered_data)
-            total_billing = filtered_data['Billing Amount'].sum()
-            avg_stay_length = (pd.to_datetime(filtered_data['Discharge Date']) - 
-                             pd.to_datetime(filtered_data['Date of Admission'])).mean().days
+            with section("Patient Statistics"):
+                # Statistics come from the precomputed patient summary
+                num_visits = summary['visits']
+                total_billing = summary['total_billing']
+                avg_stay_length = summary['mean_stay']
 
-            # Display statistics
-            st.subheader("Patient Statistics")
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Number of Visits", num_visits)
-            with col2:
-                st.metric("Total Billing", f"${total_billing:,.2f}")
-            with col3:
-                st.metric("Average Stay (Days)", f"{avg_stay_length:.1f}")
+                # Display statistics
+                st.subheader("Patient Statistics")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Number of Visits", num_visits)
+                with col2:
+                    st.metric("Total Billing", f"${total_billing:,.2f}")
+                with col3:
+                    st.metric("Average Stay (Days)", f"{avg_stay_length:.1f}")
 
-            # Medical History Analysis
-            st.subheader("Medical History Analysis")
+            with section("Medical History Analysis"):
+                # Medical History Analysis
+                st.subheader("Medical History Analysis")
             
-            # Create a bar chart for medications
-            med_counts = filtered_data['Medication'].value_counts()
-            fig, ax = plt.subplots()
-            med_counts.plot(kind='bar')
-            plt.title('Medication History')
-            plt.xlabel('Medication')
-            plt.ylabel('Frequency')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig)
+                # Create a bar chart for medications
+                def build_medication_chart():
+                    med_counts = summary['medication_counts']
+                    fig = Figure()
+                    ax = fig.subplots()
+                    med_counts.plot(kind='bar', ax=ax)
+                    ax.set_title('Medication History')
+                    ax.set_xlabel('Medication')
+                    ax.set_ylabel('Frequency')
+                    ax.tick_params(axis='x', labelrotation=45)
+                    fig.tight_layout()
+                    return fig
+                if summary['medication_counts'].empty:
+                    st.info("No medications are recorded for this patient.")
+                else:
+                    cached_pyplot('medication_history', normalize_id(patient_id), build_medication_chart)
             
-            # Test Results Distribution
-            st.subheader("Test Results Distribution")
-            test_results = filtered_data['Test Results'].value_counts()
-            st.bar_chart(test_results)
+            with section("Test Results Distribution"):
+                # Test Results Distribution
+                st.subheader("Test Results Distribution")
+                test_results = summary['test_result_counts']
+                if test_results.empty:
+                    st.info("No test results are recorded for this patient.")
+                else:
+                    st.bar_chart(test_results)
 
         else:
             st.warning("No patient found with the given ID.")
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+SUMMARY_COLUMNS = ['ID', 'Billing Amount', 'Length of Stay', 'Medication', 'Test Results']
+
+# Appended rows go into a delta index that is folded into the main one once
+# it holds more than this share of the rows
+DELTA_FOLD_RATIO = 0.05
+
+NO_COUNTS = pd.Series(dtype='int64')
+
+
+def normalize_ids(ids):
+    # 42, 42.0, '42' and ' 42 ' all refer to the same patient
+    text = pd.Series(ids).astype(str).str.strip()
+    numbers = pd.to_numeric(text, errors='coerce')
+    integral = numbers.notna() & (numbers % 1 == 0)
+    text[integral] = numbers[integral].astype('int64').astype(str)
+    return text
+
+
+def normalize_id(patient_id):
+    return normalize_ids([patient_id]).iloc[0]
+
+
+# Maps normalized patient IDs to their row offsets and precomputed summaries
+class PatientIndex:
+    def __init__(self, n_rows, rows, totals, medication_counts, test_result_counts, delta=None):
+        self.n_rows = n_rows
+        self.rows = rows
+        self.totals = totals
+        self.medication_counts = medication_counts
+        self.test_result_counts = test_result_counts
+        self.delta = delta
+
+    @classmethod
+    def build(cls, data, offset=0):
+        rows, totals, medication_counts, test_result_counts = _index_rows(data, offset=offset)
+        return cls(offset + len(data), rows, totals, medication_counts, test_result_counts)
+
+    def extend(self, data):
+        # Index data, the rows appended after the first n_rows. They are kept
+        # in a delta index, so an append costs time proportional to the new
+        # rows rather than to every indexed patient; the delta is folded in
+        # once it has grown.
+        tail = PatientIndex.build(data, offset=self.n_rows)
+        delta = tail if self.delta is None else self.delta._fold(tail)
+        main = self
+        delta_rows = int(delta.totals['visits'].sum())
+        if delta_rows > DELTA_FOLD_RATIO * (tail.n_rows - delta_rows):
+            main, delta = self._fold(delta), None
+
+        return PatientIndex(
+            tail.n_rows,
+            main.rows,
+            main.totals,
+            main.medication_counts,
+            main.test_result_counts,
+            delta
+        )
+
+    def _fold(self, other):
+        # Merge the summaries of another index over later rows into this one
+        merged_rows = dict(self.rows)
+        for patient_id, offsets in other.rows.items():
+            existing = merged_rows.get(patient_id)
+            merged_rows[patient_id] = offsets if existing is None else np.concatenate([existing, offsets])
+
+        return PatientIndex(
+            other.n_rows,
+            merged_rows,
+            self.totals.add(other.totals, fill_value=0),
+            _merge_counts(self.medication_counts, other.medication_counts),
+            _merge_counts(self.test_result_counts, other.test_result_counts)
+        )
+
+    def _parts(self, patient_id):
+        parts = [self] if self.delta is None else [self, self.delta]
+        return [part for part in parts if patient_id in part.rows]
+
+    def lookup(self, patient_id):
+        patient_id = normalize_id(patient_id)
+        parts = self._parts(patient_id)
+        if not parts:
+            return None
+        return np.concatenate([part.rows[patient_id] for part in parts])
+
+    def summary(self, patient_id):
+        patient_id = normalize_id(patient_id)
+        parts = self._parts(patient_id)
+        if not parts:
+            return None
+        totals = sum(part.totals.loc[patient_id] for part in parts)
+        # A patient whose medications or test results are all missing has no counts
+        medication_counts = pd.concat([part.medication_counts.get(patient_id, NO_COUNTS) for part in parts])
+        test_result_counts = pd.concat([part.test_result_counts.get(patient_id, NO_COUNTS) for part in parts])
+        return {
+            'visits': int(totals['visits']),
+            'total_billing': totals['total_billing'],
+            'mean_stay': totals['stay_sum'] / totals['stay_count'] if totals['stay_count'] else np.nan,
+            'medication_counts': medication_counts.groupby(level=0).sum().sort_values(ascending=False),
+            'test_result_counts': test_result_counts.groupby(level=0).sum().sort_values(ascending=False)
+        }
+
+
+def _index_rows(data, offset):
+    ids = normalize_ids(data['ID'].to_numpy()).to_numpy()
+    rows = {
+        patient_id: offsets + offset
+        for patient_id, offsets in pd.Series(ids).groupby(ids, sort=False).indices.items()
+    }
+
+    frame = pd.DataFrame({
+        'ID': ids,
+        'Billing Amount': data['Billing Amount'].to_numpy(),
+        'Length of Stay': data['Length of Stay'].to_numpy(),
+        'Medication': data['Medication'].to_numpy(),
+        'Test Results': data['Test Results'].to_numpy()
+    })
+    totals = frame.groupby('ID').agg(
+        visits=('ID', 'size'),
+        total_billing=('Billing Amount', 'sum'),
+        stay_sum=('Length of Stay', 'sum'),
+        stay_count=('Length of Stay', 'count')
+    )
+    medication_counts = frame.groupby(['ID', 'Medication'], observed=True).size()
+    test_result_counts = frame.groupby(['ID', 'Test Results'], observed=True).size()
+    return rows, totals, medication_counts, test_result_counts
+
+
+def _merge_counts(existing, new):
+    return pd.concat([existing, new]).groupby(level=[0, 1]).sum()
+
+
+def build_patient_index(data, previous=None):
+    # get_derived only passes previous when rows were appended, which it
+    # tells from the file's offset and marker, and data then holds those rows
+    if previous is not None:
+        return previous.extend(data)
+    return PatientIndex.build(data)
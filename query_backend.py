@@ -0,0 +1,517 @@
+import os
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from chart_summaries import MAX_OUTLIERS, WHISKER, box_summaries
+from data_loader import DATA_PATH, dataset_version, get_derived, load_rows
+from downsampling import OUTLIER_SHARE, stratified_sample
+from filter_engine import FILTER_COLUMNS, build_filter_engine
+from olap_cube import CUBE_COLUMNS, CUBE_MEASURES, build_cube, finish_rollup, rollup
+from snapshot import (DATE_COLUMNS, build_lock, drop_unused_categories, ensure_snapshot, is_append,
+                      snapshot_source)
+
+# Backend answering the dashboards' filters and group-bys: 'pandas' works on
+# the in-memory frame and its cube, 'sqlite' pushes them down to a local
+# database so only result-sized data is loaded into Python
+QUERY_BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+
+TABLE = 'admissions'
+INDEXED_COLUMNS = ['Hospital Names', 'Insurance Provider', 'Medical Condition', 'Admission Type',
+                   'Date of Admission', 'ID']
+
+# Rows copied from the snapshot into the database per insert batch
+INSERT_BATCH_ROWS = 100000
+
+# SQLite samples a row while a multiplicative hash of its rowid, taken modulo
+# 2 ** 32, is below the sampling rate; consecutive rowids spread evenly over
+# that range, so every stratum keeps its share of the rows
+SAMPLE_HASH_MULTIPLIER = 2654435761
+
+QUARTILES = [0.25, 0.5, 0.75]
+
+# Age slider bounds the pages fall back to when value_range finds no ages
+DEFAULT_AGE_RANGE = (0, 100)
+
+# Equal-width bins per group that SQLite counts rows in to locate the values
+# a box plot needs
+BOX_BINS = 4096
+
+
+# The protocol every backend implements, shared with StreamAggregates for the
+# sidebar methods: options, value_range (None for a column without values)
+# and linked_options fill the filters; rollup(by, filters, age_range) matches olap_cube.rollup; rows(columns,
+# filters, ranges) returns the matching rows in dataset order. Charts ask for
+# result-sized data instead of the rows: value_counts(column, filters,
+# ranges) of a numeric column, box_summaries(column, by, filters, ranges) matching
+# chart_summaries.box_summaries, sample(columns, n, by, filters, ranges,
+# outlier_columns) of about n rows and head(columns, filters, ranges, n).
+# Grids page the matching rows through positions(filters, ranges) and
+# take(columns, positions) on the pandas backend, and through count and page
+# on SQLite.
+class PandasBackend:
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+
+    def _engine(self):
+        return get_derived('filter_engine', build_filter_engine, FILTER_COLUMNS, self.path)
+
+    def options(self, column):
+        return self._engine().options(column)
+
+    def value_range(self, column):
+        return self._engine().value_range(column)
+
+    def linked_options(self, source, selected, target):
+        return self._engine().linked_options(source, selected, target)
+
+    def rollup(self, by=None, filters=None, age_range=None):
+        cube = get_derived('cube', build_cube, CUBE_COLUMNS, self.path)
+        return rollup(cube, by=by, filters=filters, age_range=age_range)
+
+    def rows(self, columns=None, filters=None, ranges=None):
+        # Only the matching rows are gathered, chunk by chunk
+        rows = load_rows(columns, self.path)
+        return drop_unused_categories(rows.select(self._engine().mask(filters, ranges)))
+
+    def positions(self, filters=None, ranges=None):
+        # Positions of the matching rows in dataset order, for callers that
+        # keep them and gather a few rows at a time
+        return np.flatnonzero(self._engine().mask(filters, ranges))
+
+    def take(self, columns, positions):
+        # The rows at positions, which are in ascending order
+        return drop_unused_categories(load_rows(columns, self.path).take(positions))
+
+    # The rows are in memory already, so the summaries are computed from them
+    def value_counts(self, column, filters=None, ranges=None):
+        counts = self.rows([column], filters, ranges)[column].value_counts().sort_index()
+        return counts.rename('Count').rename_axis(column)
+
+    def box_summaries(self, column, by, filters=None, ranges=None):
+        # Groups in ascending order of their labels, as SQLite returns them
+        data = self.rows([column, by], filters, ranges)
+        return sorted(box_summaries(data[column], data[by]), key=lambda summary: summary['label'])
+
+    def sample(self, columns, n, by, filters=None, ranges=None, outlier_columns=()):
+        return stratified_sample(self.rows(columns, filters, ranges), by, n, outlier_columns=outlier_columns)
+
+    def head(self, columns, filters=None, ranges=None, n=5):
+        return self.take(columns, self.positions(filters, ranges)[:n])
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _where(filters=None, ranges=None, search=None):
+    # search is a (column, text) pair matching the column's values that
+    # contain text, case-insensitively
+    clauses, parameters = [], []
+    for column, values in (filters or {}).items():
+        values = list(values)
+        if not values:
+            clauses.append('0')
+            continue
+        clauses.append(f'{_quote(column)} IN ({", ".join("?" * len(values))})')
+        parameters.extend(values)
+    for column, (low, high) in (ranges or {}).items():
+        clauses.append(f'{_quote(column)} BETWEEN ? AND ?')
+        parameters.extend([low, high])
+    if search is not None:
+        clauses.append(f'INSTR(LOWER(CAST({_quote(search[0])} AS TEXT)), LOWER(?)) > 0')
+        parameters.append(search[1])
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', parameters
+
+
+def _and(where, clause):
+    return f'{where} AND {clause}' if where else f' WHERE {clause}'
+
+
+def _rollup_columns():
+    # The cube's measure columns, computed by SQLite over the matching rows;
+    # TOTAL sums no rows to 0 like pandas, where SUM gives NULL
+    columns = ['COUNT(*) AS "Rows"']
+    for measure in CUBE_MEASURES:
+        column = _quote(measure)
+        columns += [
+            f'COUNT({column}) AS {_quote(measure + " Count")}',
+            f'TOTAL({column}) AS {_quote(measure + " Sum")}',
+            f'TOTAL({column} * {column}) AS {_quote(measure + " Sumsq")}',
+            f'MIN({column}) AS {_quote(measure + " Min")}',
+            f'MAX({column}) AS {_quote(measure + " Max")}'
+        ]
+    columns.append('TOTAL("Billing Amount" * "Length of Stay") AS "Billing Stay Product Sum"')
+    return columns
+
+
+def _sql_frame(data):
+    # Dates are stored as ISO text, which sorts and compares like the dates
+    data = data.assign(**{'Admission Month': data['Date of Admission'].dt.month})
+    for column in data.columns:
+        if column in DATE_COLUMNS:
+            data[column] = data[column].dt.strftime('%Y-%m-%d')
+        elif not pd.api.types.is_numeric_dtype(data[column]):
+            data[column] = data[column].astype(object)
+    return data.astype(object).where(data.notna(), None)
+
+
+# Rows live in an indexed SQLite file next to the dataset. Each thread has its
+# own connection; the file is only read once built.
+class SQLiteBackend:
+    def __init__(self, database):
+        self.database = database
+        self._local = threading.local()
+        self._options = {}
+
+    @classmethod
+    def open(cls, path=DATA_PATH):
+        return cls(ensure_database(path))
+
+    def _query(self, sql, parameters=()):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.database)
+        return pd.read_sql_query(sql, connection, params=parameters)
+
+    def options(self, column):
+        # Distinct values in order of first appearance, like FilterEngine
+        if column not in self._options:
+            self._options[column] = self._query(
+                f'SELECT {_quote(column)} AS value FROM {TABLE} WHERE {_quote(column)} IS NOT NULL '
+                f'GROUP BY {_quote(column)} ORDER BY MIN(rowid)'
+            )['value'].tolist()
+        return self._options[column]
+
+    def value_range(self, column):
+        bounds = self._query(f'SELECT MIN({_quote(column)}) AS low, MAX({_quote(column)}) AS high FROM {TABLE}')
+        if bounds['low'].isna().iloc[0]:
+            return None
+        return bounds['low'].iloc[0], bounds['high'].iloc[0]
+
+    def linked_options(self, source, selected, target):
+        # Target values that co-occur with any selected source value, in the
+        # order of options(target) like FilterEngine
+        where, parameters = _where({source: selected})
+        linked = set(self._query(
+            f'SELECT DISTINCT {_quote(target)} AS value FROM {TABLE}{where}', parameters
+        )['value'])
+        return [value for value in self.options(target) if value in linked]
+
+    def rollup(self, by=None, filters=None, age_range=None):
+        where, parameters = _where(filters, {'Age': age_range} if age_range is not None else None)
+        columns = _rollup_columns()
+        if by is None:
+            # The minimum and maximum of no rows are NULL and come back as
+            # object columns; as floats they are NaN like the cube's
+            sums = self._query(f'SELECT {", ".join(columns)} FROM {TABLE}{where}', parameters)
+            sums = sums.astype({column: float for column in sums.columns[sums.dtypes == object]})
+            return finish_rollup(sums).iloc[0]
+
+        keys = [by] if isinstance(by, str) else list(by)
+        key_columns = ', '.join(_quote(key) for key in keys)
+        # Rows with a missing key are left out, as pandas' groupby does
+        present = ' AND '.join(f'{_quote(key)} IS NOT NULL' for key in keys)
+        where = f'{where} AND {present}' if where else f' WHERE {present}'
+        sums = self._query(
+            f'SELECT {key_columns}, {", ".join(columns)} FROM {TABLE}{where} '
+            f'GROUP BY {key_columns} ORDER BY {key_columns}', parameters
+        )
+        return finish_rollup(sums.set_index(by))
+
+    def rows(self, columns=None, filters=None, ranges=None):
+        where, parameters = _where(filters, ranges)
+        selected = ', '.join(_quote(column) for column in columns) if columns else '*'
+        data = self._query(f'SELECT {selected} FROM {TABLE}{where} ORDER BY rowid', parameters)
+        return _from_sql(data)
+
+    def count(self, filters=None, ranges=None, search=None):
+        where, parameters = _where(filters, ranges, search)
+        return int(self._query(f'SELECT COUNT(*) AS n FROM {TABLE}{where}', parameters)['n'].iloc[0])
+
+    def page(self, columns, filters=None, ranges=None, offset=0, limit=None, sort=None, descending=False,
+             search=None):
+        # limit matching rows from offset on, in dataset order or sorted by
+        # the sort column (missing values last, ties in dataset order); only
+        # those rows leave the database
+        where, parameters = _where(filters, ranges, search)
+        selected = ', '.join(_quote(column) for column in columns)
+        order = 'rowid'
+        if sort is not None:
+            order = f'{_quote(sort)} IS NULL, {_quote(sort)} {"DESC" if descending else "ASC"}, rowid'
+        data = self._query(f'SELECT {selected} FROM {TABLE}{where} ORDER BY {order} LIMIT ? OFFSET ?',
+                           parameters + [-1 if limit is None else limit, offset])
+        return _from_sql(data)
+
+    def head(self, columns, filters=None, ranges=None, n=5):
+        return self.page(columns, filters, ranges, limit=n)
+
+    def value_counts(self, column, filters=None, ranges=None):
+        # Matching rows per value of column, in ascending order of the values;
+        # missing values are left out
+        where, parameters = _where(filters, ranges)
+        value = _quote(column)
+        counts = self._query(f'SELECT {value} AS value, COUNT(*) AS n FROM {TABLE}'
+                             f'{_and(where, f"{value} IS NOT NULL")} GROUP BY {value} ORDER BY {value}', parameters)
+        return pd.Series(counts['n'].to_numpy(), index=pd.Index(counts['value'], name=column), name='Count')
+
+    def box_summaries(self, column, by, filters=None, ranges=None, max_outliers=MAX_OUTLIERS, whisker=WHISKER):
+        # The summaries chart_summaries.box_summaries gives for the matching
+        # rows, exactly and without sorting them: a scan for the count, mean
+        # and range of every group, one for counts in BOX_BINS equal-width
+        # bins of each range, and one for counts per value in just the bins
+        # holding the quartiles' ranks, the whiskers and the outliers
+        where, parameters = _where(filters, ranges)
+        value, group = _quote(column), _quote(by)
+        where = _and(where, f'{value} IS NOT NULL AND {group} IS NOT NULL')
+        groups = self._query(f'SELECT {group} AS label, COUNT(*) AS n, AVG({value}) AS mean, MIN({value}) AS low, '
+                             f'MAX({value}) AS high FROM {TABLE}{where} GROUP BY {group} ORDER BY {group}', parameters)
+        if groups.empty:
+            return []
+        spread = (groups['high'] - groups['low']).to_numpy(dtype=float)
+        groups['scale'] = np.divide(BOX_BINS, spread, out=np.zeros(len(groups)), where=spread > 0)
+
+        scales = ' UNION ALL '.join(['SELECT ? AS label, ? AS low, ? AS scale'] * len(groups))
+        scale_parameters = [item for row in groups[['label', 'low', 'scale']].itertuples(index=False, name=None)
+                            for item in row]
+        binned = f'{TABLE} JOIN ({scales}) AS scales ON {group} = scales.label{where}'
+        bin_of = f'MIN(CAST(({value} - scales.low) * scales.scale AS INTEGER), {BOX_BINS - 1})'
+        bins = self._query(f'SELECT scales.label AS label, {bin_of} AS bin, COUNT(*) AS n FROM {binned} '
+                           f'GROUP BY scales.label, bin', scale_parameters + parameters)
+        bins = dict(list(bins.groupby('label')))
+
+        boxes = [_BinnedBox(label, n, mean, low, scale, bins[label], whisker, max_outliers // 2)
+                 for label, n, mean, low, _, scale in groups.itertuples(index=False, name=None)]
+        picked = ' OR '.join([f'(scales.label = ? AND {bin_of} IN ({", ".join("?" * len(box.wanted))}))'
+                              for box in boxes])
+        picked_parameters = [item for box in boxes for item in [box.label] + box.wanted]
+        values = self._query(
+            f'SELECT scales.label AS label, {bin_of} AS bin, {value} AS value, COUNT(*) AS n '
+            f'FROM {_and(binned, f"({picked})")} GROUP BY scales.label, value ORDER BY scales.label, value',
+            scale_parameters + parameters + picked_parameters
+        )
+        values = dict(list(values.groupby('label')))
+        return [box.summary(values[box.label]) for box in boxes]
+
+    def sample(self, columns, n, by, filters=None, ranges=None, outlier_columns=()):
+        # About n matching rows: the most extreme of every outlier column, as
+        # in downsampling.stratified_sample, and rows drawn at one rate by a
+        # hash of their rowid, which keeps each stratum of by at its share
+        total = self.count(filters, ranges)
+        if total <= n:
+            return self.rows(columns, filters, ranges)
+        where, parameters = _where(filters, ranges)
+        per_end = int(n * OUTLIER_SHARE) // max(len(outlier_columns), 1) // 2
+        extremes, extreme_parameters = [], []
+        for column in outlier_columns if per_end else []:
+            present = _and(where, f'{_quote(column)} IS NOT NULL')
+            for direction in ('ASC', 'DESC'):
+                extremes.append(f'SELECT rowid FROM (SELECT rowid FROM {TABLE}{present} '
+                                f'ORDER BY {_quote(column)} {direction} LIMIT {per_end})')
+                extreme_parameters += parameters
+        rate = max(n - len(extremes) * per_end, 0) / total
+        picked = f'(rowid * {SAMPLE_HASH_MULTIPLIER}) % {2 ** 32} < ?'
+        if extremes:
+            picked = f'{picked} OR rowid IN ({" UNION ".join(extremes)})'
+        selected = ', '.join(_quote(column) for column in columns)
+        data = self._query(f'SELECT {selected} FROM {TABLE}{_and(where, f"({picked})")} ORDER BY rowid',
+                           parameters + [int(rate * 2 ** 32)] + extreme_parameters)
+        return _from_sql(data)
+
+
+# A group's counts per bin, which give the bins a box needs the values of
+# (wanted) and, with those values, its exact summary
+class _BinnedBox:
+    def __init__(self, label, n, mean, low, scale, bins, whisker, half):
+        self.label, self.n, self.mean, self.low, self.scale = label, int(n), mean, low, scale
+        self.whisker, self.half = whisker, half
+        counts = np.zeros(BOX_BINS, dtype=np.int64)
+        counts[bins['bin'].to_numpy()] = bins['n'].to_numpy()
+        self.before = np.concatenate([[0], np.cumsum(counts)])
+        # The ranks below and above each quartile's position, as np.quantile interpolates
+        self.ranks = []
+        for q in QUARTILES:
+            lower = int(np.floor(q * (self.n - 1)))
+            self.ranks.append((lower, min(lower + 1, self.n - 1), q * (self.n - 1) - lower))
+
+        wanted = {self._bin_of_rank(rank) for lower, upper, _ in self.ranks for rank in (lower, upper)}
+        if scale > 0:
+            # Every quartile lies between the edges of its ranks' bins, which
+            # bounds the fences; the whiskers are the nearest values inside
+            # them, in those bins or the first non-empty one beyond
+            (q1_low, q1_high), _, (q3_low, q3_high) = [
+                (self._edge(self._bin_of_rank(lower)), self._edge(self._bin_of_rank(upper) + 1))
+                for lower, upper, _ in self.ranks
+            ]
+            for low_fence, high_fence, step in [
+                ((1 + whisker) * q1_low - whisker * q3_high, (1 + whisker) * q1_high - whisker * q3_low, 1),
+                ((1 + whisker) * q3_low - whisker * q1_high, (1 + whisker) * q3_high - whisker * q1_low, -1)
+            ]:
+                first, last = self._bin(low_fence) - 1, self._bin(high_fence) + 1
+                wanted.update(range(max(first, 0), min(last, BOX_BINS - 1) + 1))
+                beyond = np.flatnonzero(counts[last + 1:]) + last + 1 if step > 0 else np.flatnonzero(counts[:max(first, 0)])
+                if len(beyond):
+                    wanted.add(int(beyond[0] if step > 0 else beyond[-1]))
+            # The capped outliers are among the half smallest and half largest values
+            if half:
+                wanted.update(range(0, self._bin_of_rank(min(half, self.n) - 1) + 1))
+                wanted.update(range(self._bin_of_rank(max(self.n - half, 0)), BOX_BINS))
+        self.wanted = sorted(int(b) for b in wanted if counts[b])
+
+    def _bin(self, value):
+        return int(min(max(np.floor((value - self.low) * self.scale), 0), BOX_BINS - 1))
+
+    def _edge(self, b):
+        return self.low + b / self.scale
+
+    def _bin_of_rank(self, rank):
+        return int(np.searchsorted(self.before, rank, side='right')) - 1
+
+    def summary(self, fetched):
+        values, counts, in_bin = (fetched[column].to_numpy() for column in ('value', 'n', 'bin'))
+        values = values.astype(float)
+        # Rows before each fetched value: those of earlier bins, then those of
+        # smaller values in its own bin
+        order = np.lexsort((values, in_bin))
+        bin_starts = self.before[in_bin[order]]
+        within = np.cumsum(counts[order]) - counts[order]
+        within -= within[np.searchsorted(in_bin[order], in_bin[order], side='left')]
+        first_rank = np.empty(len(values), dtype=np.int64)
+        first_rank[order] = bin_starts + within
+
+        def at_rank(rank):
+            candidates = np.flatnonzero((first_rank <= rank) & (rank < first_rank + counts))
+            return values[candidates[0]]
+
+        q1, median, q3 = [at_rank(lower) + (at_rank(upper) - at_rank(lower)) * fraction
+                          for lower, upper, fraction in self.ranks]
+        low_fence, high_fence = q1 - self.whisker * (q3 - q1), q3 + self.whisker * (q3 - q1)
+        inside = values[(values >= low_fence) & (values <= high_fence)]
+        below = np.repeat(values[values < low_fence], counts[values < low_fence])
+        above = np.repeat(values[values > high_fence], counts[values > high_fence])
+        return {
+            'label': self.label,
+            'count': self.n,
+            'mean': self.mean,
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'whislo': inside.min() if len(inside) else q1,
+            'whishi': inside.max() if len(inside) else q3,
+            'outliers': np.concatenate([below[:self.half], above[max(len(above) - self.half, 0):]])
+        }
+
+
+def _from_sql(data):
+    # Dates come back as ISO text
+    for column in DATE_COLUMNS:
+        if column in data:
+            data[column] = pd.to_datetime(data[column])
+    return data.drop(columns='Admission Month', errors='ignore')
+
+
+def database_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.sqlite'
+
+
+def _database_source(path):
+    # Offset and marker of the CSV rows in the database, and its row count
+    with sqlite3.connect(path) as connection:
+        offset, marker, n_rows = connection.execute('SELECT offset, marker, n_rows FROM source').fetchone()
+    return offset, marker, n_rows
+
+
+def _insert(connection, table):
+    columns = table.column_names + ['Admission Month']
+    insert = f'INSERT INTO {TABLE} VALUES ({", ".join("?" * len(columns))})'
+    for batch in table.to_batches(INSERT_BATCH_ROWS):
+        data = _sql_frame(batch.to_pandas())
+        connection.executemany(insert, data[columns].itertuples(index=False, name=None))
+
+
+def _set_source(connection, snapshot, n_rows):
+    offset, marker = snapshot_source(snapshot)
+    connection.execute('DELETE FROM source')
+    connection.execute('INSERT INTO source VALUES (?, ?, ?)', (offset, marker, n_rows))
+
+
+def build_database(csv_path, path=None):
+    # Copied from the snapshot a batch at a time, so the dataset is never
+    # loaded whole; written to a temporary file and swapped in like the snapshot
+    path = path or database_path(csv_path)
+    snapshot = ensure_snapshot(csv_path)
+    table = feather.read_table(snapshot, memory_map=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        schema = [_quote(column) for column in table.column_names + ['Admission Month']]
+        connection.execute(f'CREATE TABLE {TABLE} ({", ".join(schema)})')
+        connection.execute('CREATE TABLE source (offset INTEGER, marker TEXT, n_rows INTEGER)')
+        _insert(connection, table)
+        for column in INDEXED_COLUMNS:
+            connection.execute(f'CREATE INDEX {_quote("by " + column)} ON {TABLE} ({_quote(column)})')
+        # Statistics let the planner scan the table rather than an index when
+        # the filters select most of the rows, as the pages' defaults do
+        connection.execute('ANALYZE')
+        _set_source(connection, snapshot, table.num_rows)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def append_database(csv_path, path):
+    # Rows appended to the CSV are already in the refreshed snapshot; only
+    # those past the database's row count are inserted
+    snapshot = ensure_snapshot(csv_path)
+    n_rows = _database_source(path)[2]
+    table = feather.read_table(snapshot, memory_map=True)
+    with sqlite3.connect(path) as connection:
+        _insert(connection, table.slice(n_rows))
+        _set_source(connection, snapshot, table.num_rows)
+    return path
+
+
+def ensure_database(csv_path):
+    path = database_path(csv_path)
+    snapshot = ensure_snapshot(csv_path)
+    with build_lock(path):
+        if os.path.exists(path):
+            offset, marker, _ = _database_source(path)
+            if (offset, marker) == snapshot_source(snapshot):
+                return path
+            if is_append(csv_path, offset, marker):
+                return append_database(csv_path, path)
+        return build_database(csv_path, path)
+
+
+BACKENDS = {'pandas': PandasBackend, 'sqlite': SQLiteBackend.open}
+
+# Backends per dataset, reopened when the dataset changes
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=QUERY_BACKEND, path=DATA_PATH):
+    version = dataset_version(path)
+    with _backends_lock:
+        entry = _backends.get((name, version[0]))
+        if entry is None or entry[0] != version:
+            entry = (version, BACKENDS[name](path))
+            _backends[(name, version[0])] = entry
+    return entry[1]
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    print(f'Database written to {ensure_database(source)}')
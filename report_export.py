@@ -0,0 +1,254 @@
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+import figure_cache
+from data_loader import DATA_PATH, load_data
+from warmup import WARMUP_WORKERS, warm
+
+# Worker processes rendering reports; forked after the dataset and its
+# aggregates are loaded, so every worker shares the parent's copy of them.
+# Fork is asked for explicitly, as it is not the default on every platform
+# and Python version. Where fork is missing (Windows) or unsafe (macOS, whose
+# system frameworks do not survive it) the workers start fresh from
+# EXPORT_FALLBACK_METHODS instead and load what they need themselves.
+EXPORT_FALLBACK_METHODS = ['forkserver', 'spawn']
+EXPORT_WORKERS = int(os.environ.get('DASHBOARD_EXPORT_WORKERS', os.cpu_count() or 1))
+EXPORT_DIR = os.environ.get('DASHBOARD_EXPORT_DIR', 'reports')
+MANIFEST_NAME = 'manifest.json'
+
+# Page -> module and the sidebar widgets set per report, by label, to the
+# report's hospital or insurer. Pages without those filters render one report
+# for the whole dataset.
+PAGES = {
+    'Hospital Statistics': ('hospital_statistics_dashboard', {'Select Hospital(s)': 'hospital'}),
+    'Main Dashboard': ('main_dashboard', {}),
+    'Financial Dashboard': ('financial_dashboard', {'Select Hospitals': 'hospital',
+                                                    'Select Insurance Providers': 'insurer'}),
+    'BioStats Research Dashboard': ('biostats_research_dashboard', {})
+}
+SCOPE_COLUMNS = {'hospital': 'Hospital Names', 'insurer': 'Insurance Provider'}
+
+# Modules in this directory are the app's own; a page's code includes every
+# one of them it imports, directly or through another
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Each report runs its page script headless, without a server
+RUN_PAGE = 'from {module} import {module}\n{module}()'
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(text)).strip('_').lower()
+
+
+def report_id(page, scope):
+    return '/'.join([_slug(page)] + [_slug(scope[name]) for name in sorted(scope)])
+
+
+def reports(data):
+    # Every page for every hospital/insurer combination present in the data;
+    # a page filtered by fewer of them gets one report per value it filters on
+    combinations = data[list(SCOPE_COLUMNS.values())].drop_duplicates().dropna()
+    result = []
+    for page, (_, widgets) in PAGES.items():
+        names = sorted(set(widgets.values()))
+        if not names:
+            result.append((page, {}))
+            continue
+        scopes = combinations[[SCOPE_COLUMNS[name] for name in names]].drop_duplicates()
+        for values in scopes.itertuples(index=False, name=None):
+            result.append((page, dict(zip(names, values))))
+    return result
+
+
+def _imports(path):
+    # Top-level names of the modules a source file imports anywhere in it
+    with open(path, 'rb') as source:
+        tree = ast.parse(source.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            yield from (alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module.split('.')[0]
+
+
+def _local_file(name):
+    # The module's source file when it is one of the app's own, else None
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.has_location or os.path.dirname(os.path.abspath(spec.origin)) != ROOT:
+        return None
+    return spec.origin
+
+
+def _source_digest(module):
+    # The source of the page module and of the local modules it reaches
+    files, pending = {}, [module]
+    while pending:
+        name = pending.pop()
+        if name in files:
+            continue
+        files[name] = _local_file(name)
+        if files[name]:
+            pending.extend(_imports(files[name]))
+    digest = hashlib.sha256()
+    for name in sorted(name for name, path in files.items() if path):
+        with open(files[name], 'rb') as source:
+            digest.update(name.encode() + b'\0' + source.read())
+    return digest.hexdigest()
+
+
+def fingerprints(data, report_list):
+    # A report's inputs are the rows in its scope and its page's code. Rows
+    # are hashed once and summed per scope, so a small change to the data
+    # changes the fingerprints of the scopes it touches and no others; uint64
+    # sums wrap around, which keeps them independent of the row order.
+    row_hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    code = {page: _source_digest(module) for page, (module, _) in PAGES.items()}
+    sums = {}
+    result = {}
+    for page, scope in report_list:
+        names = sorted(scope)
+        if tuple(names) not in sums:
+            by = [SCOPE_COLUMNS[name] for name in names]
+            groups = data.groupby(by, observed=True).indices if by else {(): np.arange(len(data))}
+            sums[tuple(names)] = {(key if isinstance(key, tuple) else (key,)): row_hashes[rows].sum()
+                                  for key, rows in groups.items()}
+        digest = sums[tuple(names)][tuple(scope[name] for name in names)]
+        text = repr((code[page], int(digest)))
+        result[report_id(page, scope)] = hashlib.sha256(text.encode()).hexdigest()
+    return result
+
+
+def render_report(page, scope, out_dir):
+    # Runs in a worker: the page script is executed with its filters set to
+    # the report's scope, and every chart it draws is written to a file
+    from streamlit.testing.v1 import AppTest
+
+    target = os.path.join(out_dir, report_id(page, scope))
+    os.makedirs(target, exist_ok=True)
+    files = []
+
+    def sink(name, payload):
+        if isinstance(payload, bytes):
+            path = os.path.join(target, f'{_slug(name)}.png')
+            with open(path, 'wb') as image:
+                image.write(payload)
+        else:
+            path = os.path.join(target, f'{_slug(name)}.html')
+            pio.from_json(payload).write_html(path, include_plotlyjs='cdn')
+        files.append(path)
+
+    start = time.perf_counter()
+    figure_cache.chart_sink = sink
+    module, widgets = PAGES[page]
+    app = AppTest.from_string(RUN_PAGE.format(module=module), default_timeout=3600)
+    if widgets:
+        # The first run creates the widgets; the second renders the report
+        app.run()
+        for widget in app.sidebar.multiselect:
+            if widget.label in widgets:
+                widget.set_value([scope[widgets[widget.label]]])
+    files.clear()
+    app.run()
+    errors = [str(exception.value).splitlines()[0] for exception in app.exception]
+    return report_id(page, scope), sorted(files), time.perf_counter() - start, errors
+
+
+def _start_method():
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and sys.platform != 'darwin':
+        return 'fork'
+    return next(method for method in EXPORT_FALLBACK_METHODS if method in methods)
+
+
+def _load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as source:
+        return json.load(source)
+
+
+def _save_manifest(path, manifest):
+    # Rewritten after every report, so an interrupted export keeps the
+    # reports it finished
+    with open(f'{path}.tmp', 'w') as target:
+        json.dump(manifest, target, indent=2, sort_keys=True)
+    os.replace(f'{path}.tmp', path)
+
+
+def export(out_dir=EXPORT_DIR, workers=EXPORT_WORKERS, force=False):
+    # Renders the reports of the dataset the pages read (HOSPITAL_DATA_PATH)
+    # whose inputs changed since the last export
+    start = time.perf_counter()
+    warm(DATA_PATH, min(workers, WARMUP_WORKERS))
+    data = load_data()
+    for module, _ in PAGES.values():
+        importlib.import_module(module)
+    report_list = reports(data)
+    inputs = fingerprints(data, report_list)
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(manifest_path)
+    for stale in set(manifest) - set(inputs):
+        for file in manifest.pop(stale)['files']:
+            if os.path.exists(file):
+                os.remove(file)
+    pending = [(page, scope) for page, scope in report_list
+               if force or manifest.get(report_id(page, scope), {}).get('inputs') != inputs[report_id(page, scope)]]
+
+    failed = []
+    render_start = time.perf_counter()
+    with ProcessPoolExecutor(max(workers, 1), mp_context=multiprocessing.get_context(_start_method())) as pool:
+        futures = [pool.submit(render_report, page, scope, out_dir) for page, scope in pending]
+        for future in as_completed(futures):
+            name, files, seconds, errors = future.result()
+            if errors:
+                failed.append((name, errors[0]))
+                manifest.pop(name, None)
+            else:
+                manifest[name] = {'inputs': inputs[name], 'files': files, 'seconds': round(seconds, 3)}
+            _save_manifest(manifest_path, manifest)
+    render_seconds = time.perf_counter() - render_start
+
+    rendered = len(pending) - len(failed)
+    return {
+        'reports': len(report_list),
+        'rendered': rendered,
+        'skipped': len(report_list) - len(pending),
+        'failed': failed,
+        'render_seconds': render_seconds,
+        'total_seconds': time.perf_counter() - start,
+        'reports_per_second': rendered / render_seconds if rendered and render_seconds else 0.0
+    }
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    out_dir = args[0] if len(args) > 0 else EXPORT_DIR
+    workers = int(args[1]) if len(args) > 1 else EXPORT_WORKERS
+    # Called through the imported module rather than this __main__ copy: a
+    # page run replaces __main__ in the workers, where render_report then has
+    # to be found by its module's name
+    import report_export
+    summary = report_export.export(out_dir, workers, force='--force' in sys.argv)
+    print(f"{summary['reports']} reports: {summary['rendered']} rendered, {summary['skipped']} unchanged, "
+          f"{len(summary['failed'])} failed")
+    print(f"Rendered in {summary['render_seconds']:.1f}s ({summary['reports_per_second']:.2f} reports/s), "
+          f"{summary['total_seconds']:.1f}s in total")
+    for name, error in summary['failed']:
+        print(f'FAILED {name}: {error}')
+    if summary['failed']:
+        sys.exit(1)
@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Significance level, and the statsmodels multipletests method correcting the
+# p-values of every batch of tests together
+ALPHA = float(os.environ.get('DASHBOARD_ALPHA', 0.05))
+CORRECTION = os.environ.get('DASHBOARD_CORRECTION', 'fdr_bh')
+
+# Every test below works on sufficient statistics of groups of rows (count,
+# sum and sum of squares of a measure, or counts of outcomes), so its cost
+# depends on the number of groups and never on the number of rows.
+# scipy and statsmodels are imported by the tests that use them: every page
+# loads this module through the aggregates built at ingest and stays light
+# without them.
+
+
+def _divide(numerator, denominator):
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=float),
+                                                 np.asarray(denominator, dtype=float))
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator != 0)
+
+
+def moments(count, total, sumsq):
+    # Means and sample variances (ddof=1), as pandas computes them
+    count, total, sumsq = (np.asarray(values, dtype=float) for values in (count, total, sumsq))
+    mean = _divide(total, count)
+    variance = np.clip(_divide(sumsq - total * np.nan_to_num(mean), count - 1), 0, None)
+    return mean, np.where(count > 1, variance, np.nan)
+
+
+def adjust(p_values, method=CORRECTION, alpha=ALPHA):
+    # Corrected p-values and rejections; untestable (NaN) p-values stay NaN
+    # and are left out of the correction
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full(p_values.shape, np.nan)
+    reject = np.zeros(p_values.shape, dtype=bool)
+    testable = np.isfinite(p_values)
+    if testable.any():
+        from statsmodels.stats.multitest import multipletests
+        reject[testable], adjusted[testable] = multipletests(p_values[testable], alpha=alpha, method=method)[:2]
+    return adjusted, reject
+
+
+def anova(count, total, sumsq, family=None):
+    # One-way ANOVA of every family of groups at once: family gives each
+    # group's family code (0..n-1), None puts all groups in one family.
+    # Returns F, the between and within degrees of freedom and p per family.
+    from scipy import stats
+
+    count, total, sumsq = (np.asarray(values, dtype=float) for values in (count, total, sumsq))
+    family = np.zeros(len(count), dtype=int) if family is None else np.asarray(family)
+    n_families = int(family.max()) + 1 if len(family) else 0
+
+    def per_family(values):
+        return np.bincount(family, weights=values, minlength=n_families)
+
+    n = per_family(count)
+    grand = per_family(total)
+    explained = per_family(np.nan_to_num(_divide(total ** 2, count)))
+    groups = per_family((count > 0).astype(float))
+    between = explained - _divide(grand ** 2, n)
+    within = per_family(sumsq) - explained
+    df_between, df_within = groups - 1, n - groups
+    f = _divide(_divide(between, df_between), _divide(np.clip(within, 0, None), df_within))
+    valid = (df_between > 0) & (df_within > 0)
+    p = np.where(valid, stats.f.sf(f, np.maximum(df_between, 1), np.maximum(df_within, 1)), np.nan)
+    return np.where(valid, f, np.nan), df_between, df_within, p
+
+
+def chi_square(tables):
+    # Pearson's test of independence for a stack of contingency tables
+    # (tables x rows x columns, or a single table); rows and columns that are
+    # empty in a table do not count towards its degrees of freedom
+    from scipy import stats
+
+    tables = np.asarray(tables, dtype=float)
+    if tables.ndim == 2:
+        tables = tables[None]
+    rows = tables.sum(axis=2, keepdims=True)
+    columns = tables.sum(axis=1, keepdims=True)
+    expected = _divide(rows * columns, tables.sum(axis=(1, 2), keepdims=True))
+    statistic = np.nansum(_divide((tables - expected) ** 2, expected), axis=(1, 2))
+    dof = ((rows[:, :, 0] > 0).sum(axis=1) - 1) * ((columns[:, 0, :] > 0).sum(axis=1) - 1)
+    p = np.where(dof > 0, stats.chi2.sf(statistic, np.maximum(dof, 1)), np.nan)
+    return statistic, dof, p
+
+
+def pairs(family):
+    # Positions (left, right), left before right, of every pair of groups in
+    # the same family. Families of equal size are paired together from one
+    # triangle of indices, so there is a loop per distinct size, not per pair.
+    family = np.asarray(family)
+    order = np.argsort(family, kind='stable')
+    _, starts, sizes = np.unique(family[order], return_index=True, return_counts=True)
+    left, right = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for size in np.unique(sizes[sizes > 1]):
+        first, second = np.triu_indices(size, 1)
+        offsets = starts[sizes == size][:, None]
+        left.append(order[(offsets + first).ravel()])
+        right.append(order[(offsets + second).ravel()])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def welch(count_a, mean_a, variance_a, count_b, mean_b, variance_b):
+    # Two-sided Welch t-tests, elementwise: t, degrees of freedom and p
+    from scipy import stats
+
+    error_a, error_b = _divide(variance_a, count_a), _divide(variance_b, count_b)
+    error = error_a + error_b
+    t = _divide(np.asarray(mean_a) - np.asarray(mean_b), np.sqrt(error))
+    df = _divide(error ** 2, _divide(error_a ** 2, np.asarray(count_a) - 1)
+                 + _divide(error_b ** 2, np.asarray(count_b) - 1))
+    p = np.where(np.isfinite(t) & (df > 0), 2 * stats.t.sf(np.abs(t), np.where(df > 0, df, 1)), np.nan)
+    return t, df, p
+
+
+def pairwise_welch(count, total, sumsq, family=None, method=CORRECTION, alpha=ALPHA):
+    # Welch t-tests between every pair of groups in each family (all groups
+    # when family is None), with the p-values of all pairs corrected together
+    count = np.asarray(count, dtype=float)
+    mean, variance = moments(count, total, sumsq)
+    left, right = pairs(np.zeros(len(count), dtype=int) if family is None else family)
+    t, df, p = welch(count[left], mean[left], variance[left], count[right], mean[right], variance[right])
+    adjusted, reject = adjust(p, method, alpha)
+    return pd.DataFrame({
+        'Left': left, 'Right': right, 'Difference': mean[left] - mean[right],
+        't': t, 'df': df, 'p': p, 'Adjusted p': adjusted, 'Significant': reject
+    })
@@ -0,0 +1,310 @@
+import errno
+import hashlib
+import io
+import os
+import sys
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+DATE_COLUMNS = ['Date of Admission', 'Discharge Date']
+
+# String columns with at most this share of distinct values are stored
+# dictionary-encoded and come back to pandas as categoricals
+DICTIONARY_MAX_RATIO = 0.05
+
+# Bytes hashed just before a read offset to tell an append from a rewrite
+APPEND_MARKER_BYTES = 4096
+
+
+def read_csv_dataset(path, end=None):
+    # The rows in the first end bytes of the file (all of it when None)
+    if end is None:
+        return prepare_frame(pd.read_csv(path))
+    with open_prefix(path, end) as source:
+        return prepare_frame(pd.read_csv(source))
+
+
+def prepare_frame(data):
+    # Parse dates and derive the stay length once instead of in every dashboard
+    data['Billing Amount'] = pd.to_numeric(data['Billing Amount'], errors='coerce')
+    for column in DATE_COLUMNS:
+        data[column] = pd.to_datetime(data[column], errors='coerce')
+    data['Length of Stay'] = (data['Discharge Date'] - data['Date of Admission']).dt.days
+    return data
+
+
+def source_marker(csv_path, offset):
+    # Hash of the bytes that end at offset. It is unchanged when rows were only
+    # appended; None when the read stopped mid-line, which rules out appending.
+    with open(csv_path, 'rb') as source:
+        source.seek(max(offset - APPEND_MARKER_BYTES, 0))
+        block = source.read(min(offset, APPEND_MARKER_BYTES))
+    if not block.endswith(b'\n'):
+        return None
+    return hashlib.sha1(block).hexdigest()
+
+
+def source_state(csv_path):
+    # Offset, marker and signature of the file as it is before a read, which
+    # then stops at that offset. Rows written during the read lie past it and
+    # are left for the next append, which the changed signature triggers.
+    stat = os.stat(csv_path)
+    return stat.st_size, source_marker(csv_path, stat.st_size), _signature(stat)
+
+
+def _signature(stat):
+    return f'{stat.st_mtime_ns}:{stat.st_size}'.encode()
+
+
+class _Prefix(io.RawIOBase):
+    # Reads a file only up to a byte offset
+    def __init__(self, source, end):
+        self.source = source
+        self.remaining = end - source.tell()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        read = self.source.readinto(memoryview(buffer)[:max(self.remaining, 0)])
+        self.remaining -= read
+        return read
+
+    def close(self):
+        self.source.close()
+        super().close()
+
+
+def open_prefix(csv_path, end):
+    # The file as if it ended at end, for parsers reading it in full
+    return io.BufferedReader(_Prefix(open(csv_path, 'rb'), end))
+
+
+def is_append(csv_path, offset, marker):
+    # True when the file still starts with the rows read up to offset
+    if marker is None or os.path.isdir(csv_path) or os.stat(csv_path).st_size <= offset:
+        return False
+    return source_marker(csv_path, offset) == marker
+
+
+def read_appended_rows(csv_path, offset, columns=None):
+    # Parse only the rows after offset, up to the end of the file when the
+    # read starts; returns the rows and the source_state they were read at
+    state = source_state(csv_path)
+    with open(csv_path, 'rb') as source:
+        header = source.readline()
+        source.seek(offset)
+        tail = source.read(state[0] - offset)
+    data = prepare_frame(pd.read_csv(io.BytesIO(header + tail)))
+    if columns is not None:
+        data = data[list(columns)]
+    return data, state
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.arrow'
+
+
+def _source_signature(csv_path):
+    return _signature(os.stat(csv_path))
+
+
+def _snapshot_metadata(path):
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema.metadata or {}
+
+
+def _source_metadata(state):
+    offset, marker, signature = state
+    return {
+        b'source_signature': signature,
+        b'source_offset': str(offset).encode(),
+        b'source_marker': (marker or '').encode()
+    }
+
+
+def snapshot_source(path):
+    # Offset and marker of the CSV bytes the snapshot holds
+    metadata = _snapshot_metadata(path)
+    return int(metadata.get(b'source_offset', b'0')), metadata.get(b'source_marker', b'').decode() or None
+
+
+def is_fresh(csv_path, path=None):
+    path = path or snapshot_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    return _snapshot_metadata(path).get(b'source_signature') == _source_signature(csv_path)
+
+
+def _encode_column(column):
+    if not pa.types.is_string(column.type) or len(column) == 0:
+        return column
+    distinct = pc.count_distinct(column).as_py()
+    if distinct / len(column) > DICTIONARY_MAX_RATIO:
+        return column
+    return column.dictionary_encode()
+
+
+def _write_snapshot(table, path):
+    # Uncompressed Arrow IPC so readers can memory-map the columns, in a single
+    # record batch so each column is one contiguous buffer pandas can use in
+    # place. It is written to a temporary file and swapped in: processes that
+    # mapped the previous version keep reading it until they load the new one.
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(table.num_rows, 1))
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_snapshot(csv_path, path=None):
+    path = path or snapshot_path(csv_path)
+    state = source_state(csv_path)
+    data = read_csv_dataset(csv_path, state[0])
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    table = pa.table(
+        [_encode_column(column) for column in table.columns],
+        names=table.column_names,
+        metadata=_source_metadata(state)
+    )
+    return _write_snapshot(table, path)
+
+
+def append_snapshot(csv_path, path, offset):
+    # Parse only the appended rows and add them to the existing columns
+    existing = feather.read_table(path, memory_map=True)
+    tail, state = read_appended_rows(csv_path, offset, existing.column_names)
+    tail = pa.Table.from_pandas(tail, preserve_index=False)
+    columns = []
+    for column, field in zip(tail.columns, existing.schema):
+        if pa.types.is_dictionary(field.type):
+            column = column.dictionary_encode()
+        columns.append(column.cast(field.type))
+    tail = pa.table(columns, schema=existing.schema.remove_metadata())
+
+    table = pa.concat_tables([existing.replace_schema_metadata(None), tail])
+    table = table.unify_dictionaries().combine_chunks()
+    table = table.replace_schema_metadata(_source_metadata(state))
+    return _write_snapshot(table, path)
+
+
+def _lock_file(lock):
+    try:
+        import fcntl
+    except ImportError:
+        # flock is Unix only; Windows locks the first byte of the file
+        import msvcrt
+        while True:
+            try:
+                # LK_LOCK gives up after ten one-second retries
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError as error:
+                # Only a lock still held when those run out is waited on again
+                if error.errno not in (errno.EDEADLOCK, errno.EACCES):
+                    raise
+    fcntl.flock(lock, fcntl.LOCK_EX)
+
+
+def _unlock_file(lock):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        lock.seek(0)
+        msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@contextmanager
+def build_lock(path):
+    # Server processes sharing a file built from the dataset take turns
+    # refreshing it, so the work is done by one of them while the others
+    # wait and then use the result
+    with open(f'{path}.lock', 'w') as lock:
+        _lock_file(lock)
+        try:
+            yield
+        finally:
+            _unlock_file(lock)
+
+
+def ensure_snapshot(csv_path):
+    path = snapshot_path(csv_path)
+    if is_fresh(csv_path, path):
+        return path
+    with build_lock(path):
+        # Another process may have refreshed it while this one waited
+        if is_fresh(csv_path, path):
+            return path
+        if os.path.exists(path):
+            offset, marker = snapshot_source(path)
+            if is_append(csv_path, offset, marker):
+                return append_snapshot(csv_path, path, offset)
+        return build_snapshot(csv_path, path)
+
+
+def _string_type(arrow_type):
+    # Plain strings stay in the Arrow buffers instead of becoming Python objects
+    if pa.types.is_string(arrow_type):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+def read_snapshot(path, columns=None, where=None):
+    # Only the requested columns are touched. Numeric, date and string columns
+    # are handed to pandas straight from the mapped file without a copy, so
+    # server processes reading the same snapshot share one copy of them
+    # through the page cache; categorical codes are the only private part.
+    # where is a (column, values) pair keeping the rows whose column holds one
+    # of values (None for missing), in dataset order; those rows are copied.
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    if where is not None:
+        column, values = where
+        keep = pc.is_in(table[column], value_set=pa.array(list(values), type=pa.string()), skip_nulls=False)
+        table = table.filter(keep)
+    return table.to_pandas(split_blocks=True, types_mapper=_string_type)
+
+
+def snapshot_rows(path):
+    # Row count, read from the mapped file's batch headers
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def drop_unused_categories(data):
+    # Dictionary-encoded columns carry every value of the dataset in their
+    # dtype. Filtered rows and roll-ups keep only the values they contain,
+    # so charts grouping by them (plotly express does) see no empty groups.
+    categorical = {column: data[column].cat.remove_unused_categories() for column in data.columns
+                   if isinstance(data[column].dtype, pd.CategoricalDtype)}
+    return data.assign(**categorical) if categorical else data
+
+
+def concat_frames(frames):
+    # pd.concat that keeps categorical columns categorical when the frames'
+    # categories differ (appended rows may bring new values): every frame
+    # gets the categories of all of them, in order of first appearance
+    first = frames[0]
+    categorical = [column for column in first.columns if isinstance(first[column].dtype, pd.CategoricalDtype)]
+    if len(frames) > 1 and categorical:
+        categories = {column: first[column].cat.categories.append(
+            [frame[column].cat.categories for frame in frames[1:]]).unique() for column in categorical}
+        frames = [frame.assign(**{column: frame[column].cat.set_categories(categories[column])
+                                  for column in categorical
+                                  if not frame[column].cat.categories.equals(categories[column])})
+                  for frame in frames]
+    return pd.concat(frames)
+
+
+if __name__ == '__main__':
+    from data_loader import DATA_PATH
+
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    print(f'Snapshot written to {build_snapshot(source)}')
@@ -0,0 +1,45 @@
+import numpy as np
+
+import approximate
+from approximate import StratifiedSample
+from generate_data import generate_chunk
+from snapshot import prepare_frame
+
+ROWS = 20000
+
+# Independent samples drawn, and rows per sample
+DRAWS = 200
+SAMPLE_ROWS = 2000
+
+
+def test_estimates_unbiased_and_intervals_cover(monkeypatch):
+    monkeypatch.setattr(approximate, 'SAMPLE_ROWS', SAMPLE_ROWS)
+    data = prepare_frame(generate_chunk(np.random.default_rng(0), ROWS, ROWS // 2))
+    hospitals = data['Hospital Names'].drop_duplicates().tolist()[:20]
+    filters, age_range = {'Gender': ['Female'], 'Hospital Names': hospitals}, (30, 60)
+    selected = data[data['Gender'].isin(['Female']) & data['Hospital Names'].isin(hospitals)
+                    & data['Age'].between(*age_range)]
+    exact = {'Count': len(selected), 'Billing Amount Total': selected['Billing Amount'].sum(),
+             'Billing Amount Mean': selected['Billing Amount'].mean()}
+    exact_counts = selected['Medical Condition'].value_counts()
+
+    estimates = {name: [] for name in exact}
+    covered = {name: 0 for name in exact}
+    counts_covered = 0
+    for random_state in range(DRAWS):
+        sample = StratifiedSample.build(data, random_state=random_state)
+        result = sample.estimate(filters, age_range)
+        for name, value in exact.items():
+            estimates[name].append(result[name])
+            covered[name] += abs(result[name] - value) <= result[f'{name} Margin']
+        counts = sample.estimate_counts('Medical Condition', filters, age_range)
+        errors = (counts['Count'] - exact_counts.reindex(counts.index)).abs()
+        counts_covered += (errors <= counts['Count Margin']).mean()
+
+    for name, value in exact.items():
+        # The mean of the estimates is within four of its standard errors of the exact value
+        values = np.array(estimates[name])
+        assert abs(values.mean() - value) <= 4 * values.std() / np.sqrt(DRAWS)
+        # 95% intervals, with room for the sampling noise of DRAWS draws
+        assert covered[name] / DRAWS >= 0.9
+    assert counts_covered / DRAWS >= 0.9
@@ -0,0 +1,43 @@
+import numpy as np
+from matplotlib.cbook import boxplot_stats
+
+from chart_summaries import box_summaries, histogram_summary
+
+ROWS = 3000
+
+
+def test_box_summaries_match_matplotlib():
+    rng = np.random.default_rng(0)
+    # Heavy tails give outliers at both ends; stays in whole days give ties
+    for values in [rng.standard_t(3, ROWS) * 1000 + 20000, rng.integers(1, 31, ROWS).astype(float)]:
+        groups = rng.choice(['Elective', 'Emergency', 'Urgent'], ROWS)
+        summaries = box_summaries(values, groups, max_outliers=ROWS)
+        assert [summary['label'] for summary in summaries] == ['Elective', 'Emergency', 'Urgent']
+        for summary in summaries:
+            group = values[groups == summary['label']]
+            expected = boxplot_stats(group, whis=1.5)[0]
+            assert summary['count'] == len(group)
+            for key in ['mean', 'q1', 'med', 'q3', 'whislo', 'whishi']:
+                assert np.isclose(summary['median' if key == 'med' else key], expected[key])
+            np.testing.assert_allclose(np.sort(summary['outliers']), np.sort(expected['fliers']))
+
+
+def test_outliers_capped_at_extremes():
+    values = np.concatenate([np.zeros(1000), np.arange(1, 101) * 1000.0, -np.arange(1, 101) * 1000.0])
+    summary, = box_summaries(values, np.zeros(len(values)), max_outliers=20)
+    np.testing.assert_array_equal(summary['outliers'], np.concatenate([-np.arange(100, 90, -1) * 1000.0,
+                                                                       np.arange(91, 101) * 1000.0]))
+
+
+def test_weights_match_repeated_rows():
+    rng = np.random.default_rng(0)
+    values = rng.integers(1, 31, 200).astype(float)
+    weights = rng.integers(1, 20, 200)
+    groups = rng.choice(['a', 'b'], 200)
+    weighted = box_summaries(values, groups, weights=weights, max_outliers=ROWS)
+    repeated = box_summaries(np.repeat(values, weights), np.repeat(groups, weights), max_outliers=ROWS)
+    for summary, expected in zip(weighted, repeated):
+        for key in ['count', 'mean', 'q1', 'median', 'q3', 'whislo', 'whishi']:
+            assert np.isclose(summary[key], expected[key])
+    counts, _ = histogram_summary(values, 10, weights=weights)
+    np.testing.assert_array_equal(counts, np.histogram(np.repeat(values, weights), 10)[0])
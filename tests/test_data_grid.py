@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from data_grid import GRID_PAGE_ROWS, row_order
+from generate_data import generate_chunk
+
+ROWS = 250
+
+# A grid over the first ROWS rows of the dataset, as the pages draw it
+GRID_APP = """
+from data_grid import paged_grid
+from snapshot import read_csv_dataset
+paged_grid('test', read_csv_dataset('healthcare_dataset 2.csv').head({rows}), 'state')
+"""
+
+QUERY_GRID_APP = """
+from data_grid import paged_query_grid
+from query_backend import get_backend
+paged_query_grid('test', get_backend({backend!r}), ['Name', 'Age', 'Gender'], {{'Gender': ['Female']}},
+                 {{'Age': (20, 60)}}, 'state')
+"""
+
+
+def write_dataset(tmp_path, monkeypatch):
+    # Chart and order keys include the version of the dataset the pages read
+    frame = generate_chunk(np.random.default_rng(0), ROWS * 4, ROWS * 2)
+    frame.to_csv(tmp_path / 'healthcare_dataset 2.csv', index=False)
+    monkeypatch.chdir(tmp_path)
+    return frame
+
+
+def test_row_order_matches_pandas(tmp_path, monkeypatch):
+    data = write_dataset(tmp_path, monkeypatch).head(ROWS)
+    for sort_column, descending, search_text in [(None, False, ''), ('Age', True, ''), ('Name', False, 'an'),
+                                                  (None, False, 'AN'), ('Billing Amount', True, 'zz-no-match')]:
+        order = row_order('test', ROWS, lambda column: data[column], 'state', sort_column, descending, 'Name',
+                          search_text)
+        expected = data[data['Name'].str.contains(search_text, case=False, regex=False)]
+        if sort_column is not None:
+            expected = expected.sort_values(sort_column, ascending=not descending, kind='stable')
+        np.testing.assert_array_equal(np.asarray(order), expected.index.to_numpy())
+
+
+def test_pages_slice_the_sorted_rows(tmp_path, monkeypatch):
+    data = write_dataset(tmp_path, monkeypatch).head(ROWS)
+    app = AppTest.from_string(GRID_APP.format(rows=ROWS), default_timeout=60).run()
+    app.selectbox(key='test sort column').set_value('Age').run()
+    app.number_input[0].set_value(3).run()
+    assert not app.exception
+    expected = data.sort_values('Age', kind='stable').iloc[2 * GRID_PAGE_ROWS:]
+    shown = app.dataframe[0].value
+    assert len(shown) == ROWS - 2 * GRID_PAGE_ROWS
+    np.testing.assert_array_equal(shown['ID'].to_numpy(), expected['ID'].to_numpy())
+    assert app.caption[0].value == f'Rows {2 * GRID_PAGE_ROWS + 1}-{ROWS} of {ROWS}'
+
+
+def test_query_grids_agree_across_backends(tmp_path, monkeypatch):
+    write_dataset(tmp_path, monkeypatch)
+    pages = []
+    for backend in ['pandas', 'sqlite']:
+        app = AppTest.from_string(QUERY_GRID_APP.format(backend=backend), default_timeout=60).run()
+        app.selectbox(key='test sort column').set_value('Name').run()
+        app.checkbox(key='test descending').check().run()
+        app.text_input(key='test search').input('a').run()
+        app.number_input[0].set_value(2).run()
+        assert not app.exception
+        pages.append((app.dataframe[0].value.reset_index(drop=True), app.caption[0].value))
+    assert len(pages[0][0]) == GRID_PAGE_ROWS
+    pd.testing.assert_frame_equal(pages[0][0], pages[1][0], check_dtype=False, check_categorical=False)
+    assert pages[0][1] == pages[1][1]
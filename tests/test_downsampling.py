@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from downsampling import OUTLIER_SHARE, stratified_sample
+
+ROWS = 20000
+N = 2000
+
+
+def frame():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Medical Condition': rng.choice(['Arthritis', 'Asthma', 'Cancer', 'Diabetes'], ROWS, p=[0.5, 0.3, 0.15, 0.05]),
+        'Billing Amount': rng.lognormal(9, 1, ROWS),
+        'Length of Stay': rng.integers(1, 31, ROWS)
+    })
+
+
+def test_keeps_tail_rows():
+    data = frame()
+    sample = stratified_sample(data, 'Medical Condition', N, outlier_columns=['Billing Amount'])
+    per_end = int(N * OUTLIER_SHARE) // 2
+    billing = data['Billing Amount'].sort_values()
+    assert set(billing.index[:per_end]) <= set(sample.index)
+    assert set(billing.index[-per_end:]) <= set(sample.index)
+    assert abs(len(sample) - N) <= data['Medical Condition'].nunique()
+
+
+def test_keeps_condition_proportions():
+    data = frame()
+    sample = stratified_sample(data, 'Medical Condition', N, outlier_columns=['Billing Amount', 'Length of Stay'])
+    expected = data['Medical Condition'].value_counts(normalize=True)
+    result = sample['Medical Condition'].value_counts(normalize=True)
+    # Only the outliers, 5% of the sample, are drawn regardless of condition
+    assert (result - expected).abs().max() < OUTLIER_SHARE
+
+
+def test_small_data_returned_whole():
+    data = frame().head(N)
+    assert stratified_sample(data, 'Medical Condition', N) is data
@@ -0,0 +1,37 @@
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from fast_kde import binned_kde
+
+
+def peak_error(values, grid, density, weights=None):
+    expected = gaussian_kde(values, weights=weights)(grid)
+    return np.abs(density - expected).max() / expected.max()
+
+
+def test_integer_data_matches_gaussian_kde():
+    # Stays in whole days land exactly on grid points
+    values = np.random.default_rng(0).integers(1, 31, 10000).astype(float)
+    grid, density = binned_kde(values)
+    assert peak_error(values, grid, density) < 1e-12
+
+
+def test_continuous_data_matches_gaussian_kde():
+    rng = np.random.default_rng(0)
+    for values in [rng.uniform(100, 50000, 10000), rng.normal(40, 15, 10000)]:
+        grid, density = binned_kde(values)
+        assert peak_error(values, grid, density) < 1e-7
+
+
+def test_lognormal_data_matches_gaussian_kde():
+    values = np.random.default_rng(0).lognormal(0, 1, 5000)
+    grid, density = binned_kde(values)
+    assert peak_error(values, grid, density) < 5e-6
+
+
+def test_frequency_weights_match_rows():
+    # Row counts of aggregated values give the KDE of the rows themselves
+    rows = np.random.default_rng(0).integers(1, 31, 10000).astype(float)
+    values, counts = np.unique(rows, return_counts=True)
+    grid, density = binned_kde(values, counts, frequency=True)
+    assert peak_error(rows, grid, density) < 1e-12
@@ -0,0 +1,28 @@
+from figure_cache import FigureCache
+
+MB = 1024 * 1024
+
+
+def test_evicts_least_recently_used_past_budget():
+    # A 1 MB budget, as DASHBOARD_FIGURE_CACHE_MB=1 gives, filled with 0.3 MB figures
+    cache = FigureCache(max_bytes=MB)
+    payload = b'x' * (3 * MB // 10)
+    for key in 'abc':
+        cache.put(key, payload)
+    assert cache.get('a') == payload
+    cache.put('d', payload)
+    cache.put('e', payload)
+
+    # 'a' was used after 'b' and 'c' were stored, so those two went first
+    assert cache.get('b') is None
+    assert cache.get('c') is None
+    for key in 'ade':
+        assert cache.get(key) == payload
+    assert cache.stats() == {'entries': 3, 'bytes': 3 * len(payload), 'hits': 4, 'misses': 2, 'evictions': 2}
+
+
+def test_skips_figures_larger_than_budget():
+    cache = FigureCache(max_bytes=MB)
+    cache.put('a', b'x' * (MB + 1))
+    assert cache.get('a') is None
+    assert cache.stats() == {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 1, 'evictions': 0}
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine
+from generate_data import generate_chunk
+from snapshot import prepare_frame
+
+ROWS = 5000
+
+
+def test_mask_matches_pandas():
+    rng = np.random.default_rng(0)
+    data = prepare_frame(generate_chunk(rng, ROWS, ROWS // 2))
+    data.loc[rng.random(ROWS) < 0.03, 'Age'] = np.nan
+    engine = FilterEngine.build(data)
+    hospitals = engine.options('Hospital Names')[:3]
+    insurers = engine.options('Insurance Provider')[:2]
+    cases = [
+        ({}, {}),
+        ({'Gender': ['Female']}, {'Age': (30, 50)}),
+        ({'Hospital Names': hospitals, 'Insurance Provider': insurers, 'Admission Month': [1, 7]}, {}),
+        ({'Gender': ['Male'], 'Hospital Names': hospitals}, {'Age': (41.5, 41.5)}),
+        ({'Gender': []}, {'Age': (0, 200)})
+    ]
+    for selections, ranges in cases:
+        expected = pd.Series(True, index=data.index)
+        for column, selected in selections.items():
+            values = data['Date of Admission'].dt.month if column == 'Admission Month' else data[column]
+            expected &= values.isin(selected)
+        for column, (low, high) in ranges.items():
+            expected &= data[column].between(low, high)
+        np.testing.assert_array_equal(engine.mask(selections, ranges), expected.to_numpy())
+
+
+def test_value_range_without_values():
+    data = prepare_frame(generate_chunk(np.random.default_rng(0), 100, 50))
+    data['Age'] = np.nan
+    engine = FilterEngine.build(data)
+    assert engine.value_range('Age') is None
+
+    # Appended rows with ages give the range on their own
+    more = prepare_frame(generate_chunk(np.random.default_rng(1), 10, 5))
+    extended = engine.extend(more)
+    assert extended.value_range('Age') == (more['Age'].min(), more['Age'].max())
@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+import snapshot
+from approximate import SAMPLE_COLUMNS, StratifiedSample
+from biostats_engine import BIOSTATS_COLUMNS, CELL_KEYS, build_biostats_aggregates
+from data_loader import get_derived, load_data, load_rows, load_stream_aggregates
+from filter_engine import FILTER_COLUMNS, build_filter_engine
+from generate_data import generate_chunk
+from olap_cube import CUBE_COLUMNS, build_cube, rollup
+from patient_dashboard import PATIENT_COLUMNS
+from patient_index import build_patient_index
+from snapshot import read_csv_dataset
+from time_rollups import TIMELINE_COLUMNS, build_timeline
+from warmup import AGGREGATES, partitioned
+
+ROWS = 6000
+
+# Row counts the file grows through: a small append that stays in the delta
+# structures, then appends large enough to fold them
+CUTS = [3600, 3607, 3720, 4800, ROWS]
+
+BUILDS = [('cube', build_cube, CUBE_COLUMNS), ('biostats', build_biostats_aggregates, BIOSTATS_COLUMNS),
+          ('timeline', build_timeline, TIMELINE_COLUMNS), ('filter_engine', build_filter_engine, FILTER_COLUMNS),
+          ('patient_index', build_patient_index, PATIENT_COLUMNS), ('sample', StratifiedSample.build, SAMPLE_COLUMNS)]
+
+
+@pytest.fixture
+def lines():
+    rng = np.random.default_rng(0)
+    frame = generate_chunk(rng, ROWS, ROWS // 2)
+    for column, share in [('Hospital Names', 0.03), ('Admission Type', 0.03), ('Age', 0.01)]:
+        frame.loc[rng.random(ROWS) < share, column] = np.nan
+    # Values first seen in appended rows
+    frame.loc[frame.index[-300:], 'Hospital Names'] = 'Appended General'
+    frame.loc[frame.index[-50:], 'Insurance Provider'] = 'Appended Mutual'
+    return frame.to_csv(index=False).encode().splitlines(keepends=True)
+
+
+def write(path, lines, start, stop, mode='ab'):
+    with open(path, mode) as f:
+        f.write(b''.join(lines[start + 1:stop + 1] if start else lines[:stop + 1]))
+
+
+def assert_same(name, a, b, data):
+    if name == 'cube':
+        for args in [{}, {'by': 'Insurance Provider'},
+                     {'by': ['Hospital Names', 'Gender'], 'filters': {'Gender': ['Female']}, 'age_range': (30, 50)}]:
+            left, right = rollup(a, **args), rollup(b, **args)
+            if isinstance(left, pd.Series):
+                pd.testing.assert_series_equal(left, right)
+            else:
+                pd.testing.assert_frame_equal(left.sort_index(), right.sort_index())
+    elif name == 'biostats':
+        pd.testing.assert_frame_equal(a.cells.sort_values(CELL_KEYS).reset_index(drop=True),
+                                      b.cells.sort_values(CELL_KEYS).reset_index(drop=True))
+    elif name == 'timeline':
+        assert a.date_range() == b.date_range()
+        for args in [{}, {'resolution': 'day'}, {'by': 'Gender', 'resolution': 'week'},
+                     {'filters': {'Hospital Names': ['Appended General']}, 'resolution': 'month'}]:
+            (left, left_resolution), (right, right_resolution) = a.series(**args), b.series(**args)
+            assert left_resolution == right_resolution
+            if isinstance(left, pd.DataFrame):
+                pd.testing.assert_frame_equal(left, right, check_names=False)
+            else:
+                pd.testing.assert_series_equal(left, right, check_names=False)
+    elif name == 'filter_engine':
+        for column in ['Hospital Names', 'Insurance Provider', 'Gender', 'Admission Month']:
+            assert a.options(column) == b.options(column)
+        assert a.value_range('Age') == b.value_range('Age')
+        hospitals = b.options('Hospital Names')[:5]
+        assert (a.linked_options('Hospital Names', hospitals, 'Insurance Provider') ==
+                b.linked_options('Hospital Names', hospitals, 'Insurance Provider'))
+        for selections, ranges in [({'Gender': ['Male']}, {'Age': (20, 60)}), ({'Hospital Names': hospitals}, None),
+                                   (None, None)]:
+            assert np.array_equal(a.mask(selections, ranges), b.mask(selections, ranges))
+    elif name == 'patient_index':
+        for patient_id in data['ID'].drop_duplicates().sample(200, random_state=0):
+            assert np.array_equal(a.lookup(patient_id), b.lookup(patient_id))
+            left, right = a.summary(patient_id), b.summary(patient_id)
+            assert left['visits'] == right['visits']
+            assert np.isclose(left['total_billing'], right['total_billing'])
+    elif name == 'sample':
+        pd.testing.assert_frame_equal(a.rows, b.rows)
+        assert np.array_equal(a.population, b.population)
+        assert np.array_equal(a.sampled, b.sampled)
+
+
+def test_appends_match_cold_build(tmp_path, lines):
+    path = str(tmp_path / 'data.csv')
+    write(path, lines, 0, CUTS[0], 'wb')
+    for previous, cut in zip([0] + CUTS, CUTS):
+        if previous:
+            write(path, lines, previous, cut)
+        for name, build, columns in BUILDS:
+            value = get_derived(name, build, columns, path)
+            data = load_data(columns, path)
+            assert len(data) == cut
+            assert_same(name, value, build(data.copy(deep=False)), data)
+        rows = load_rows(PATIENT_COLUMNS, path)
+        frame = rows.frame()
+        rng = np.random.default_rng(cut)
+        positions = np.sort(rng.choice(cut, 50, replace=False))
+        pd.testing.assert_frame_equal(rows.take(positions), frame.iloc[positions])
+        mask = rng.random(cut) < 0.1
+        pd.testing.assert_frame_equal(rows.select(mask), frame[mask])
+        pd.testing.assert_frame_equal(rows.since(CUTS[0] - 3), frame.iloc[CUTS[0] - 3:])
+        cold = read_csv_dataset(path)[PATIENT_COLUMNS]
+        pd.testing.assert_frame_equal(frame.astype(str), cold.astype(str))
+
+
+def test_partitioned_build_matches_single_pass(tmp_path, lines):
+    # The warm-up builds each aggregate per group of hospitals, missing
+    # hospitals included, and concatenates the parts
+    path = str(tmp_path / 'data.csv')
+    write(path, lines, 0, ROWS, 'wb')
+    with ThreadPoolExecutor(2) as pool:
+        for name, build, concat, columns in AGGREGATES:
+            parts = []
+
+            def concat_parts(values, concat=concat):
+                parts.append(len(values))
+                return concat(values)
+
+            data = load_data(columns, path)
+            value = partitioned(pool, 2, build, concat_parts, columns, path)(data.copy(deep=False))
+            assert parts == [4]
+            assert_same(name, value, build(data.copy(deep=False)), data)
+
+
+def racing_appends(monkeypatch, path, batches):
+    # A writer appends each batch right after the reader has taken the
+    # source state, while the file is being read
+    source_state = snapshot.source_state
+
+    def racing(csv_path):
+        state = source_state(csv_path)
+        if batches:
+            with open(path, 'ab') as f:
+                f.write(batches.pop(0))
+        return state
+    monkeypatch.setattr(snapshot, 'source_state', racing)
+    monkeypatch.setattr(data_loader, 'source_state', racing)
+
+
+def test_concurrent_append_is_read_once(tmp_path, lines, monkeypatch):
+    path = str(tmp_path / 'data.csv')
+    write(path, lines, 0, 3600, 'wb')
+    # The first append stays in memory, the second refreshes the snapshot
+    racing_appends(monkeypatch, path, [b''.join(lines[3601:3701]), b''.join(lines[3701:4600]), b''])
+    assert len(load_data(['ID'], path)) == 3600
+    assert len(load_data(['ID'], path)) == 3700
+    assert len(load_data(['ID'], path)) == 4599
+    write(path, lines, 4599, ROWS)
+    monkeypatch.undo()
+    data = load_data(['ID'], path)
+    assert len(data) == ROWS
+    assert np.array_equal(data['ID'], read_csv_dataset(path)['ID'])
+
+
+def test_concurrent_append_is_streamed_once(tmp_path, lines, monkeypatch):
+    path = str(tmp_path / 'data.csv')
+    write(path, lines, 0, 3600, 'wb')
+    racing_appends(monkeypatch, path, [b''.join(lines[3601:4100])])
+    assert load_stream_aggregates(path).cube.rows() == 3600
+    monkeypatch.undo()
+    assert load_stream_aggregates(path).cube.rows() == 4099
+
+
+def test_summary_of_patient_without_counts(tmp_path, lines):
+    # Every visit of a patient with missing medication and test results
+    path = str(tmp_path / 'data.csv')
+    write(path, lines, 0, ROWS, 'wb')
+    data = load_data(PATIENT_COLUMNS, path)
+    patient_id = data['ID'].iloc[0]
+    visits = data['ID'] == patient_id
+    data['Medication'] = data['Medication'].mask(visits)
+    data['Test Results'] = data['Test Results'].mask(visits)
+    summary = build_patient_index(data).summary(patient_id)
+    assert summary['visits'] == visits.sum()
+    assert summary['medication_counts'].empty and summary['test_result_counts'].empty
@@ -0,0 +1,12 @@
+import pytest
+
+from bench_pages import PAGES, dataset
+from memory_soak import MIN_SAMPLES, SOAK_ROWS, WARMUP_RERUNS, assess, soak
+
+
+# Enough reruns for the fewest samples the RSS slope is fitted through
+@pytest.mark.slow
+@pytest.mark.parametrize('page', list(PAGES))
+def test_rss_growth_within_budget(page):
+    result = soak(dataset(SOAK_ROWS), PAGES[page], WARMUP_RERUNS + MIN_SAMPLES)
+    assert assess(result)[-1] == 'ok'
@@ -0,0 +1,25 @@
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from generate_data import generate_chunk
+
+ROWS = 2000
+
+
+def test_patient_without_medications_or_test_results(tmp_path, monkeypatch):
+    # The page reads the dataset by its default name from the working directory
+    frame = generate_chunk(np.random.default_rng(0), ROWS, ROWS // 2)
+    patient_id = frame['ID'].iloc[0]
+    visits = frame['ID'] == patient_id
+    frame.loc[visits, ['Medication', 'Test Results']] = np.nan
+    frame.to_csv(tmp_path / 'healthcare_dataset 2.csv', index=False)
+    monkeypatch.chdir(tmp_path)
+
+    app = AppTest.from_string('from patient_dashboard import patient_dashboard\npatient_dashboard()',
+                              default_timeout=600)
+    app.run()
+    app.text_input[0].input(str(patient_id)).run()
+    assert not app.exception
+    assert app.metric[0].value == str(visits.sum())
+    assert [info.value for info in app.info] == ['No medications are recorded for this patient.',
+                                                'No test results are recorded for this patient.']
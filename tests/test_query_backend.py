@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from generate_data import generate_chunk
+from query_backend import PandasBackend, SQLiteBackend
+
+ROWS = 5000
+
+
+@pytest.fixture
+def backends(tmp_path):
+    rng = np.random.default_rng(0)
+    frame = generate_chunk(rng, ROWS, ROWS // 2)
+    for column in ['Hospital Names', 'Insurance Provider', 'Medical Condition']:
+        frame.loc[rng.random(ROWS) < 0.03, column] = np.nan
+    path = str(tmp_path / 'data.csv')
+    frame.to_csv(path, index=False)
+    return PandasBackend(path), SQLiteBackend.open(path)
+
+
+@pytest.mark.parametrize('by', ['Admission Type', 'Medical Condition', 'Insurance Provider',
+                                ['Hospital Names', 'Gender'], 'Admission Month'])
+def test_rollups_match(backends, by):
+    pandas_backend, sqlite_backend = backends
+    hospitals = pandas_backend.options('Hospital Names')[:3]
+    for filters in [None, {'Gender': ['Male'], 'Hospital Names': hospitals}, {'Admission Month': [3]}]:
+        # Ranges on bucket edges, cutting through buckets and inside a single one
+        for age_range in [None, (20, 60), (23, 61), (41, 45)]:
+            pd.testing.assert_frame_equal(pandas_backend.rollup(by, filters, age_range),
+                                          sqlite_backend.rollup(by, filters, age_range))
+
+
+def test_value_counts_and_head_match(backends):
+    pandas_backend, sqlite_backend = backends
+    filters, ranges = {'Gender': ['Female']}, {'Age': (30, 50)}
+    for column in ['Age', 'Length of Stay']:
+        pd.testing.assert_series_equal(pandas_backend.value_counts(column, filters, ranges),
+                                       sqlite_backend.value_counts(column, filters, ranges))
+    columns = ['Age', 'Gender', 'Length of Stay']
+    pd.testing.assert_frame_equal(pandas_backend.head(columns, filters, ranges).reset_index(drop=True),
+                                  sqlite_backend.head(columns, filters, ranges), check_dtype=False,
+                                  check_categorical=False)
+
+
+@pytest.mark.parametrize('column', ['Billing Amount', 'Length of Stay'])
+def test_box_summaries_match(backends, column):
+    # Billing amounts are continuous, stays are whole days with many ties
+    pandas_backend, sqlite_backend = backends
+    for filters in [None, {'Gender': ['Male']}]:
+        expected = pandas_backend.box_summaries(column, 'Admission Type', filters)
+        result = sqlite_backend.box_summaries(column, 'Admission Type', filters)
+        assert [box['label'] for box in result] == [box['label'] for box in expected]
+        for box, expected_box in zip(result, expected):
+            for key in ['count', 'mean', 'q1', 'median', 'q3', 'whislo', 'whishi', 'outliers']:
+                np.testing.assert_allclose(box[key], expected_box[key])
+
+
+def test_sample_bounded_with_extremes(backends):
+    _, sqlite_backend = backends
+    columns = ['Medical Condition', 'Billing Amount']
+    sample = sqlite_backend.sample(columns, 1000, 'Medical Condition', outlier_columns=['Billing Amount'])
+    rows = sqlite_backend.rows(columns)
+    assert len(sample) <= 1000
+    assert sample['Billing Amount'].max() == rows['Billing Amount'].max()
+    assert sample['Billing Amount'].min() == rows['Billing Amount'].min()
@@ -0,0 +1,36 @@
+import errno
+import sys
+import types
+
+import pytest
+
+from snapshot import _lock_file
+
+
+def windows_locking(monkeypatch, errors):
+    # msvcrt stands in for fcntl, as on Windows; each call raises the next of
+    # errors until they run out
+    calls = []
+
+    def locking(fileno, mode, n_bytes):
+        calls.append(mode)
+        if len(calls) <= len(errors):
+            raise OSError(errors[len(calls) - 1], 'locking failed')
+
+    monkeypatch.setitem(sys.modules, 'fcntl', None)
+    monkeypatch.setitem(sys.modules, 'msvcrt', types.SimpleNamespace(locking=locking, LK_LOCK=1))
+    return calls
+
+
+def test_windows_lock_waits_while_held(tmp_path, monkeypatch):
+    calls = windows_locking(monkeypatch, [errno.EDEADLOCK, errno.EACCES])
+    with open(tmp_path / 'data.lock', 'a+b') as lock:
+        _lock_file(lock)
+    assert len(calls) == 3
+
+
+def test_windows_lock_raises_other_errors(tmp_path, monkeypatch):
+    calls = windows_locking(monkeypatch, [errno.EBADF])
+    with open(tmp_path / 'data.lock', 'a+b') as lock, pytest.raises(OSError):
+        _lock_file(lock)
+    assert len(calls) == 1
@@ -0,0 +1,19 @@
+import numpy as np
+
+from generate_data import generate_chunk
+from startup_report import STARTUP_BUDGET_SECONDS, measure
+
+ROWS = 10000
+
+# Used only by the pages that are not shown first
+DEFERRED_MODULES = {'seaborn', 'scipy', 'statsmodels'}
+
+
+def test_cold_start_within_budget(tmp_path):
+    # The app reads the dataset by its default name from the working directory
+    rng = np.random.default_rng(0)
+    generate_chunk(rng, ROWS, ROWS // 2).to_csv(tmp_path / 'healthcare_dataset 2.csv', index=False)
+    result, _ = measure(str(tmp_path))
+    assert result['exceptions'] == 0
+    assert result['seconds'] <= STARTUP_BUDGET_SECONDS
+    assert not DEFERRED_MODULES & set(result['loaded'])
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import load_data
+from generate_data import generate_chunk
+from time_rollups import TIMELINE_COLUMNS, build_timeline
+
+
+def test_series_counts_the_last_period_in_full(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    generate_chunk(np.random.default_rng(0), 3000, 1500).to_csv(path, index=False)
+    data = load_data(TIMELINE_COLUMNS, path)
+    timeline = build_timeline(data)
+    days = data['Date of Admission'].dt.normalize()
+    # A Wednesday, so the range ends inside a week, a month and a quarter
+    end = pd.Timestamp('2021-06-16')
+    for resolution, frequency in [('week', 'W-SUN'), ('month', 'M'), ('quarter', 'Q')]:
+        series, _ = timeline.series(start='2021-01-01', end=end, resolution=resolution)
+        last = end.to_period(frequency)
+        assert series.index[-1] == last.start_time
+        assert series.iloc[-1] == days.between(last.start_time, last.end_time).sum()
+
+
+def test_series_selects_exact_ages(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    generate_chunk(np.random.default_rng(0), 3000, 1500).to_csv(path, index=False)
+    data = load_data(TIMELINE_COLUMNS, path)
+    timeline = build_timeline(data)
+    # Ends that cut through the cube's age buckets
+    age_range = (23, 61)
+    series, _ = timeline.series(filters={'Gender': ['Female']}, age_range=age_range, resolution='month')
+    selected = data[(data['Gender'] == 'Female') & data['Age'].between(*age_range)]
+    expected = selected.groupby(selected['Date of Admission'].dt.to_period('M').dt.start_time).size()
+    pd.testing.assert_series_equal(series[series > 0], expected, check_names=False, check_index_type=False,
+                                   check_freq=False)
@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from olap_cube import select_cells
+from snapshot import concat_frames
+
+# Finest first; each level is rolled up from the day level, never from rows
+RESOLUTIONS = ['day', 'week', 'month', 'quarter']
+PERIOD_FREQUENCIES = {'day': 'D', 'week': 'W-SUN', 'month': 'M', 'quarter': 'Q'}
+RESOLUTION_LABELS = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly', 'quarter': 'Quarterly'}
+# Typical length of a period, for sizing bars
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 30, 'quarter': 91}
+
+# Most periods a chart draws; the finest resolution that fits the visible
+# date range in this many is used
+SERIES_POINTS = int(os.environ.get('DASHBOARD_SERIES_POINTS', 200))
+
+TIMELINE_KEYS = ['Hospital Names', 'Gender', 'Age Bucket']
+TIMELINE_MEASURES = ['Rows', 'Billing Amount Sum', 'Length of Stay Sum']
+TIMELINE_COLUMNS = ['Hospital Names', 'Gender', 'Age', 'Date of Admission', 'Billing Amount', 'Length of Stay']
+
+# Appended rows go into a delta pyramid that is merged into the main one once
+# it holds more than this share of the rows
+DELTA_FOLD_RATIO = 0.05
+
+
+def _day_cells(data):
+    # Admissions without a date cannot be placed on a time axis
+    data = data[data['Date of Admission'].notna()]
+    # Ages are kept exact, so an age range selects whole cells
+    frame = data[['Hospital Names', 'Gender']].assign(**{
+        'Age Bucket': data['Age'],
+        'Period': data['Date of Admission'].dt.normalize()
+    })
+    return frame.assign(**{
+        'Rows': 1,
+        'Billing Amount Sum': data['Billing Amount'],
+        'Length of Stay Sum': data['Length of Stay']
+    })
+
+
+def _sum_cells(cells):
+    # Sorted by period, so a date range is a contiguous slice of every level
+    sums = cells.groupby(['Period'] + TIMELINE_KEYS, observed=True, dropna=False)[TIMELINE_MEASURES].sum()
+    return sums.reset_index()
+
+
+def _period_starts(days, resolution):
+    # First day of the period holding each day, computed once per distinct day
+    codes, unique = pd.factorize(days)
+    starts = pd.DatetimeIndex(unique).to_period(PERIOD_FREQUENCIES[resolution]).start_time
+    return starts[codes]
+
+
+# Admission counts, billing sums and stay sums per hospital, gender and age
+# bucket at day, week, month and quarter granularity. Charts read the level
+# that suits their date range, so no resolution touches the rows. Rows
+# appended after the first `rows` are summed in the delta pyramid.
+class TimePyramid:
+    def __init__(self, levels, rows, delta=None):
+        self.levels = levels
+        self.rows = rows
+        self.delta = delta
+
+    @classmethod
+    def from_days(cls, days, rows):
+        levels = {'day': days}
+        for resolution in RESOLUTIONS[1:]:
+            levels[resolution] = _sum_cells(days.assign(Period=_period_starts(days['Period'], resolution)))
+        return cls(levels, rows)
+
+    def _parts(self):
+        return [self] if self.delta is None else [self, self.delta]
+
+    def extend(self, data):
+        # Sum data, the rows appended after these, into the delta, so an
+        # append costs time in proportion to the delta rather than to every
+        # cell; the delta is merged in once it has grown
+        tail = build_timeline(data)
+        delta = tail if self.delta is None else merge_timelines([self.delta, tail])
+        if delta.rows > DELTA_FOLD_RATIO * self.rows:
+            return merge_timelines([TimePyramid(self.levels, self.rows), delta])
+        return TimePyramid(self.levels, self.rows, delta)
+
+    def date_range(self):
+        days = [part.levels['day']['Period'] for part in self._parts() if len(part.levels['day'])]
+        return min(day.iloc[0] for day in days), max(day.iloc[-1] for day in days)
+
+    def resolution_for(self, start, end, points=SERIES_POINTS):
+        for resolution in RESOLUTIONS:
+            if len(pd.period_range(start, end, freq=PERIOD_FREQUENCIES[resolution])) <= points:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def series(self, measure='Rows', filters=None, age_range=None, start=None, end=None, by=None,
+               resolution=None):
+        # measure per period for the filtered cells, over every period that
+        # overlaps start..end (the whole range when omitted) in full and with
+        # zeros for empty ones; one column per value of by when given.
+        # Returns (series, resolution).
+        first, last = self.date_range()
+        start = pd.Timestamp(first if start is None else start).normalize()
+        end = pd.Timestamp(last if end is None else end).normalize()
+        resolution = resolution or self.resolution_for(start, end)
+        periods = pd.period_range(start, end, freq=PERIOD_FREQUENCIES[resolution]).start_time
+
+        # Cells of the same period and keys in the main and delta pyramids add
+        # up. A level's cells hold whole periods and are keyed by their first
+        # day, so the slice runs from the start of the period holding start to
+        # the start of the one holding end, which comes in full, days after
+        # end included.
+        selected = []
+        for part in self._parts():
+            level = part.levels[resolution]
+            stamps = level['Period'].to_numpy()
+            low = np.searchsorted(stamps, periods[0].to_datetime64(), side='left')
+            high = np.searchsorted(stamps, periods[-1].to_datetime64(), side='right')
+            cells = select_cells(level.iloc[low:high], filters)
+            if age_range is not None:
+                # The timeline's 'Age Bucket' holds exact ages, see _day_cells
+                cells = cells[cells['Age Bucket'].between(*age_range)]
+            selected.append(cells)
+        cells = concat_frames(selected)
+        if by is None:
+            return cells.groupby('Period')[measure].sum().reindex(periods, fill_value=0), resolution
+        sums = cells.groupby(['Period', by], observed=True)[measure].sum().unstack(fill_value=0)
+        return sums.reindex(periods, fill_value=0), resolution
+
+
+def build_timeline(data, previous=None):
+    # With the pyramid of the rows before them, data holds only the appended rows
+    if previous is not None:
+        return previous.extend(data)
+    return TimePyramid.from_days(_sum_cells(_day_cells(data)), len(data))
+
+
+def merge_timelines(parts):
+    # Pyramids of disjoint row sets add up cell by cell
+    parts = [piece for part in parts for piece in part._parts()]
+    days = _sum_cells(concat_frames([part.levels['day'] for part in parts]))
+    return TimePyramid.from_days(days, sum(part.rows for part in parts))
+
+
+def concat_timelines(parts):
+    # Pyramids of rows that differ in a key share no cell; each level is
+    # put back in period order
+    levels = {resolution: concat_frames([part.levels[resolution] for part in parts])
+              .sort_values('Period', kind='stable', ignore_index=True) for resolution in RESOLUTIONS}
+    return TimePyramid(levels, sum(part.rows for part in parts))
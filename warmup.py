@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from approximate import APPROXIMATE, SAMPLE_COLUMNS, StratifiedSample
+from biostats_engine import BIOSTATS_COLUMNS, build_biostats_aggregates, concat_biostats_aggregates
+from chunked_ingest import StreamAggregates, ingest, source_files
+from data_loader import DATA_PATH, get_derived, load_stream_aggregates, streaming_mode
+from filter_engine import FILTER_COLUMNS, build_filter_engine
+from olap_cube import CUBE_COLUMNS, build_cube, concat_cubes
+from query_backend import QUERY_BACKEND, get_backend
+from snapshot import ensure_snapshot, read_snapshot, snapshot_rows
+from time_rollups import TIMELINE_COLUMNS, build_timeline, concat_timelines
+
+# Worker processes used to precompute the aggregates, at most one per CPU;
+# 1 builds them in-process
+WARMUP_WORKERS = int(os.environ.get('DASHBOARD_WARMUP_WORKERS', os.cpu_count() or 1))
+
+# Aggregates are computed per group of hospitals and the results put
+# together. Hospital Names is a key of every partitioned aggregate, so the
+# groups' results share no cell and need no regrouping.
+PARTITION_COLUMN = 'Hospital Names'
+
+# Partitions per worker; several even out hospitals of different sizes
+PARTITIONS_PER_WORKER = 2
+
+# Name, builder, concatenation and columns of every partitionable aggregate,
+# under the names the pages look them up with
+AGGREGATES = [
+    ('cube', build_cube, concat_cubes, CUBE_COLUMNS),
+    ('biostats', build_biostats_aggregates, concat_biostats_aggregates, BIOSTATS_COLUMNS),
+    ('timeline', build_timeline, concat_timelines, TIMELINE_COLUMNS)
+]
+
+
+def partitions(data, n):
+    # The partition column's values in n groups of about equal row counts,
+    # largest first; None stands for missing values
+    counts = data[PARTITION_COLUMN].value_counts(dropna=False)
+    groups, sizes = [[] for _ in range(n)], [0] * n
+    for value, count in counts.items():
+        smallest = sizes.index(min(sizes))
+        groups[smallest].append(None if value != value else value)
+        sizes[smallest] += count
+    return [group for group in groups if group]
+
+
+def build_partition(build, snapshot, columns, values):
+    # Runs in a worker, which maps the snapshot and reads only its partition
+    return build(read_snapshot(snapshot, columns, where=(PARTITION_COLUMN, values)))
+
+
+def partitioned(pool, workers, build, concat, columns, path):
+    # A get_derived builder that fans the partitions out to the pool. Appended
+    # rows are still folded in by the builder itself, which is incremental,
+    # and so are rows kept in memory that the snapshot does not hold yet.
+    def build_partitioned(data, previous=None):
+        if previous is not None:
+            return build(data, previous)
+        snapshot = ensure_snapshot(path)
+        groups = partitions(data, workers * PARTITIONS_PER_WORKER)
+        if len(groups) < 2 or snapshot_rows(snapshot) != len(data):
+            return build(data)
+        return concat(list(pool.map(partial(build_partition, build, snapshot, columns), groups)))
+    return build_partitioned
+
+
+def ingest_partitioned(pool):
+    # Streamed datasets are partitioned by file; a single file is folded in order
+    def build(path, end=None):
+        files = source_files(path)
+        if len(files) < 2:
+            return ingest(path, end=end)
+        return StreamAggregates.merge(list(pool.map(ingest, files)))
+    return build
+
+
+def warm(path=DATA_PATH, workers=WARMUP_WORKERS):
+    # Publishes the shared aggregates to the data_loader cache, so the first
+    # page view finds them built. Pages asking for one while it is being built
+    # wait on that aggregate's lock instead of building it again.
+    timings = {}
+    # Warm-up runs on a thread of the server, where forking could copy locks
+    # other threads hold; workers are started from a fork server instead
+    workers = min(workers, os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('forkserver')) if workers > 1 else None
+    try:
+        if streaming_mode(path):
+            start = time.perf_counter()
+            load_stream_aggregates(path, ingest_partitioned(pool) if pool else ingest)
+            timings['stream_aggregates'] = time.perf_counter() - start
+            return timings
+
+        # The sample comes first, so approximate pages can show estimates
+        # while the exact aggregates below are still being built
+        if APPROXIMATE:
+            start = time.perf_counter()
+            get_derived('sample', StratifiedSample.build, SAMPLE_COLUMNS, path)
+            timings['sample'] = time.perf_counter() - start
+
+        for name, build, concat, columns in AGGREGATES:
+            # The SQLite backend answers roll-ups itself and never reads the cube
+            if name == 'cube' and QUERY_BACKEND == 'sqlite':
+                continue
+            start = time.perf_counter()
+            builder = partitioned(pool, workers, build, concat, columns, path) if pool else build
+            get_derived(name, builder, columns, path)
+            timings[name] = time.perf_counter() - start
+
+        # The SQLite database is built or brought up to date once, by one
+        # process, and takes the place of the filter bitmaps
+        if QUERY_BACKEND == 'sqlite':
+            start = time.perf_counter()
+            get_backend('sqlite', path)
+            timings['sqlite'] = time.perf_counter() - start
+            return timings
+
+        # The filter bitmaps refer to row positions, so they are built in one piece
+        start = time.perf_counter()
+        get_derived('filter_engine', build_filter_engine, FILTER_COLUMNS, path)
+        timings['filter_engine'] = time.perf_counter() - start
+        return timings
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else WARMUP_WORKERS
+    for name, seconds in warm(source, workers).items():
+        print(f'{name:<20}{seconds:>8.2f}s')